@@ -0,0 +1,330 @@
+"""性能基准：python bookmark_bench.py [--sizes 1000,10000] [--out 结果.json] [--baseline 基线.json]
+
+在临时目录里生成指定规模的合成收藏库，分别计时数据层（读取、写盘、移动、重命名）和
+界面层（刷新分组列表 / 网站列表、移动、重命名）的热点路径，结果写成 JSON。--memory 时
+另外统计读入后每条网站记录常驻的字节数，并与旧的 dict 记录对比。给出
+--baseline 时与之前保存的结果逐项比较，中位数变慢超过容差即以退出码 1 结束，可直接用于 CI。
+
+界面部分需要图形环境：Linux 上没有 DISPLAY 时自动启动 Xvfb 虚拟 X 服务器；
+找不到 Xvfb 时跳过界面部分，只跑数据部分。
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bookmark_core import DATA_FILE, apply_op, encode_op, export_json, open_store
+
+# === 基准参数 ===
+BENCH_SIZES = (1000, 10000, 100000, 1000000)
+BENCH_GROUPS = 20
+BENCH_REPEAT = 5
+BENCH_TOLERANCE = 0.20  # 中位数比基线慢 20% 以上算退化
+BENCH_NOISE_MS = 1.0  # 与基线相差不到 1ms 的不算退化，避免极短的用例因抖动误报
+BENCH_NOTE_EVERY = 10  # 每 10 条中有 1 条带备注，接近真实收藏
+XVFB_SCREEN = "1280x800x24"
+
+
+def make_library(size, groups):
+    # 平均分到各分组；网址带上序号保证互不重复，主机名有重复以接近真实分布
+    data = {}
+    per_group = -(-size // groups)
+    for g in range(groups):
+        start = g * per_group
+        data[f"分组 {g:03d}"] = [
+            {"name": f"站点 {i}", "url": f"https://site{i % 5000}.example.com/page/{i}",
+             "note": f"备注 {i}" if i % BENCH_NOTE_EVERY == 0 else ""}
+            for i in range(start, min(size, start + per_group))]
+    return data
+
+
+def timed(fn, repeat, setup=None):
+    # setup 不计入耗时；返回各次耗时的统计（毫秒）
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"runs": repeat, "min_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3),
+            "max_ms": round(max(samples), 3)}
+
+
+def largest_group(data):
+    return max(data.keys(), key=lambda g: len(data[g]))
+
+
+# === 数据层 ===
+def bench_store(path, storage, repeat):
+    results = {}
+    store = open_store(path, storage)  # SQLite 模式第一次打开时从 JSON 迁移，不计入
+    store.load()
+    store.close()
+
+    def load():
+        nonlocal store
+        store = open_store(path, storage)
+        store.load()
+
+    results["load"] = timed(load, repeat, setup=lambda: store.close())
+    data = store.data
+    group = largest_group(data)
+    last = len(data[group]) - 1
+    op = {"op": "edit", "group": group, "index": 0, "site": {"note": "基准"}}
+    apply_op(data, op)
+    # 单条修改的写盘路径：日志追加一行并 fsync（SQLite 为一次提交）
+    results["save_op"] = timed(lambda: store.write_batch([encode_op(op, store.writer)]), repeat)
+    # 整体写快照（SQLite 模式下数据已在库中，只是一次提交）
+    results["save_snapshot"] = timed(lambda: store.compact(store.snapshot()), repeat)
+    # 把分组第一条移到末尾：原来 sync_data_order 负责的数据顺序调整，现在是一条 move 操作
+    results["move_op"] = timed(lambda: apply_op(data, {"op": "move", "group": group, "index": 0, "to": last}),
+                               repeat)
+    names = [group, group + " 改名"]
+
+    def rename():
+        apply_op(data, {"op": "rename_group", "group": names[0], "name": names[1]})
+        names.reverse()
+
+    results["rename_group_op"] = timed(rename, repeat)
+    store.close()
+    return results
+
+
+# === 内存 ===
+class DictSite(dict):
+    """改为 __slots__ 记录之前的网站记录：dict 子类加一个 uid 槽，作为内存对比的基准。"""
+    __slots__ = ("uid",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.uid = next(_dict_uids)
+
+
+_dict_uids = itertools.count(1)
+
+
+def traced_bytes(build):
+    # build() 返回的对象常驻的字节数；过程中的临时对象（如 json 解析出的中间 dict）已释放，不计入
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, kept
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(path, size):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    results = {}
+    for case, build in (
+            ("dict", lambda: {g: [DictSite(s) for s in sites] for g, sites in json.loads(raw).items()}),
+            ("site", lambda: open_store(path, "json").load())):
+        total, kept = traced_bytes(build)
+        results[case] = {"bytes": total, "bytes_per_site": round(total / size, 1)}
+        del kept
+    return results
+
+
+# === 界面层 ===
+def start_xvfb():
+    # Linux 上没有 DISPLAY 时启动虚拟 X 服务器，由它自己挑一个空闲的显示编号；返回进程或 None
+    if not sys.platform.startswith("linux") or os.environ.get("DISPLAY"):
+        return None
+    exe = shutil.which("Xvfb")
+    if not exe:
+        raise RuntimeError("没有 DISPLAY，也找不到 Xvfb")
+    read_fd, write_fd = os.pipe()
+    proc = subprocess.Popen([exe, "-displayfd", str(write_fd), "-screen", "0", XVFB_SCREEN, "-nolisten", "tcp"],
+                            pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        display = f.readline().strip()
+    if not display:
+        proc.kill()
+        raise RuntimeError("Xvfb 启动失败")
+    os.environ["DISPLAY"] = f":{display}"
+    return proc
+
+
+def bench_gui(workdir, repeat):
+    # 在 workdir（其中已有 DATA_FILE）里启动完整的主窗口；每次计时都包含 update_idletasks，即实际重绘
+    import tkinter as tk
+    import web_manager_2 as gui
+
+    results = {}
+    gui.ANIMATOR.reduce_motion = True
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    root = tk.Tk()
+    try:
+        started = time.perf_counter()
+        app = gui.WebManagerApp(root, "json", fade=False)
+        app.favicons.fetch = lambda origin: b""  # 不联网下载图标
+        while not app.ready:
+            root.update()
+            time.sleep(0.001)
+        root.update_idletasks()
+        results["startup"] = {"runs": 1, "min_ms": round((time.perf_counter() - started) * 1000, 3)}
+        results["startup"]["median_ms"] = results["startup"]["max_ms"] = results["startup"]["min_ms"]
+
+        def call(fn, *args):
+            def run():
+                fn(*args)
+                root.update_idletasks()
+            return run
+
+        group = largest_group(app.data)
+        other = next(g for g in app.data if g != group)
+
+        def switch_away():
+            app.refresh_site_list(other)
+            root.update_idletasks()
+
+        results["refresh_site_list"] = timed(call(app.refresh_site_list, group), repeat, setup=switch_away)
+        results["refresh_site_list_same"] = timed(call(app.refresh_site_list, group), repeat)
+        results["refresh_group_list"] = timed(call(app.refresh_group_list), repeat)
+
+        app.current_active_group = group
+        app.refresh_site_list(group)
+        root.update_idletasks()
+
+        def pick_first():
+            app.context_item_site = gui.site_iid(app.site_source[0])
+
+        results["move_item"] = timed(call(app.move_item, app.site_tree, False, "down"), repeat, setup=pick_first)
+
+        # 重命名对话框换成直接给出新名字，来回改名
+        names = [group, group + " 改名"]
+        ask = gui.simpledialog.askstring
+        gui.simpledialog.askstring = lambda *a, **k: names[1]
+
+        def pick_group():
+            app.context_item_group = names[0]
+
+        def rename():
+            app.rename_group()
+            root.update_idletasks()
+            names.reverse()
+
+        try:
+            results["rename_group"] = timed(rename, repeat, setup=pick_group)
+        finally:
+            gui.simpledialog.askstring = ask
+        app.persist.drain()
+    finally:
+        root.destroy()
+        os.chdir(cwd)
+    return results
+
+
+# === 结果比较 ===
+def compare(results, baseline, tolerance):
+    # 返回 [(用例, 基线值, 本次值, 单位, 是否退化)]，只比较双方都有的用例；耗时比中位数，内存比每条字节数
+    rows = []
+    for key, now in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        metric, unit, noise = ("median_ms", "ms", BENCH_NOISE_MS) if "median_ms" in now else ("bytes_per_site", "B", 0)
+        worse = now[metric] - base[metric]
+        regressed = worse > noise and now[metric] > base[metric] * (1 + tolerance)
+        rows.append((key, base[metric], now[metric], unit, regressed))
+    return rows
+
+
+def run(args):
+    results = {}
+    xvfb = None
+    gui_ok = not args.no_gui
+    if gui_ok:
+        try:
+            xvfb = start_xvfb()
+        except RuntimeError as e:
+            print(f"⚠️ 跳过界面基准: {e}", file=sys.stderr)
+            gui_ok = False
+    try:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory(prefix="bookmark-bench-") as workdir:
+                path = os.path.join(workdir, DATA_FILE)
+                export_json(make_library(size, args.groups), path)
+                if args.memory:
+                    for case, stats in bench_memory(path, size).items():
+                        results[f"memory/{case}/{size}"] = stats
+                        print(f"memory/{case}/{size}: {stats['bytes_per_site']:.1f} B/条", file=sys.stderr)
+                for storage in args.storage:
+                    for case, stats in bench_store(path, storage, args.repeat).items():
+                        results[f"{storage}/{case}/{size}"] = stats
+                        print(f"{storage}/{case}/{size}: {stats['median_ms']:.2f} ms", file=sys.stderr)
+                if gui_ok:
+                    for storage_file in os.listdir(workdir):
+                        if storage_file != DATA_FILE:
+                            os.remove(os.path.join(workdir, storage_file))  # 界面用 JSON 模式，去掉 SQLite 文件和日志
+                    for case, stats in bench_gui(workdir, args.repeat).items():
+                        results[f"tk/{case}/{size}"] = stats
+                        print(f"tk/{case}/{size}: {stats['median_ms']:.2f} ms", file=sys.stderr)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Web Manager Pro 性能基准")
+    parser.add_argument("--sizes", default=",".join(map(str, BENCH_SIZES)),
+                        type=lambda s: [int(n) for n in s.split(",")], help="收藏库规模（网站总数），逗号分隔")
+    parser.add_argument("--groups", type=int, default=BENCH_GROUPS, help="分组数")
+    parser.add_argument("--repeat", type=int, default=BENCH_REPEAT, help="每个用例重复次数，取中位数")
+    parser.add_argument("--storage", default="json", type=lambda s: s.split(","),
+                        help="数据层基准的存储模式，逗号分隔：json,sqlite")
+    parser.add_argument("--no-gui", action="store_true", help="只跑数据层基准")
+    parser.add_argument("--memory", action="store_true", help="同时统计每条网站记录常驻的内存（较慢）")
+    parser.add_argument("--out", metavar="PATH", help="结果 JSON 的保存路径（默认输出到标准输出）")
+    parser.add_argument("--baseline", metavar="PATH", help="与之前保存的结果比较，出现退化时退出码为 1")
+    parser.add_argument("--tolerance", type=float, default=BENCH_TOLERANCE, help="允许变慢的比例")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "groups": args.groups, "repeat": args.repeat},
+        "results": run(args),
+    }
+    raw = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(raw + "\n")
+    else:
+        print(raw)
+    if not args.baseline:
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)["results"]
+    rows = compare(report["results"], baseline, args.tolerance)
+    for key, base, now, unit, regressed in rows:
+        mark = "❌" if regressed else "  "
+        print(f"{mark} {key:<40}{base:10.2f} → {now:10.2f} {unit:<2}  ({now / base if base else 0:5.2f}x)",
+              file=sys.stderr)
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{len(rows)} 项与基线比较，{regressions} 项退化", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""收藏库命令行：python bookmark_cli.py <命令> ...
+
+只依赖 bookmark_core，不加载 tkinter。每条命令的全部修改合并为一次写盘；
+界面运行时也可以使用，界面会在一秒内显示命令行做的修改。
+"""
+import argparse
+import json
+import sys
+
+from bookmark_core import DATA_FILE, SEARCH_LIMIT, BookmarkStore
+
+
+def read_lines(stream):
+    return [line.rstrip("\r\n") for line in stream if line.strip()]
+
+
+def urls_from(args):
+    return list(args.urls) + (read_lines(sys.stdin) if args.stdin else [])
+
+
+def print_sites(rows, as_json):
+    # rows: [(分组名, 网站记录)]
+    if as_json:
+        json.dump([dict(site, group=group) for group, site in rows], sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+    for group, site in rows:
+        print(f"{group}\t{site['name']}\t{site['url']}\t{site.get('note', '')}")
+
+
+def cmd_list(store, args):
+    if args.group is None:
+        for group in store.groups():
+            print(f"{group}\t{len(store.data[group])}")
+    else:
+        print_sites([(args.group, site) for site in store.sites(args.group)], args.json)
+
+
+def cmd_add(store, args):
+    # --stdin 时每行为 "分组<TAB>名称<TAB>网址[<TAB>备注]"
+    rows = []
+    if args.url:
+        rows.append((args.group, args.name, args.url, args.note))
+    if args.stdin:
+        for line in read_lines(sys.stdin):
+            parts = line.split("\t")
+            if len(parts) < 3:
+                print(f"⚠️ 跳过格式不对的行: {line}", file=sys.stderr)
+                continue
+            rows.append((parts[0], parts[1], parts[2], parts[3] if len(parts) > 3 else ""))
+    with store.batch():
+        for group, name, url, note in rows:
+            store.add_site(group, name, url, note)
+    print(f"已添加 {len(rows)} 个网站")
+
+
+def cmd_delete(store, args):
+    print(f"已删除 {store.delete_urls(urls_from(args), args.group)} 个网站")
+
+
+def cmd_move(store, args):
+    print(f"已移动 {store.move_urls(urls_from(args), args.to, args.group)} 个网站到 '{args.to}'")
+
+
+def cmd_search(store, args):
+    print_sites(store.search(args.query, args.limit), args.json)
+
+
+def cmd_import(store, args):
+    with store.batch():
+        for path in args.files:
+            imported, skipped = store.import_file(path)
+            print(f"{path}: 导入 {imported} 条，跳过重复 {skipped} 条")
+
+
+def cmd_export(store, args):
+    store.export_json(args.path)
+    print(f"已导出到 {args.path}")
+
+
+def cmd_dedupe(store, args):
+    if args.dry_run:
+        for key, entries in store.duplicates():
+            print(key)
+            for group, site in entries:
+                print(f"  [{group}] {site['name']}")
+        return
+    print(f"已删除 {store.dedupe()} 条重复的网站")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Web Manager Pro 命令行")
+    parser.add_argument("--data", default=DATA_FILE, help=f"数据文件（默认 {DATA_FILE}）")
+    parser.add_argument("--storage", choices=("json", "sqlite"),
+                        help="存储模式；默认存在对应的 .db 文件时使用 SQLite，否则使用 JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="列出分组，或列出某个分组的网站")
+    p.add_argument("group", nargs="?")
+    p.add_argument("--json", action="store_true", help="以 JSON 输出")
+    p.set_defaults(func=cmd_list)
+
+    p = add_parser = sub.add_parser("add", help="添加网站（分组不存在时自动创建）")
+    p.add_argument("group", nargs="?")
+    p.add_argument("name", nargs="?")
+    p.add_argument("url", nargs="?")
+    p.add_argument("--note", default="")
+    p.add_argument("--stdin", action="store_true", help="从标准输入批量读取：分组<TAB>名称<TAB>网址[<TAB>备注]")
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser("delete", help="按网址删除网站（忽略跟踪参数等差异）")
+    p.add_argument("urls", nargs="*")
+    p.add_argument("--group", help="只在该分组中查找")
+    p.add_argument("--stdin", action="store_true", help="从标准输入读取网址，每行一个")
+    p.set_defaults(func=cmd_delete)
+
+    p = sub.add_parser("move", help="按网址把网站移到另一个分组末尾")
+    p.add_argument("urls", nargs="*")
+    p.add_argument("--to", required=True, help="目标分组（不存在时自动创建）")
+    p.add_argument("--group", help="只在该分组中查找")
+    p.add_argument("--stdin", action="store_true", help="从标准输入读取网址，每行一个")
+    p.set_defaults(func=cmd_move)
+
+    p = sub.add_parser("search", help="在名称、网址、备注中搜索")
+    p.add_argument("query")
+    p.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    p.add_argument("--json", action="store_true", help="以 JSON 输出")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("import", help="导入浏览器书签（Netscape HTML 或 Chrome Bookmarks 文件）")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="导出为 JSON 文件")
+    p.add_argument("path")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("dedupe", help="删除重复的网址，每个只保留最先出现的一条")
+    p.add_argument("--dry-run", action="store_true", help="只列出重复项，不删除")
+    p.set_defaults(func=cmd_dedupe)
+    args = parser.parse_args(argv)
+    if args.command == "add":
+        given = [args.group, args.name, args.url]
+        if any(given) and not all(given):
+            add_parser.error("需要同时给出 分组 名称 网址")
+        if not any(given) and not args.stdin:
+            add_parser.error("请给出 分组 名称 网址，或使用 --stdin 批量添加")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with BookmarkStore(args.data, args.storage) as store:
+        args.func(store, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
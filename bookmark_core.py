@@ -0,0 +1,1857 @@
+"""收藏数据的核心：数据模型、操作日志、存储引擎、搜索、去重和书签导入。
+
+不依赖 tkinter，脚本可以直接导入 BookmarkStore 读写收藏（命令行见 bookmark_cli.py）；
+界面 web_manager_2.py 也建立在这些函数之上，两者的文件格式和锁完全相同。
+"""
+import json
+import os
+import itertools
+import bisect
+import hashlib
+import math
+import time
+import threading
+import sqlite3
+import re
+import heapq
+import contextlib
+from collections import deque
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_FILE = "bookmarks.json"  # 默认的数据文件（与程序同目录）
+
+# === 存储配置 ===
+JOURNAL_SUFFIX = ".journal"  # 操作日志文件 = 数据文件名 + 后缀
+LOCK_SUFFIX = ".lock"  # 多个实例共用数据文件时的锁文件
+COMPACT_THRESHOLD = 1000  # 日志累计多少条操作后合并成新快照
+SQLITE_PAGE_SIZE = 200  # SQLite 模式下每次从数据库读取的行数
+SQLITE_VERSION = 1  # 数据库结构版本（PRAGMA user_version）：1 起带规范网址表和全文索引表
+SQLITE_IN_BATCH = 500  # 按网址批量查询时每条 SQL 带的参数个数，低于 SQLite 的参数上限
+
+# === 搜索配置 ===
+SEARCH_LIMIT = 500  # 搜索结果最多显示的条数
+SEARCH_STOPWORDS = {"http", "https", "www"}  # 网址里几乎每条都有、没有区分度的词
+SEARCH_SCAN_BELOW = 2  # 短于该长度的英文前缀（如单个字母）命中的记录很多时不合并倒排表，改为逐条扫描
+
+# === 导入配置 ===
+IMPORT_CHUNK = 1 << 16  # 每次从导入文件读取的字节数
+IMPORT_BATCH = 2000  # 每次在主线程提交的书签条数
+IMPORT_DEFAULT_GROUP = "导入的书签"  # 不在任何文件夹中的书签放入该分组
+
+# === 去重配置 ===
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "spm", "share_source",
+                   "share_medium", "vd_source", "from_source", "ref_src"}  # 比较网址时忽略的跟踪参数
+TRACKING_PREFIXES = ("utm_",)
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+# === 使用统计配置 ===
+USAGE_SUFFIX = ".usage"  # 打开记录文件 = 数据文件名（去掉扩展名）+ 后缀 + .log / .json
+USAGE_HALF_LIFE = 14 * 86400  # 常用度的半衰期（秒）：两周前的一次打开只抵现在的半次
+USAGE_COMPACT_EVENTS = 2000  # 日志累计多少条打开记录后并入快照
+
+# === 撤销配置 ===
+UNDO_BUDGET = 200000  # 撤销历史的内存预算（按操作条数和保存的网站数计），可用 --undo-budget 调整
+UNDO_MAX_STEPS = 500  # 最多可撤销的步数
+
+
+# === 数据模型 ===
+_site_uids = itertools.count(1)
+
+
+class Site:
+    """网站记录：__slots__ 对象，每条只占固定的几个槽位，百万级收藏时比 dict 省下大半内存。
+
+    对外仍按 dict 的方式读写（site["url"]、get、update、dict(site)），写 JSON 时由 site_json 转换。
+    空备注共用同一个 "" 对象；uid 是仅存在于内存中的唯一编号。
+    """
+    __slots__ = ("name", "url", "note", "uid")
+    FIELDS = ("name", "url", "note")
+
+    def __init__(self, fields=None, **kwargs):
+        if fields is None:
+            fields = kwargs
+        elif kwargs:
+            fields = dict(fields, **kwargs)
+        self.name = fields.get("name", "")
+        self.url = fields.get("url", "")
+        self.note = fields.get("note") or ""
+        self.uid = next(_site_uids)
+
+    def __getitem__(self, key):
+        if key not in Site.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in Site.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, (value or "") if key == "note" else value)
+
+    def __contains__(self, key):
+        return key in Site.FIELDS
+
+    def __iter__(self):
+        return iter(Site.FIELDS)
+
+    def __len__(self):
+        return len(Site.FIELDS)
+
+    def __repr__(self):
+        return f"Site({self.as_dict()!r})"
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in Site.FIELDS else default
+
+    def keys(self):
+        return Site.FIELDS
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in Site.FIELDS]
+
+    def update(self, fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    def as_dict(self):
+        return {"name": self.name, "url": self.url, "note": self.note}
+
+
+def site_json(obj):
+    # json.dumps 的 default：网站记录写成原来的 {"name", "url", "note"}
+    if isinstance(obj, Site):
+        return obj.as_dict()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def make_site(name, url, note=""):
+    return Site(name=name, url=url, note=note)
+
+
+def find_site(sites, site):
+    index_of = getattr(sites, "index_of", None)
+    if index_of is not None:  # SQLite 分组由数据库直接给出下标
+        return index_of(site)
+    # 按对象身份查找下标（内容相同的两条记录也能区分）
+    for i, s in enumerate(sites):
+        if s is site:
+            return i
+    raise ValueError("site not in list")
+
+
+def default_data():
+    return {"常用工具": [make_site("Google", "https://www.google.com")], "学习资料": [], "娱乐": []}
+
+
+# === 数据操作 ===
+# 所有修改都表示为一条可序列化的操作记录，界面修改与日志回放走同一个 apply_op：
+#   add / edit / delete / move          -> 分组内的网站
+#   transfer                            -> 把网站移到另一个分组的指定位置
+#   add_group / delete_group / rename_group / move_group -> 分组本身
+#   restore_group                       -> 撤销删除分组：把整组网站放回原位置
+#   batch                               -> 一组操作作为一个整体写入日志（一行），回放时要么全部生效要么都不生效
+# 针对某个网站的操作带有 match（该网站的网址）：多个实例共用一份数据时下标可能已被别的实例移动，
+# 下标处的网址对不上时按网址重新定位，找不到（已被删除）时该操作作废
+def _reorder_groups(data, items):
+    # 原地重排 dict，保持 self.data 对象不变
+    data.clear()
+    data.update(items)
+
+
+SITE_OPS = ("edit", "delete", "move", "transfer")
+
+
+def with_match(data, op):
+    if op["op"] in SITE_OPS and "match" not in op:
+        op["match"] = data[op["group"]][op["index"]]["url"]
+    return op
+
+
+def resolve_index(sites, op):
+    index = op["index"]
+    match = op.get("match")
+    if match is None or (0 <= index < len(sites) and sites[index]["url"] == match):
+        return index
+    for i, site in enumerate(sites):
+        if site["url"] == match:
+            op["index"] = i  # 索引等监听者按 op["index"] 读取，写回定位后的下标
+            return i
+    raise IndexError(f"site moved away: {match}")
+
+
+def apply_op(data, op):
+    if op["op"] == "batch":
+        return [apply_op(data, o) for o in op["ops"]]
+    if not isinstance(data, dict):
+        return data.apply_op(op)  # SQLite 模式由数据库自行执行
+    kind = op["op"]
+    group = op.get("group")
+    if kind == "add":
+        sites = data[group]
+        site = Site(op["site"])
+        sites.insert(op.get("index", len(sites)), site)
+        return site
+    if kind in SITE_OPS:
+        sites = data[group]
+        index = resolve_index(sites, op)
+    if kind == "edit":
+        site = sites[index]
+        old = site.as_dict()
+        site.update(op["site"])
+        return old
+    if kind == "delete":
+        return sites.pop(index)
+    if kind == "move":
+        sites.insert(op["to"], sites.pop(index))
+        return None
+    if kind == "transfer":
+        target = data[op["to_group"]]
+        site = sites.pop(index)
+        target.insert(op["to"], site)
+        return site
+    if kind == "add_group":
+        if group in data: raise ValueError(f"group exists: {group}")
+        data[group] = []
+        return None
+    if kind == "delete_group":
+        return data.pop(group)
+    if kind == "rename_group":
+        name = op["name"]
+        if name in data: raise ValueError(f"group exists: {name}")
+        _reorder_groups(data, [(name if k == group else k, v) for k, v in list(data.items())])
+        return None
+    if kind == "move_group":
+        items = list(data.items())
+        keys = [k for k, _ in items]
+        moved = items.pop(keys.index(group))
+        items.insert(op["index"], moved)
+        _reorder_groups(data, items)
+        return None
+    if kind == "restore_group":
+        if group in data: raise ValueError(f"group exists: {group}")
+        sites = [s if isinstance(s, Site) else Site(s) for s in op["sites"]]
+        items = list(data.items())
+        items.insert(op["index"], (group, sites))
+        _reorder_groups(data, items)
+        return sites
+    raise ValueError(f"unknown op: {kind}")
+
+
+def inverse_op(data, op):
+    # 在应用 op 之前调用，返回能把数据恢复原状的逆操作；只记录被改动的部分，不复制整个数据
+    kind = op["op"]
+    group = op.get("group")
+    if kind == "add":
+        return {"op": "delete", "group": group, "index": op.get("index", len(data[group])), "match": op["site"]["url"]}
+    if kind == "edit":
+        site = data[group][op["index"]]
+        return {"op": "edit", "group": group, "index": op["index"], "match": op["site"].get("url", site["url"]),
+                "site": {k: site.get(k, "") for k in op["site"]}}
+    if kind == "delete":
+        return {"op": "add", "group": group, "index": op["index"], "site": data[group][op["index"]].as_dict()}
+    if kind == "move":
+        return {"op": "move", "group": group, "index": op["to"], "to": op["index"],
+                "match": data[group][op["index"]]["url"]}
+    if kind == "transfer":
+        return {"op": "transfer", "group": op["to_group"], "index": op["to"], "to_group": group, "to": op["index"],
+                "match": data[group][op["index"]]["url"]}
+    if kind == "add_group":
+        return {"op": "delete_group", "group": group}
+    if kind == "delete_group":
+        sites = data[group]
+        # 内存中的分组列表被删除后不会再改动，直接引用即可；SQLite 分组视图需要先读出来
+        return {"op": "restore_group", "group": group, "index": list(data.keys()).index(group),
+                "sites": sites if isinstance(sites, list) else list(sites)}
+    if kind == "restore_group":
+        return {"op": "delete_group", "group": group}
+    if kind == "rename_group":
+        return {"op": "rename_group", "group": op["name"], "name": group}
+    if kind == "move_group":
+        return {"op": "move_group", "group": group, "index": list(data.keys()).index(group)}
+    raise ValueError(f"unknown op: {kind}")
+
+
+def op_cost(op):
+    # 撤销历史的内存估算：每条操作计 1，逆操作中保存的每个网站（恢复整个分组时）再各计 1
+    return 1 + len(op.get("sites", ())) + sum(op_cost(o) for o in op.get("ops", ()))
+
+
+class UndoHistory:
+    """撤销 / 重做栈：每一步记录 (说明, 操作, 逆操作)，不保存数据副本。
+
+    budget 按 op_cost 计算两个栈的总占用，超出时从最早的一步开始丢弃；
+    最新的一步总会保留，即使它本身就超出预算（例如删除了一个很大的分组）。
+    """
+
+    def __init__(self, budget=UNDO_BUDGET, max_steps=UNDO_MAX_STEPS):
+        self.budget = budget
+        self.max_steps = max_steps
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.cost = 0
+
+    def record(self, label, ops, inverse):
+        self.cost -= sum(e[3] for e in self.redo_stack)
+        self.redo_stack.clear()
+        entry = (label, ops, inverse, sum(map(op_cost, ops)) + sum(map(op_cost, inverse)))
+        self.undo_stack.append(entry)
+        self.cost += entry[3]
+        while len(self.undo_stack) > 1 and (self.cost > self.budget or len(self.undo_stack) > self.max_steps):
+            self.cost -= self.undo_stack.popleft()[3]
+
+    def undo(self):
+        if not self.undo_stack: return None
+        entry = self.undo_stack.pop()
+        self.redo_stack.append(entry)
+        return entry[:3]
+
+    def redo(self):
+        if not self.redo_stack: return None
+        entry = self.redo_stack.pop()
+        self.undo_stack.append(entry)
+        return entry[:3]
+
+
+def merge_groups(data, new):
+    # 把重新读取的数据合并进 data（原地修改）：内容没变的分组沿用原列表，保持行 iid 不变
+    items = []
+    changed = set(data) - set(new)
+    for group, sites in new.items():
+        old = data.get(group)
+        if old is not None and [(s["name"], s["url"], s.get("note", "")) for s in old] == \
+                [(s["name"], s["url"], s.get("note", "")) for s in sites]:
+            sites = old
+        else:
+            changed.add(group)
+        items.append((group, sites))
+    _reorder_groups(data, items)
+    return changed
+
+
+# === 存储引擎 ===
+def atomic_write(path, raw):
+    # 先写临时文件并 fsync，再原子替换，崩溃时旧文件保持完整
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class FileLock:
+    """跨进程的建议锁：对 <数据文件>.lock 加 flock（Windows 上用 msvcrt.locking），同一进程内可重入。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        self.depth = 0
+        self.local = threading.RLock()
+
+    def __enter__(self):
+        self.local.acquire()
+        if self.depth == 0:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    while True:
+                        try:
+                            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)  # 自带约 10 秒的重试
+                            break
+                        except OSError:
+                            pass
+            except BaseException:
+                os.close(fd)
+                self.local.release()
+                raise
+            self.fd = fd
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+        if self.depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self.fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self.fd)
+                self.fd = None
+        self.local.release()
+
+
+def file_stat(path):
+    # 判断文件是否被替换过：原子替换会换 inode，同一文件被改写会变 mtime / 大小
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class JournalStore:
+    """快照 + 追加式操作日志。
+
+    快照就是原来的 bookmarks.json（格式不变，旧文件可直接读取）；每次修改只向
+    bookmarks.json.journal 追加一行操作记录。日志首行记录它所基于的快照的 sha1，
+    这样即使在合并过程中崩溃，也不会把已经并入快照的日志重复回放。
+
+    多个实例可以同时打开同一份数据：所有写入都在 FileLock 下进行，日志行带上写入者
+    标识 (by)；read_changes() 读出其他实例追加的操作交给界面应用。只有确认快照里已经
+    包含日志中全部他人操作时才合并快照，因此任何一方的修改都不会被覆盖。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.file_lock = FileLock(path + LOCK_SUFFIX)
+        self.sync_lock = threading.RLock()  # 保护 read_pos / base：后台写线程与主线程读取变更之间
+        self.writer = f"{os.getpid()}-{os.urandom(4).hex()}"
+        self.data = None
+        self.base = None  # 当前快照内容的 sha1；None 表示磁盘上还没有可用快照
+        self.disk_stat = None  # 最近一次读取 / 写入快照后快照文件的状态，变化说明别的实例合并过
+        self.read_pos = 0  # 日志中已经读过（已体现在 self.data 里）的字节数
+        self.generation = 0  # 本实例每合并一次快照加一
+        self.journal = None
+        self.journal_ops = 0
+        self.unsynced = 0
+        self.bytes_written = 0  # 日志和快照累计写入的字节数（后台写线程累加）
+
+    def load(self):
+        with self.file_lock:
+            self.data = self.read()
+        return self.data
+
+    def read(self):
+        # 读取快照并回放日志；调用方持有 file_lock
+        data = None
+        self.base = None
+        self.disk_stat = file_stat(self.path)
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    raw = f.read()
+                data = {group: [Site(site) for site in sites] for group, sites in json.loads(raw).items()}
+                self.base = hashlib.sha1(raw).hexdigest()
+            except (OSError, ValueError, TypeError, AttributeError):
+                data = None
+        self.data = data if data is not None else default_data()
+        self.journal_ops = 0
+        self.read_pos = 0
+        replayed = self.replay()
+        if replayed is False:
+            self.compact()  # 日志末尾不完整：立即合并，避免后续追加接在半行后面
+        elif replayed is None and self.base is not None:
+            # 日志属于更早的快照（合并过程中崩溃）：换成新的空日志，之后的追加才能被回放
+            self.reset_journal()
+        return self.data
+
+    def replay(self):
+        if self.base is None or not os.path.exists(self.journal_path):
+            return None
+        with open(self.journal_path, 'rb') as f:
+            first = f.readline()
+            try:
+                header = json.loads(first)
+            except ValueError:
+                return False
+            if header.get("base") != self.base:
+                return None  # 日志属于更早的快照，内容已经合并过
+            pos = len(first)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return False  # 崩溃时写了一半的最后一行
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    return False
+                try:
+                    apply_op(self.data, op)
+                except (KeyError, IndexError, ValueError, TypeError):
+                    pass  # 与其他实例的修改冲突（如目标已被删除），该操作作废
+                pos += len(line)
+                self.journal_ops += 1
+        self.read_pos = pos
+        return True
+
+    def reload(self):
+        # 其他实例合并过快照后整体重新读取；调用方需先把本实例尚未写盘的修改写完
+        with self.file_lock, self.sync_lock:
+            self.close_journal()
+            data = self.data
+            new = self.read()
+            self.data = data  # self.data 与界面共用同一个 dict，由调用方把 new 合并进去
+            return new
+
+    def read_changes(self):
+        # 主线程定期调用：返回其他实例追加的操作列表；返回 None 表示需要 reload()
+        if file_stat(self.path) != self.disk_stat:
+            return None
+        st = file_stat(self.journal_path)
+        if st is None or st[1] <= self.read_pos:
+            return []
+        if not self.sync_lock.acquire(blocking=False):
+            return []  # 后台线程正在合并快照，下次再读
+        try:
+            if file_stat(self.path) != self.disk_stat:
+                return None
+            try:
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(self.read_pos)
+                    chunk = f.read()
+            except OSError:
+                return []
+            end = chunk.rfind(b"\n") + 1  # 只取完整的行，正在写入的半行留到下次
+            self.read_pos += end
+            ops = []
+            for line in chunk[:end].splitlines():
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    continue
+                if "op" in op and op.get("by") != self.writer:
+                    ops.append(op)
+                    self.journal_ops += 1
+            return ops
+        finally:
+            self.sync_lock.release()
+
+    def foreign_since(self, pos):
+        # 日志中 pos 之后是否有其他实例写入的操作；调用方持有 file_lock
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(pos)
+                for line in f:
+                    try:
+                        if json.loads(line).get("by") != self.writer:
+                            return True
+                    except ValueError:
+                        return True
+        except OSError:
+            pass
+        return False
+
+    def open_journal(self):
+        # 别的实例合并快照时会换掉日志文件：追加前确认句柄仍指向当前文件
+        if self.journal is not None:
+            st = file_stat(self.journal_path)
+            if st is None or st[0] != os.fstat(self.journal.fileno()).st_ino:
+                self.close_journal()
+        if self.journal is None:
+            if not os.path.exists(self.journal_path):
+                if file_stat(self.path) == self.disk_stat:
+                    if self.base is None:
+                        return False  # 磁盘上还没有快照，直接合并
+                    self.reset_journal()
+                else:  # 别的实例刚写了快照、还没建日志：日志要基于它的快照，之后由 reload() 读入
+                    with open(self.path, 'rb') as f:
+                        atomic_write(self.journal_path, self.journal_header(hashlib.sha1(f.read()).hexdigest()))
+            self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        return True
+
+    def journal_header(self, base=None):
+        return (json.dumps({"base": base or self.base}) + "\n").encode('utf-8')
+
+    def reset_journal(self):
+        header = self.journal_header()
+        with self.sync_lock:
+            atomic_write(self.journal_path, header)
+            self.bytes_written += len(header)
+            self.read_pos = len(header)
+            self.journal_ops = 0
+
+    def needs_compact(self, pending=0):
+        return self.base is None or self.journal_ops + pending >= COMPACT_THRESHOLD
+
+    def write_lines(self, lines):
+        raw = "".join(lines)
+        self.journal.write(raw)
+        self.journal.flush()
+        self.bytes_written += len(raw.encode('utf-8'))
+        self.journal_ops += len(lines)
+        self.unsynced += len(lines)
+
+    def write_batch(self, lines, snapshot=None):
+        # 供后台线程调用：先把操作追加进日志（任何情况下都不会丢），再视情况用 snapshot 合并快照
+        with self.file_lock:
+            journaled = self.open_journal()
+            if journaled and lines:
+                self.write_lines(lines)
+                self.sync()
+            if snapshot is not None and (not journaled or self.can_compact(snapshot)):
+                self.compact(snapshot)
+
+    def can_compact(self, snapshot):
+        # 快照取自主线程读到 read_pos 时的数据：之后日志里若还有别人的操作，快照里就没有它们，这次先不合并
+        _, pos, generation = snapshot
+        if generation != self.generation or file_stat(self.path) != self.disk_stat:
+            return False
+        return not self.foreign_since(pos)
+
+    def sync(self):
+        if self.journal is not None and self.unsynced:
+            os.fsync(self.journal.fileno())
+        self.unsynced = 0
+
+    def begin(self):
+        pass  # 日志中的操作回放时按网址重新定位，一批修改开始前不必加锁
+
+    def snapshot(self):
+        with self.sync_lock:
+            return snapshot_data(self.data), self.read_pos, self.generation
+
+    def compact(self, snapshot=None):
+        data = self.data if snapshot is None else snapshot[0]
+        raw = json.dumps(data, ensure_ascii=False, indent=4, default=site_json).encode('utf-8')
+        with self.file_lock:
+            atomic_write(self.path, raw)
+            self.bytes_written += len(raw)
+            with self.sync_lock:
+                self.base = hashlib.sha1(raw).hexdigest()
+                self.disk_stat = file_stat(self.path)
+                self.generation += 1
+                self.close_journal()
+                self.reset_journal()
+                self.unsynced = 0
+
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def close(self):
+        if self.journal is not None:
+            self.sync()
+            self.close_journal()
+
+
+# === 全文搜索 ===
+CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+")
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    # 中日韩文字没有空格分词，用单字 + 相邻双字 (n-gram) 建索引；其余文字按单词切分
+    text = text.lower()
+    tokens = set()
+    for run in CJK_RE.findall(text):
+        tokens.update(run)
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.update(w for w in WORD_RE.findall(CJK_RE.sub(" ", text)) if w not in SEARCH_STOPWORDS)
+    return tokens
+
+
+def query_terms(query):
+    # 返回 [(是否前缀匹配, 词)]；中文查询拆成双字必须全部命中，英文单词按前缀匹配
+    query = query.lower()
+    terms = []
+    for run in CJK_RE.findall(query):
+        if len(run) == 1:
+            terms.append((False, run))
+        else:
+            terms.extend((False, run[i:i + 2]) for i in range(len(run) - 1))
+    for word in WORD_RE.findall(CJK_RE.sub(" ", query)):
+        terms.append((True, word))
+    return terms
+
+
+def site_tokens(site):
+    return tokenize(" ".join((site["name"], site["url"], site.get("note", ""))))
+
+
+class GroupRef:
+    # 分组名的间接引用：重命名分组时只改这一处，不用逐条更新索引
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class SearchIndex:
+    """名称 / 网址 / 备注的倒排索引，随每条修改操作增量更新。"""
+
+    def __init__(self, data):
+        self.data = data
+        self.postings = {}  # 词 -> {uid}
+        self.vocab = []  # 排好序的词表，用于前缀匹配
+        self.tokens_of = {}  # uid -> 该记录的词集合
+        self.sites = {}  # uid -> 网站记录
+        self.group_of_uid = {}  # uid -> GroupRef
+        self.groups = {}  # 分组名 -> GroupRef
+        for group, sites in data.items():
+            ref = self.groups[group] = GroupRef(group)
+            for site in sites:
+                self.index_site(site, ref, sort=False)
+        self.vocab = sorted(self.postings)
+
+    def index_site(self, site, ref, sort=True):
+        tokens = site_tokens(site)
+        self.tokens_of[site.uid] = tokens
+        self.sites[site.uid] = site
+        self.group_of_uid[site.uid] = ref
+        for token in tokens:
+            uids = self.postings.get(token)
+            if uids is None:
+                uids = self.postings[token] = set()
+                if sort: bisect.insort(self.vocab, token)
+            uids.add(site.uid)
+
+    def unindex_site(self, site):
+        uid = site.uid
+        for token in self.tokens_of.pop(uid, ()):
+            uids = self.postings[token]
+            uids.discard(uid)
+            if not uids:
+                del self.postings[token]
+                del self.vocab[bisect.bisect_left(self.vocab, token)]
+        self.sites.pop(uid, None)
+        return self.group_of_uid.pop(uid, None)
+
+    def group_of(self, site):
+        return self.group_of_uid[site.uid].name
+
+    def apply(self, op, result):
+        kind = op["op"]
+        group = op.get("group")
+        if kind == "add":
+            self.index_site(result, self.groups[group])
+        elif kind == "edit":
+            site = self.data[group][op["index"]]
+            ref = self.unindex_site(site)
+            self.index_site(site, ref)
+        elif kind == "delete":
+            self.unindex_site(result)
+        elif kind == "add_group":
+            self.groups[group] = GroupRef(group)
+        elif kind == "delete_group":
+            for site in result:
+                self.unindex_site(site)
+            del self.groups[group]
+        elif kind == "transfer":
+            self.group_of_uid[result.uid] = self.groups[op["to_group"]]
+        elif kind == "restore_group":
+            ref = self.groups[group] = GroupRef(group)
+            for site in result:
+                self.index_site(site, ref, sort=False)
+            self.vocab = sorted(self.postings)  # 整组恢复时一次排序，比逐词插入快
+        elif kind == "rename_group":
+            ref = self.groups.pop(group)
+            ref.name = op["name"]
+            self.groups[ref.name] = ref
+
+    def prefix_range(self, token):
+        # 词表有序，相同前缀的词连续排列
+        return bisect.bisect_left(self.vocab, token), bisect.bisect_left(self.vocab, token + "\U0010ffff")
+
+    def lookup(self, prefix, token):
+        if not prefix:
+            return self.postings.get(token, ())
+        matched = set()
+        i, j = self.prefix_range(token)
+        for word in self.vocab[i:j]:
+            matched |= self.postings[word]
+        return matched
+
+    def dense(self, token):
+        # 前缀命中的记录超过四分之一时逐条扫描更快：平均检查不到 4 * limit 条就能凑满结果
+        i, j = self.prefix_range(token)
+        return sum(len(self.postings[word]) for word in self.vocab[i:j]) * 4 > len(self.sites)
+
+    def has_prefix(self, uid, short):
+        tokens = self.tokens_of[uid]
+        return all(any(t.startswith(p) for t in tokens) for p in short)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        short = [token for prefix, token in terms
+                 if prefix and len(token) < SEARCH_SCAN_BELOW and self.dense(token)]
+        sets = []
+        for prefix, token in terms:
+            if token in short:
+                continue
+            uids = self.lookup(prefix, token)
+            if not uids:
+                return []
+            sets.append(uids)
+        if not sets:
+            # 只有命中面很广的短前缀：按索引顺序逐条检查，凑满 limit 条就停
+            found = itertools.islice((uid for uid in self.sites if self.has_prefix(uid, short)), limit)
+            return [self.sites[uid] for uid in sorted(found)]
+        sets.sort(key=len)
+        result = set(sets[0])
+        for uids in sets[1:]:
+            result &= uids
+            if not result:
+                return []
+        if short:
+            result = [uid for uid in result if self.has_prefix(uid, short)]
+        return [self.sites[uid] for uid in heapq.nsmallest(limit, result)]
+
+
+# === 网址规范化与去重 ===
+def canonical_url(url):
+    """判断重复用的规范网址：不区分 http/https、忽略 www.、默认端口、末尾斜杠、锚点和跟踪参数，
+    剩余查询参数按名称排序。结果只用于比较，不会写回数据。"""
+    url = url.strip()
+    try:
+        parts = urlsplit(url if "://" in url else "http://" + url)
+        port = parts.port
+    except ValueError:
+        return url.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if port is not None and str(port) != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+              if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)]
+    query = "?" + urlencode(sorted(params)) if params else ""
+    return f"{host}{path}{query}"
+
+
+class DuplicateIndex:
+    """规范网址 -> 拥有该网址的记录，随每条修改增量维护，查重 O(1)，重复报告 O(n)。"""
+
+    def __init__(self, data):
+        self.data = data
+        self.by_url = {}  # 规范网址 -> {uid: 网站记录}
+        self.entries = {}  # uid -> (规范网址, GroupRef)
+        self.groups = {}  # 分组名 -> GroupRef
+        for group, sites in data.items():
+            ref = self.groups[group] = GroupRef(group)
+            for site in sites:
+                self.add(site, ref)
+
+    def add(self, site, ref):
+        key = canonical_url(site["url"])
+        self.by_url.setdefault(key, {})[site.uid] = site
+        self.entries[site.uid] = (key, ref)
+
+    def remove(self, site):
+        key, ref = self.entries.pop(site.uid)
+        bucket = self.by_url[key]
+        bucket.pop(site.uid, None)
+        if not bucket:
+            del self.by_url[key]
+        return ref
+
+    def apply(self, op, result):
+        kind = op["op"]
+        group = op.get("group")
+        if kind == "add":
+            self.add(result, self.groups[group])
+        elif kind == "edit":
+            site = self.data[group][op["index"]]
+            self.add(site, self.remove(site))
+        elif kind == "delete":
+            self.remove(result)
+        elif kind == "add_group":
+            self.groups[group] = GroupRef(group)
+        elif kind == "delete_group":
+            for site in result:
+                self.remove(site)
+            del self.groups[group]
+        elif kind == "transfer":
+            self.entries[result.uid] = (self.entries[result.uid][0], self.groups[op["to_group"]])
+        elif kind == "restore_group":
+            ref = self.groups[group] = GroupRef(group)
+            for site in result:
+                self.add(site, ref)
+        elif kind == "rename_group":
+            ref = self.groups.pop(group)
+            ref.name = op["name"]
+            self.groups[ref.name] = ref
+
+    def lookup(self, url):
+        # 返回 [(分组名, 网站记录)]，需要下标时再用 find_site 在分组中定位
+        bucket = self.by_url.get(canonical_url(url), {})
+        return [(self.entries[uid][1].name, site) for uid, site in bucket.items()]
+
+    def report(self):
+        # 一次遍历所有桶，列出出现不止一次的网址
+        return [(key, [(self.entries[uid][1].name, site) for uid, site in bucket.items()])
+                for key, bucket in self.by_url.items() if len(bucket) > 1]
+
+
+# === 书签导入 ===
+class NetscapeParser(HTMLParser):
+    """浏览器导出的 Netscape 书签 HTML：<H3> 是文件夹名，随后的 <DL> 是其内容，<A HREF> 是书签。"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.folders = []  # 当前所在的文件夹栈
+        self.pending_folder = None  # 刚读到、尚未进入其 <DL> 的文件夹名
+        self.capture = None
+        self.text = []
+        self.href = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "h3":
+            self.capture, self.text = "h3", []
+        elif tag == "a":
+            self.capture, self.text = "a", []
+            self.href = dict(attrs).get("href")
+        elif tag == "dl":
+            self.folders.append(self.pending_folder or (self.folders[-1] if self.folders else None))
+            self.pending_folder = None
+
+    def handle_endtag(self, tag):
+        if tag == "h3" and self.capture == "h3":
+            self.pending_folder = "".join(self.text).strip() or None
+            self.capture = None
+        elif tag == "a" and self.capture == "a":
+            if self.href:
+                folder = self.folders[-1] if self.folders else None
+                self.out.append((folder, "".join(self.text).strip() or self.href, self.href))
+            self.capture = None
+        elif tag == "dl" and self.folders:
+            self.folders.pop()
+
+    def handle_data(self, data):
+        if self.capture:
+            self.text.append(data)
+
+
+def iter_netscape_bookmarks(f):
+    # 逐块喂给 HTMLParser，每块解析完立即产出，内存只与块大小有关
+    parser = NetscapeParser()
+    while True:
+        chunk = f.read(IMPORT_CHUNK)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        yield from parser.out
+        parser.out = []
+    parser.close()
+    yield from parser.out
+
+
+CHROME_FIELDS = {'"name"': "name", '"type"': "type", '"url"': "url"}
+_JSON_STR = r'"(?:[^"\\]|\\.)*"'
+_JSON_END = r'(?=\s*[,\]}])'  # 标量后面必须能看到分隔符，保证读到缓冲区末尾的不完整值不会被误匹配
+# 每次匹配一个 "键": 标量 对、一个括号或一个数组里的标量；逗号冒号空白直接跳过
+JSON_TOKEN_RE = re.compile(
+    r'[\s,:]*(?:(' + _JSON_STR + r')\s*:\s*(?:(' + _JSON_STR + r')' + _JSON_END + r'|[-+.\w]+' + _JSON_END +
+    r'|(?=[\[{]))|([{}\[\]])|(?:' + _JSON_STR + r'|[-+.\w]+)' + _JSON_END + r')', re.S)
+
+
+def json_tokens(f):
+    # 逐块读取 JSON，产出 (键, 标量值, 括号) 三元组，每次只缓冲一小段文本
+    buf = ""
+    eof = False
+    while not eof:
+        chunk = f.read(IMPORT_CHUNK)
+        eof = not chunk
+        buf += chunk
+        pos = 0
+        while True:
+            m = JSON_TOKEN_RE.match(buf, pos)
+            if m is None or m.end() == pos:
+                break
+            pos = m.end()
+            yield m.groups()
+        buf = buf[pos:]
+
+
+def chrome_objects(f):
+    # 每读完一个 JSON 对象产出 (对象编号, 标量字段, 外层各对象的编号)；编号按对象开始的先后顺序
+    stack = []  # 每层: [是否对象, 对象编号, 标量字段]
+    count = 0
+    for key, value, punct in json_tokens(f):
+        if key is not None:
+            if value is not None and key in CHROME_FIELDS and stack:
+                stack[-1][2][CHROME_FIELDS[key]] = json.loads(value)
+        elif punct in ("{", "["):
+            stack.append([punct == "{", count, {}])
+            count += punct == "{"
+        elif punct in ("}", "]") and stack:
+            is_object, number, fields = stack.pop()
+            if is_object:
+                yield number, fields, [outer[1] for outer in stack if outer[0]]
+
+
+def iter_chrome_bookmarks(f):
+    """Chrome 的 Bookmarks 文件 (JSON) 的流式解析。
+
+    不构建整棵 JSON 树，只在栈上保留每个对象的 name/type/url。Chrome 按键名排序写出，
+    文件夹的 "children" 在 "name" 之前，所以读两遍：第一遍只记下各文件夹的名称，第二遍
+    每读完一个书签就产出，不在文件夹上暂存书签。f 必须可以 seek。
+    """
+    start = f.tell()
+    names = {number: fields["name"] for number, fields, _ in chrome_objects(f)
+             if fields.get("type") != "url" and fields.get("name")}
+    f.seek(start)
+    for _, fields, outer in chrome_objects(f):
+        if fields.get("type") == "url" and fields.get("url"):
+            folder = names.get(outer[-1]) if outer else None  # 归入最近的外层对象（文件夹）
+            yield folder, fields.get("name") or fields["url"], fields["url"]
+
+
+def iter_bookmark_file(f):
+    # 根据文件开头判断格式：Netscape HTML 以 '<' 开头，Chrome 书签是 JSON 对象
+    head = f.read(512)
+    f.seek(0)
+    if head.startswith("\ufeff"):
+        f.read(1)  # 按 utf-8 打开时 BOM 会留在文本里，JSON 分词器遇到它就停下
+    if head.lstrip("\ufeff \t\r\n").startswith("<"):
+        return iter_netscape_bookmarks(f)
+    return iter_chrome_bookmarks(f)
+
+
+# === SQLite 存储 ===
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    position REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sites (
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+    position REAL NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    note TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_groups_position ON groups(position);
+CREATE INDEX IF NOT EXISTS idx_sites_group ON sites(group_id, position);
+CREATE INDEX IF NOT EXISTS idx_sites_url ON sites(url);
+CREATE INDEX IF NOT EXISTS idx_sites_name ON sites(name);
+-- 规范网址和搜索词由触发器调用 connect() 里注册的 Python 函数维护，查重、搜索不必读出全部记录
+CREATE TABLE IF NOT EXISTS site_keys (
+    site_id INTEGER PRIMARY KEY,
+    canon TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_site_keys_canon ON site_keys(canon);
+CREATE VIRTUAL TABLE IF NOT EXISTS site_fts USING fts5(tokens, tokenize = 'unicode61 remove_diacritics 0', prefix = '1 2');
+CREATE TRIGGER IF NOT EXISTS sites_after_insert AFTER INSERT ON sites BEGIN
+    INSERT INTO site_keys (site_id, canon) VALUES (new.id, canonical_url(new.url));
+    INSERT INTO site_fts (rowid, tokens) VALUES (new.id, site_tokens(new.name, new.url, new.note));
+END;
+CREATE TRIGGER IF NOT EXISTS sites_after_update AFTER UPDATE OF name, url, note ON sites BEGIN
+    UPDATE site_keys SET canon = canonical_url(new.url) WHERE site_id = old.id;
+    UPDATE site_fts SET tokens = site_tokens(new.name, new.url, new.note) WHERE rowid = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS sites_after_delete AFTER DELETE ON sites BEGIN
+    DELETE FROM site_keys WHERE site_id = old.id;
+    DELETE FROM site_fts WHERE rowid = old.id;
+END;
+"""
+
+
+SITE_SELECT = "SELECT s.id, s.name, s.url, s.note, g.name FROM sites s JOIN groups g ON g.id = s.group_id"  # 记录连同分组名
+
+
+def sqlite_path_for(json_path):
+    return os.path.splitext(json_path)[0] + ".db"
+
+
+def sqlite_site_tokens(name, url, note):
+    # 与 site_tokens 相同的切词，空格连接后交给 FTS5；词里只有字母数字和中日韩文字，不会被再次切开
+    return " ".join(tokenize(" ".join((name, url, note))))
+
+
+def row_to_site(row):
+    site = Site(name=row[1], url=row[2], note=row[3])
+    site.uid = row[0]  # 用数据库主键作为 uid，分页缓存失效后重新读取的记录仍对应同一行
+    return site
+
+
+class SqliteGroup:
+    """一个分组的只读序列视图：长度和行都按需从数据库分页读取，不整体加载。"""
+
+    def __init__(self, library, group_id):
+        self.library = library
+        self.group_id = group_id
+        self.count = None
+        self.pages = {}
+
+    def invalidate(self):
+        self.count = None
+        self.pages = {}
+
+    def __len__(self):
+        if self.count is None:
+            self.count = self.library.query_one(
+                "SELECT COUNT(*) FROM sites WHERE group_id = ?", (self.group_id,))[0]
+        return self.count
+
+    def page(self, number):
+        rows = self.pages.get(number)
+        if rows is None:
+            rows = [row_to_site(r) for r in self.library.query(
+                "SELECT id, name, url, note FROM sites WHERE group_id = ? ORDER BY position LIMIT ? OFFSET ?",
+                (self.group_id, SQLITE_PAGE_SIZE, number * SQLITE_PAGE_SIZE))]
+            self.pages[number] = rows
+        return rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        number, offset = divmod(index, SQLITE_PAGE_SIZE)
+        return self.page(number)[offset]
+
+    def __iter__(self):
+        for number in range((len(self) + SQLITE_PAGE_SIZE - 1) // SQLITE_PAGE_SIZE):
+            yield from self.page(number)
+
+    def index_of(self, site):
+        row = self.library.query_one(
+            "SELECT COUNT(*) FROM sites WHERE group_id = ? AND position < (SELECT position FROM sites WHERE id = ?)",
+            (self.group_id, site.uid))
+        return row[0]
+
+    def row_id(self, index):
+        return self[index].uid
+
+
+class SqliteLibrary:
+    """对界面表现得像 dict[分组名] -> 网站列表，但数据留在 SQLite 里，只读取用到的页。"""
+
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock
+        self.groups = {}  # 分组名 -> SqliteGroup，按 position 排序
+        self.reload_groups()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params)
+
+    def reload_groups(self):
+        old = self.groups
+        self.groups = {}
+        for group_id, name in self.query("SELECT id, name FROM groups ORDER BY position"):
+            view = old.get(name)
+            if view is None or view.group_id != group_id:
+                view = SqliteGroup(self, group_id)
+            self.groups[name] = view
+
+    # --- 只读 dict 接口 ---
+    def keys(self):
+        return self.groups.keys()
+
+    def values(self):
+        return self.groups.values()
+
+    def items(self):
+        return self.groups.items()
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __contains__(self, group):
+        return group in self.groups
+
+    def __getitem__(self, group):
+        return self.groups[group]
+
+    def get(self, group, default=None):
+        return self.groups.get(group, default)
+
+    # --- 索引查询：走 site_fts / site_keys，不读出整个收藏 ---
+
+    def search_index(self):
+        return SqliteSearch(self)
+
+    def duplicate_index(self):
+        return SqliteDuplicates(self)
+
+    def has_url(self, key):
+        # key 为规范网址
+        return self.query_one("SELECT 1 FROM site_keys WHERE canon = ? LIMIT 1", (key,)) is not None
+
+    def group_name_of(self, uid):
+        row = self.query_one("SELECT g.name FROM sites s JOIN groups g ON g.id = s.group_id WHERE s.id = ?", (uid,))
+        return row[0] if row else None
+
+    def first_sites(self, urls):
+        # 返回 {网址: (分组名, 网站记录)}，同一网址收藏了多次时取分组、组内位置都最靠前的一条
+        first = {}
+        urls = list(urls)
+        for i in range(0, len(urls), SQLITE_IN_BATCH):
+            chunk = urls[i:i + SQLITE_IN_BATCH]
+            rows = self.query(f"{SITE_SELECT} WHERE s.url IN ({', '.join('?' * len(chunk))}) "
+                              "ORDER BY g.position, s.position", chunk)
+            for row in rows:
+                first.setdefault(row[2], (row[4], row_to_site(row)))
+        return first
+
+    # --- 修改 ---
+    # position 是可带小数的排序键：插入、移动时取相邻两行的中点，只改动被移动的那一行；
+    # 只有中点与邻居无法区分（浮点精度用尽）时才把整组重新编号
+    def rank_at(self, table, where, params, index, exclude=None):
+        # 返回放在第 index 行（不计 exclude 这一行）之前应使用的 position
+        rows = self.query(f"SELECT position FROM {table} WHERE {where} AND id != ? ORDER BY position LIMIT 2 OFFSET ?",
+                          params + (-1 if exclude is None else exclude, max(index - 1, 0)))
+        if not rows:
+            return 0.0
+        if index == 0:
+            return rows[0][0] - 1
+        if len(rows) == 1:
+            return rows[0][0] + 1
+        lo, hi = rows[0][0], rows[1][0]
+        mid = (lo + hi) / 2
+        if lo < mid < hi:
+            return mid
+        self.renumber(table, where, params)
+        return self.rank_at(table, where, params, index, exclude)
+
+    def renumber(self, table, where, params):
+        ids = self.query(f"SELECT id FROM {table} WHERE {where} ORDER BY position, id", params)
+        with self.lock:
+            self.conn.executemany(f"UPDATE {table} SET position = ? WHERE id = ?",
+                                  [(float(i), row[0]) for i, row in enumerate(ids)])
+
+    def apply_op(self, op):
+        kind = op["op"]
+        group = op.get("group")
+        if kind in ("add", "edit", "delete", "move", "transfer"):
+            view = self.groups[group]
+            gid = (view.group_id,)
+            try:
+                if kind == "add":
+                    position = self.rank_at("sites", "group_id = ?", gid, op.get("index", len(view)))
+                    site = op["site"]
+                    cur = self.execute("INSERT INTO sites (group_id, position, name, url, note) VALUES (?, ?, ?, ?, ?)",
+                                       (view.group_id, position, site["name"], site["url"], site.get("note", "")))
+                    result = Site(site)
+                    result.uid = cur.lastrowid
+                    return result
+                index = resolve_index(view, op)
+                row_id = view.row_id(index)
+                if kind == "edit":
+                    old = dict(view[index])
+                    site = dict(old, **op["site"])
+                    self.execute("UPDATE sites SET name = ?, url = ?, note = ? WHERE id = ?",
+                                 (site["name"], site["url"], site.get("note", ""), row_id))
+                    return old
+                if kind == "delete":
+                    old = view[index]
+                    self.execute("DELETE FROM sites WHERE id = ?", (row_id,))
+                    return old
+                if kind == "transfer":
+                    old = view[index]
+                    target = self.groups[op["to_group"]]
+                    position = self.rank_at("sites", "group_id = ?", (target.group_id,), op["to"], exclude=row_id)
+                    self.execute("UPDATE sites SET group_id = ?, position = ? WHERE id = ?",
+                                 (target.group_id, position, row_id))
+                    target.invalidate()
+                    return old
+                if op["to"] != index:
+                    position = self.rank_at("sites", "group_id = ?", gid, op["to"], exclude=row_id)
+                    self.execute("UPDATE sites SET position = ? WHERE id = ?", (position, row_id))
+                return None
+            finally:
+                view.invalidate()
+        if kind == "add_group":
+            if group in self.groups: raise ValueError(f"group exists: {group}")
+            self.execute("INSERT INTO groups (name, position) VALUES (?, ?)",
+                         (group, self.rank_at("groups", "1 = 1", (), len(self.groups))))
+        elif kind == "delete_group":
+            view = self.groups[group]
+            old = list(view)
+            self.execute("DELETE FROM sites WHERE group_id = ?", (view.group_id,))
+            self.execute("DELETE FROM groups WHERE id = ?", (view.group_id,))
+            self.reload_groups()
+            return old
+        elif kind == "rename_group":
+            if op["name"] in self.groups: raise ValueError(f"group exists: {op['name']}")
+            self.execute("UPDATE groups SET name = ? WHERE id = ?", (op["name"], self.groups[group].group_id))
+        elif kind == "move_group":
+            group_id = self.groups[group].group_id
+            position = self.rank_at("groups", "1 = 1", (), op["index"], exclude=group_id)
+            self.execute("UPDATE groups SET position = ? WHERE id = ?", (position, group_id))
+        elif kind == "restore_group":
+            if group in self.groups: raise ValueError(f"group exists: {group}")
+            cur = self.execute("INSERT INTO groups (name, position) VALUES (?, ?)",
+                               (group, self.rank_at("groups", "1 = 1", (), op["index"])))
+            with self.lock:
+                self.conn.executemany("INSERT INTO sites (group_id, position, name, url, note) VALUES (?, ?, ?, ?, ?)",
+                                      ((cur.lastrowid, float(i), site["name"], site["url"], site.get("note", ""))
+                                       for i, site in enumerate(op["sites"])))
+            self.reload_groups()
+            return list(self.groups[group])
+        else:
+            raise ValueError(f"unknown op: {kind}")
+        self.reload_groups()
+        return None
+
+
+class SqliteSearch:
+    """SQLite 模式的搜索：查询触发器维护的 site_fts 全文索引，与 SearchIndex 接口一致。"""
+
+    def __init__(self, library):
+        self.library = library
+        self.groups_of = {}  # uid -> 分组名，来自上一次搜索结果
+
+    def apply(self, op, result):
+        self.groups_of.clear()  # 索引本身由触发器更新，这里只丢弃可能过期的分组名
+
+    def group_of(self, site):
+        name = self.groups_of.get(site.uid)
+        if name is None:
+            name = self.groups_of[site.uid] = self.library.group_name_of(site.uid)
+        return name
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " AND ".join(f'"{token}"*' if prefix else f'"{token}"' for prefix, token in terms)
+        rows = self.library.query(f"{SITE_SELECT} JOIN site_fts ON site_fts.rowid = s.id "
+                                  "WHERE site_fts MATCH ? ORDER BY s.id LIMIT ?", (match, limit))
+        self.groups_of = {row[0]: row[4] for row in rows}
+        return [row_to_site(row) for row in rows]
+
+
+class SqliteDuplicates:
+    """SQLite 模式的查重：按 site_keys 上的规范网址索引查询，与 DuplicateIndex 接口一致。"""
+
+    def __init__(self, library):
+        self.library = library
+
+    def apply(self, op, result):
+        pass  # site_keys 由触发器更新
+
+    def lookup(self, url):
+        rows = self.library.query(f"{SITE_SELECT} JOIN site_keys k ON k.site_id = s.id "
+                                  "WHERE k.canon = ? ORDER BY g.position, s.position", (canonical_url(url),))
+        return [(row[4], row_to_site(row)) for row in rows]
+
+    def report(self):
+        # 只读出重复的记录：先在索引上按规范网址分组计数
+        rows = self.library.query(
+            f"SELECT s.id, s.name, s.url, s.note, g.name, k.canon FROM sites s JOIN groups g ON g.id = s.group_id "
+            "JOIN site_keys k ON k.site_id = s.id "
+            "WHERE k.canon IN (SELECT canon FROM site_keys GROUP BY canon HAVING COUNT(*) > 1) "
+            "ORDER BY k.canon, g.position, s.position")
+        return [(key, [(row[4], row_to_site(row)) for row in group])
+                for key, group in itertools.groupby(rows, key=lambda row: row[5])]
+
+
+def search_index_for(data):
+    # SQLite 数据直接查数据库里的索引；dict 数据在内存里建倒排索引
+    make = getattr(data, "search_index", None)
+    return make() if make else SearchIndex(data)
+
+
+def duplicate_index_for(data):
+    make = getattr(data, "duplicate_index", None)
+    return make() if make else DuplicateIndex(data)
+
+
+def first_sites(data, urls):
+    # 返回 {网址: (分组名, 网站记录)}，同一网址收藏了多次时取最先出现的一条
+    lookup = getattr(data, "first_sites", None)
+    if lookup:
+        return lookup(urls)
+    wanted = set(urls)
+    first = {}
+    for group, sites in data.items():
+        for site in sites:
+            if site["url"] in wanted and site["url"] not in first:
+                first[site["url"]] = (group, site)
+    return first
+
+
+class SeenUrls:
+    """导入时判断网址是否已收藏（按规范网址）。dict 数据预先收集全部哈希；
+    SQLite 数据查 site_keys 索引，内存里只记本次导入加入的网址。"""
+
+    def __init__(self, data):
+        self.has_url = getattr(data, "has_url", None)
+        if self.has_url:
+            self.keys = set()
+        else:
+            self.keys = {hash(canonical_url(site["url"])) for sites in data.values() for site in sites}
+
+    def __contains__(self, key):
+        return hash(key) in self.keys or (self.has_url is not None and self.has_url(key))
+
+    def add(self, key):
+        self.keys.add(hash(key))
+
+
+class SqliteStore:
+    """可选的 SQLite 存储：与 JournalStore 接口一致，修改直接进数据库事务，写盘即 commit。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = None
+        self.data = None
+        self.writer = None  # 多实例并发由 SQLite 自身的锁处理，日志行不需要写入者标识
+        self.data_version = None
+        self.bytes_written = None  # 写入量由 SQLite 自己管理，无法按字节统计
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.create_function("canonical_url", 1, canonical_url, deterministic=True)
+        conn.create_function("site_tokens", 3, sqlite_site_tokens, deterministic=True)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(SQLITE_SCHEMA)
+        self.upgrade(conn)
+        return conn
+
+    def upgrade(self, conn):
+        # 旧版本建的库没有规范网址表和全文索引：在一个写事务里补建一次，之后由触发器维护
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SQLITE_VERSION:
+            return
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= SQLITE_VERSION:
+                return  # 等待写锁期间其他实例已经补建
+            conn.execute("DELETE FROM site_keys")
+            conn.execute("DELETE FROM site_fts")
+            conn.execute("INSERT INTO site_keys (site_id, canon) SELECT id, canonical_url(url) FROM sites")
+            conn.execute("INSERT INTO site_fts (rowid, tokens) SELECT id, site_tokens(name, url, note) FROM sites")
+            conn.execute(f"PRAGMA user_version = {SQLITE_VERSION}")
+
+    def load(self):
+        self.conn = self.connect()
+        self.data = SqliteLibrary(self.conn, self.lock)
+        self.data_version = self.query_version()
+        return self.data
+
+    def query_version(self):
+        with self.lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def read_changes(self):
+        # data_version 只在其他连接提交后变化；变化时让界面整体刷新
+        version = self.query_version()
+        if version == self.data_version:
+            return []
+        self.data_version = version
+        return None
+
+    def reload(self):
+        with self.lock:
+            self.data.reload_groups()
+            for view in self.data.values():
+                view.invalidate()
+        return self.data
+
+    def needs_compact(self, pending=0):
+        return False
+
+    def snapshot(self):
+        return None  # 数据已在数据库中，无需拷贝
+
+    def begin(self):
+        # 脚本接口的一批修改先取得数据库写锁，之后读到的下标在提交前不会被其他连接改动
+        with self.lock:
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN IMMEDIATE")
+
+    def write_batch(self, lines, snapshot=None):
+        self.sync()
+
+    def compact(self, snapshot=None):
+        self.sync()
+
+    def sync(self):
+        with self.lock:
+            self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            self.sync()
+            self.conn.close()
+            self.conn = None
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    # 一次性迁移：读取 bookmarks.json（含未合并的日志）后在一个事务里批量写入
+    source = JournalStore(json_path).load()
+    store = SqliteStore(db_path)
+    conn = store.connect()
+    with conn:
+        conn.execute("DELETE FROM sites")
+        conn.execute("DELETE FROM groups")
+        for g_pos, (group, sites) in enumerate(source.items()):
+            group_id = conn.execute("INSERT INTO groups (name, position) VALUES (?, ?)", (group, g_pos)).lastrowid
+            conn.executemany("INSERT INTO sites (group_id, position, name, url, note) VALUES (?, ?, ?, ?, ?)",
+                             ((group_id, i, s["name"], s["url"], s.get("note", "")) for i, s in enumerate(sites)))
+    conn.close()
+
+
+def export_json(data, path):
+    # 任意存储模式都可以导出为原格式的 JSON
+    export = {group: [{"name": s["name"], "url": s["url"], "note": s.get("note", "")} for s in sites]
+              for group, sites in data.items()}
+    atomic_write(path, json.dumps(export, ensure_ascii=False, indent=4).encode('utf-8'))
+
+
+def open_store(json_path, storage=None):
+    # storage: None 表示自动（存在 .db 文件时用 SQLite），"json" / "sqlite" 为强制指定
+    db_path = sqlite_path_for(json_path)
+    if storage == "sqlite" or (storage is None and os.path.exists(db_path)):
+        if not os.path.exists(db_path):
+            migrate_json_to_sqlite(json_path, db_path)
+        return SqliteStore(db_path)
+    return JournalStore(json_path)
+
+
+def encode_op(op, by=None):
+    if by is not None:
+        op = dict(op, by=by)  # 写入者标识：读取共享日志时跳过自己写的行
+    return json.dumps(op, ensure_ascii=False, default=site_json) + "\n"
+
+
+def snapshot_data(data):
+    # 主线程上拷贝出一份不可变快照，后台线程序列化时界面可以继续修改 self.data
+    return {group: [site.as_dict() for site in sites] for group, sites in data.items()}
+
+
+def plan_import(groups, batch, seen):
+    # 把一批 (文件夹, 名称, 网址) 转成操作；seen 为已收藏的规范网址（SeenUrls），文件内重复和已收藏的都跳过。
+    # groups 是已存在的分组名集合（会被更新）；返回 (操作列表, 跳过条数)
+    ops = []
+    skipped = 0
+    for folder, name, url in batch:
+        key = canonical_url(url)
+        if key in seen:
+            skipped += 1
+            continue
+        seen.add(key)
+        group = folder or IMPORT_DEFAULT_GROUP
+        if group not in groups:
+            groups.add(group)
+            ops.append({"op": "add_group", "group": group})
+        ops.append({"op": "add", "group": group, "site": {"name": name, "url": url, "note": ""}})
+    return ops, skipped
+
+
+# === 使用统计 ===
+class UsageLog:
+    """打开记录：追加式日志 + 聚合快照，给出每个网址的打开次数和随时间衰减的常用度。
+
+    常用度 = Σ 2^((t_i - now) / 半衰期)。它的排序与 rank = log2 Σ 2^(t_i / 半衰期) 相同，而 rank 不随
+    时间变化，所以每次打开只需更新一个网址，不必重算全部。日志每行 "时间戳<TAB>网址"，累计
+    USAGE_COMPACT_EVENTS 行后并入快照并清空，启动时只读快照和一小段日志。日志首行是它所接续的
+    快照代号，合并中途崩溃也不会重复计数；首行与当前快照不符的旧日志在下次读取或追加时换成新日志。
+    写入都在文件锁内进行，多个实例可以同时记录。note() 只更新内存，append() 负责写盘，界面把
+    后者放到后台线程。
+    """
+
+    def __init__(self, base, half_life=USAGE_HALF_LIFE):
+        self.snapshot_path = base + ".json"
+        self.log_path = base + ".log"
+        self.file_lock = FileLock(base + LOCK_SUFFIX)
+        self.half_life = half_life
+        self.counters = {}  # 网址 -> [打开次数, 最近打开时间, rank]
+        self.gen = ""  # 当前快照的代号，"" 表示还没有快照
+        self.snapshot_stat = None  # 读取 gen 时快照文件的状态，变化说明别的实例合并过
+        self.log_events = 0  # 日志中尚未并入快照的记录数
+
+    def load(self):
+        with self.file_lock:
+            self.counters, self.gen, self.log_events = self.read()
+            if self.log_events >= USAGE_COMPACT_EVENTS:
+                self.counters = self.compact()
+        return self
+
+    def read(self):
+        # 调用方持有 file_lock；日志接续的不是当前快照时换成新的空日志，之后的追加才能被回放
+        counters, gen, events = {}, "", 0
+        self.snapshot_stat = file_stat(self.snapshot_path)
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            counters, gen = snapshot["urls"], snapshot["gen"]
+        except (OSError, ValueError, KeyError):
+            pass
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                if f.readline().rstrip("\n") != gen:
+                    f.close()
+                    self.reset_log(gen)  # 合并中途崩溃留下的旧日志，内容已在快照里
+                    return counters, gen, 0
+                for line in f:
+                    stamp, sep, url = line.rstrip("\n").partition("\t")
+                    try:
+                        self.fold(counters, url, int(stamp))
+                    except ValueError:
+                        continue  # 崩溃时写了一半的行
+                    events += 1
+        except OSError:
+            pass
+        return counters, gen, events
+
+    def fold(self, counters, url, stamp):
+        x = stamp / self.half_life
+        entry = counters.get(url)
+        if entry is None:
+            counters[url] = [1, stamp, x]
+            return
+        r = entry[2]
+        entry[0] += 1
+        entry[1] = max(entry[1], stamp)
+        entry[2] = max(r, x) + math.log2(1 + 2 ** -abs(r - x))  # log2(2^r + 2^x)，避免溢出
+
+    def note(self, urls, stamp=None):
+        # 在内存中计入一次打开多个网址，返回待写入日志的行
+        stamp = int(time.time() if stamp is None else stamp)
+        for url in urls:
+            self.fold(self.counters, url, stamp)
+        return [f"{stamp}\t{url}\n" for url in urls]
+
+    def append(self, lines):
+        # 一批日志行一次写盘；不改动 self.counters，可以在后台线程调用
+        if not lines:
+            return
+        with self.file_lock:
+            gen = self.current_gen()
+            with open(self.log_path, 'a+', encoding='utf-8') as f:
+                f.seek(0)
+                if f.readline() != gen + "\n":  # 空文件（新建）也要先写首行
+                    f.close()
+                    self.reset_log(gen)
+                    f = open(self.log_path, 'a', encoding='utf-8')
+                with f:
+                    f.write("".join(lines))
+            self.log_events += len(lines)
+            if self.log_events >= USAGE_COMPACT_EVENTS:
+                self.compact()
+
+    def current_gen(self):
+        # 在文件锁内调用：快照被其他实例换过时重新读出它的代号
+        stat = file_stat(self.snapshot_path)
+        if stat != self.snapshot_stat:
+            self.snapshot_stat = stat
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    self.gen = json.load(f)["gen"]
+            except (OSError, ValueError, KeyError):
+                self.gen = ""
+        return self.gen
+
+    def reset_log(self, gen):
+        atomic_write(self.log_path, (gen + "\n").encode('utf-8'))
+        self.log_events = 0
+
+    def compact(self):
+        # 在文件锁内调用：以磁盘上的快照和日志为准合并，其他实例记下的打开也一并计入，返回合并结果
+        counters, _, _ = self.read()
+        gen = os.urandom(6).hex()
+        atomic_write(self.snapshot_path, json.dumps({"gen": gen, "urls": counters}, ensure_ascii=False,
+                                                    separators=(",", ":")).encode('utf-8'))
+        self.snapshot_stat = file_stat(self.snapshot_path)
+        self.reset_log(gen)
+        self.gen = gen
+        return counters
+
+    def count(self, url):
+        entry = self.counters.get(url)
+        return entry[0] if entry else 0
+
+    def score(self, url, now=None):
+        entry = self.counters.get(url)
+        if entry is None:
+            return 0.0
+        return 2 ** (entry[2] - (time.time() if now is None else now) / self.half_life)
+
+    def rank(self, url):
+        entry = self.counters.get(url)
+        return entry[2] if entry else float("-inf")
+
+    def ranked(self):
+        # 所有打开过的网址，常用度从高到低
+        return sorted(self.counters, key=lambda url: self.counters[url][2], reverse=True)
+
+
+# === 脚本接口 ===
+class BookmarkStore:
+    """不依赖界面的收藏库接口，供脚本和命令行使用。
+
+    与界面共用存储和文件锁，界面开着时也可以安全修改。每次修改前先读入其他实例追加的
+    操作；batch() 块内的所有修改在退出时作为一行日志一次写盘。SQLite 模式下整个 batch() 块
+    持有数据库写锁，块内按下标定位的修改不会与其他实例交错。
+    """
+
+    def __init__(self, path=DATA_FILE, storage=None):
+        self.store = open_store(path, storage)
+        self.data = self.store.load()
+        self.pending = []
+        self.depth = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.flush()
+        self.store.close()
+
+    @contextlib.contextmanager
+    def batch(self):
+        if self.depth == 0:
+            self.store.begin()
+            self.sync()
+        self.depth += 1
+        try:
+            yield self
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                self.flush()
+                self.store.sync()  # 没有修改时也结束 begin() 开始的事务
+
+    def sync(self):
+        changes = self.store.read_changes()
+        if changes is None:
+            new = self.store.reload()
+            if new is not self.data:
+                merge_groups(self.data, new)
+            return
+        for op in changes:
+            for sub in op["ops"] if op["op"] == "batch" else (op,):
+                try:
+                    apply_op(self.data, sub)
+                except (KeyError, IndexError, ValueError, TypeError):
+                    pass  # 与本地修改冲突的操作作废，规则与界面相同
+
+    def apply(self, ops):
+        with self.batch():
+            results = []
+            for op in ops:
+                results.append(apply_op(self.data, with_match(self.data, op)))
+                self.pending.append(op)
+            return results
+
+    def flush(self):
+        if not self.pending:
+            return
+        ops, self.pending = self.pending, []
+        line = encode_op({"op": "batch", "ops": ops}, self.store.writer)
+        snapshot = None
+        if len(ops) >= COMPACT_THRESHOLD or self.store.needs_compact(1):
+            snapshot = self.store.snapshot()
+        self.store.write_batch((line,), snapshot)
+
+    # --- 查询 ---
+    def groups(self):
+        return list(self.data.keys())
+
+    def sites(self, group):
+        return list(self.data[group])
+
+    def locate(self, urls, group=None):
+        # 按规范化网址查找，返回 [(分组名, 下标, 网站记录)]，按分组、下标排列
+        keys = {canonical_url(u) for u in urls}
+        found = []
+        for name, sites in self.data.items():
+            if group is not None and name != group:
+                continue
+            found += [(name, i, site) for i, site in enumerate(sites) if canonical_url(site["url"]) in keys]
+        return found
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        index = search_index_for(self.data)
+        return [(index.group_of(site), site) for site in index.search(query, limit)]
+
+    def duplicates(self):
+        return duplicate_index_for(self.data).report()
+
+    # --- 修改 ---
+    def add_group(self, group):
+        if group not in self.data:
+            self.apply([{"op": "add_group", "group": group}])
+
+    def add_site(self, group, name, url, note=""):
+        with self.batch():
+            self.add_group(group)
+            return self.apply([{"op": "add", "group": group, "site": {"name": name, "url": url, "note": note}}])[0]
+
+    def delete_urls(self, urls, group=None):
+        # 从后往前删，其余待删记录的下标保持不变；返回删除条数
+        with self.batch():
+            found = self.locate(urls, group)
+            self.apply([{"op": "delete", "group": g, "index": i} for g, i, _ in reversed(found)])
+        return len(found)
+
+    def move_urls(self, urls, to_group, group=None):
+        # 移到目标分组末尾，保持原有先后顺序；返回移动条数
+        with self.batch():
+            self.add_group(to_group)
+            found = [(g, site) for g, _, site in self.locate(urls, group) if g != to_group]
+            for g, site in found:
+                self.apply([{"op": "transfer", "group": g, "index": find_site(self.data[g], site),
+                             "to_group": to_group, "to": len(self.data[to_group])}])
+        return len(found)
+
+    def dedupe(self):
+        # 每个网址只保留最先出现的一条，返回删除条数
+        with self.batch():  # 先读入其他实例的修改再扫描，下标才与删除时的数据一致
+            seen = set()
+            doomed = []
+            for name, sites in self.data.items():
+                for i, site in enumerate(sites):
+                    key = canonical_url(site["url"])
+                    if key in seen:
+                        doomed.append((name, i))
+                    else:
+                        seen.add(key)
+            self.apply([{"op": "delete", "group": g, "index": i} for g, i in reversed(doomed)])
+        return len(doomed)
+
+    def import_file(self, path):
+        # 流式解析，按 IMPORT_BATCH 条生成操作，整个文件一次写盘；返回 (导入条数, 跳过条数)
+        imported = skipped = 0
+        with self.batch():
+            groups = set(self.data.keys())
+            seen = SeenUrls(self.data)
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for batch in chunked(iter_bookmark_file(f), IMPORT_BATCH):
+                    ops, n = plan_import(groups, batch, seen)
+                    self.apply(ops)
+                    skipped += n
+                    imported += len(batch) - n
+        return imported, skipped
+
+    def export_json(self, path):
+        export_json(self.data, path)
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,72 @@
+"""chunk_urls 的分批规则，以及 BrowserLauncher 把网址交给一个只记录参数的假浏览器。"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from web_manager_2 import BrowserLauncher, chunk_urls
+
+
+def test_chunks_respect_tab_limit():
+    urls = [f"https://example.com/{i}" for i in range(95)]
+    chunks = list(chunk_urls("browser", urls, max_tabs=40))
+    assert [len(c) for c in chunks] == [40, 40, 15]
+    assert [u for c in chunks for u in c] == urls
+
+
+def test_chunks_respect_command_line_limit():
+    urls = [f"https://example.com/{'x' * 50}/{i}" for i in range(30)]
+    limit = 400
+    chunks = list(chunk_urls("browser", urls, limit=limit))
+    assert len(chunks) > 1
+    assert [u for c in chunks for u in c] == urls
+    for chunk in chunks:
+        assert len(subprocess.list2cmdline(["browser", *chunk])) <= limit
+
+
+def test_oversized_url_gets_its_own_chunk():
+    urls = ["https://a.example/", "https://b.example/" + "y" * 500, "https://c.example/"]
+    assert list(chunk_urls("browser", urls, limit=100)) == [[urls[0]], [urls[1]], [urls[2]]]
+
+
+@pytest.fixture
+def stub_browser(tmp_path):
+    # 每次调用把收到的参数作为一行 JSON 追加到日志
+    log = tmp_path / "calls.log"
+    script = tmp_path / "browser"
+    script.write_text(f"#!{sys.executable}\n"
+                      "import json, sys\n"
+                      f"with open({str(log)!r}, 'a') as f:\n"
+                      "    f.write(json.dumps(sys.argv[1:]) + '\\n')\n")
+    os.chmod(script, 0o755)
+    return str(script), log
+
+
+def wait_idle(launcher):
+    deadline = time.monotonic() + 30
+    while launcher.busy:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="假浏览器是带 #! 的脚本")
+def test_launcher_opens_every_url_once(stub_browser):
+    path, log = stub_browser
+    urls = [f"https://example.com/{i}" for i in range(100)]
+    launcher = BrowserLauncher()
+    launcher.open(path, urls)
+    wait_idle(launcher)
+    assert launcher.errors.empty()
+    calls = [json.loads(line) for line in log.read_text().splitlines()]
+    assert len(calls) == 3  # 每次最多 OPEN_MAX_TABS (40) 个网址
+    assert sorted(u for call in calls for u in call) == sorted(urls)
+
+
+def test_launcher_reports_missing_browser(tmp_path):
+    launcher = BrowserLauncher()
+    launcher.open(str(tmp_path / "no-such-browser"), ["https://example.com/"])
+    wait_idle(launcher)
+    assert isinstance(launcher.errors.get_nowait(), OSError)
@@ -0,0 +1,51 @@
+"""命令行：add 的参数检查与基本的增删查。"""
+import io
+
+import pytest
+
+from bookmark_cli import main
+
+
+@pytest.fixture
+def data(tmp_path):
+    return str(tmp_path / "bookmarks.json")
+
+
+@pytest.mark.parametrize("argv", [["add"], ["add", "工具"], ["add", "工具", "Example"]])
+def test_add_rejects_incomplete_arguments(data, argv, capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(["--data", data] + argv)
+    assert exc.value.code == 2
+    assert "已添加" not in capsys.readouterr().out
+
+
+def test_add_search_delete(data, capsys):
+    main(["--data", data, "add", "工具", "Example", "https://example.com", "--note", "示例"])
+    main(["--data", data, "search", "example"])
+    main(["--data", data, "delete", "http://www.example.com/"])
+    main(["--data", data, "list", "工具"])
+    out = capsys.readouterr().out.splitlines()
+    assert out == ["已添加 1 个网站", "工具\tExample\thttps://example.com\t示例", "已删除 1 个网站"]
+
+
+def test_add_from_stdin(data, capsys, monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("工具\tA\thttps://a.example\n坏行\n阅读\tB\thttps://b.example\t备注\n"))
+    main(["--data", data, "add", "--stdin"])
+    captured = capsys.readouterr()
+    assert captured.out == "已添加 2 个网站\n"
+    assert "坏行" in captured.err
+
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_dedupe_sees_other_writers(data, storage):
+    # 另一个实例在打开之后于开头插入一行：dedupe 必须按最新数据定位，删掉的是重复的那条
+    from bookmark_core import BookmarkStore
+    with BookmarkStore(data, storage) as store:
+        for name, url in (("x1", "https://x.example"), ("y", "https://y.example"), ("x2", "https://x.example/")):
+            store.add_site("g", name, url)
+    with BookmarkStore(data, storage) as store, BookmarkStore(data, storage) as other:
+        other.apply([{"op": "add", "group": "g", "index": 0,
+                      "site": {"name": "new", "url": "https://new.example", "note": ""}}])
+        other.flush()
+        assert store.dedupe() == 1
+        assert [site["name"] for site in store.sites("g")] == ["new", "x1", "y"]
@@ -0,0 +1,90 @@
+"""canonical_url 的规范化规则，以及 DuplicateIndex 随修改操作的增量维护。"""
+import pytest
+
+from bookmark_core import DuplicateIndex, apply_op, canonical_url, make_site
+
+
+@pytest.mark.parametrize("a, b", [
+    ("https://Example.COM/a", "http://example.com/a"),  # 协议、主机名大小写
+    ("https://www.example.com", "example.com"),  # www. 和省略的协议
+    ("https://example.com:443/", "https://example.com"),  # 默认端口、末尾斜杠
+    ("http://example.com:80/a/", "http://example.com/a"),
+    ("https://example.com./a", "https://example.com/a"),  # 主机名末尾的点
+    ("https://example.com/a#section", "https://example.com/a"),  # 锚点
+    ("https://example.com/a?utm_source=x&id=1&fbclid=y", "https://example.com/a?id=1"),  # 跟踪参数
+    ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),  # 参数顺序
+    ("  https://example.com/a  ", "https://example.com/a"),
+])
+def test_same_canonical_url(a, b):
+    assert canonical_url(a) == canonical_url(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("https://example.com/A", "https://example.com/a"),  # 路径区分大小写
+    ("https://example.com:8080/", "https://example.com/"),  # 非默认端口
+    ("http://example.com:443/", "https://example.com/"),  # 端口只对自己的协议算默认
+    ("https://example.com/a?id=1", "https://example.com/a?id=2"),
+    ("https://example.com/a?id=", "https://example.com/a"),  # 空值参数保留
+    ("https://sub.example.com/", "https://example.com/"),
+])
+def test_different_canonical_url(a, b):
+    assert canonical_url(a) != canonical_url(b)
+
+
+def test_malformed_url_is_compared_as_text():
+    assert canonical_url("http://example.com:99999/") == "http://example.com:99999/"
+
+
+def build():
+    data = {
+        "g": [make_site("A", "https://a.example"), make_site("B", "https://b.example"),
+              make_site("A2", "http://www.a.example/")],
+        "h": [make_site("C", "https://c.example")],
+    }
+    return data, DuplicateIndex(data)
+
+
+def run(data, index, op):
+    index.apply(op, apply_op(data, op))
+
+
+def report(index):
+    return [(key, sorted((g, site["name"]) for g, site in entries)) for key, entries in index.report()]
+
+
+def test_report_and_lookup():
+    _, index = build()
+    assert report(index) == [("a.example", [("g", "A"), ("g", "A2")])]
+    assert [site["name"] for _, site in index.lookup("https://A.example/#x")] == ["A", "A2"]
+    assert index.lookup("https://new.example") == []
+
+
+def test_edit_updates_index():
+    data, index = build()
+    run(data, index, {"op": "edit", "group": "g", "index": 2, "site": {"url": "https://c.example/"}})
+    assert report(index) == [("c.example", [("g", "A2"), ("h", "C")])]
+    assert [site["name"] for _, site in index.lookup("https://a.example")] == ["A"]
+    run(data, index, {"op": "edit", "group": "g", "index": 2, "site": {"name": "renamed"}})  # 只改名称
+    assert report(index) == [("c.example", [("g", "renamed"), ("h", "C")])]
+
+
+def test_delete_updates_index():
+    data, index = build()
+    run(data, index, {"op": "delete", "group": "g", "index": 0})
+    assert report(index) == []
+    assert [site["name"] for _, site in index.lookup("https://a.example")] == ["A2"]
+    run(data, index, {"op": "delete", "group": "g", "index": 1})
+    assert index.lookup("https://a.example") == []
+
+
+def test_group_ops_update_index():
+    data, index = build()
+    run(data, index, {"op": "add", "group": "h", "site": {"name": "B2", "url": "b.example", "note": ""}})
+    run(data, index, {"op": "transfer", "group": "g", "index": 0, "to_group": "h", "to": 0})
+    run(data, index, {"op": "rename_group", "group": "h", "name": "k"})
+    assert report(index) == [("a.example", [("g", "A2"), ("k", "A")]), ("b.example", [("g", "B"), ("k", "B2")])]
+    deleted = data["g"]
+    run(data, index, {"op": "delete_group", "group": "g"})
+    assert report(index) == []
+    run(data, index, {"op": "restore_group", "group": "g", "index": 0, "sites": deleted})
+    assert report(index) == [("a.example", [("g", "A2"), ("k", "A")]), ("b.example", [("g", "B"), ("k", "B2")])]
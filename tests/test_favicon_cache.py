@@ -0,0 +1,110 @@
+"""FaviconCache：替换 fetch 的下载、磁盘缓存与淘汰，以及从本地服务下载 .ico。"""
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import web_manager_2
+from web_manager_2 import FaviconCache, decode_icon, encode_png
+
+
+def png(color):
+    return encode_png(2, 2, [bytes(color) * 2] * 2)
+
+
+def ico(width, bgra):
+    # 一张 32 位 BMP 的 .ico：信息头 + 自下而上的像素 + 1 位掩码
+    height = width
+    header = struct.pack("<IiiHHIIiiII", 40, width, height * 2, 1, 32, 0, 0, 0, 0, 0, 0)
+    pixels = bytes(bgra) * (width * height)
+    mask = b"\0" * (((width + 31) // 32) * 4 * height)
+    image = header + pixels + mask
+    return struct.pack("<HHH", 0, 1, 1) + struct.pack("<BBBBHHII", width, height, 0, 0, 1, 32, len(image), 22) + image
+
+
+def collect(cache, n):
+    return dict(cache.results.get(timeout=10) for _ in range(n))
+
+
+def test_fetch_store_and_reload(tmp_path):
+    icons = {"https://a.example": png((255, 0, 0, 255)), "https://b.example": png((255, 0, 0, 255)),
+             "https://c.example": None}
+    calls = []
+    gate = threading.Event()
+
+    def fetch(origin):
+        gate.wait(10)  # 所有请求发出之后才返回，重复的请求一定发生在下载期间
+        calls.append(origin)
+        return icons[origin]
+    cache = FaviconCache(str(tmp_path), fetch=fetch)
+    for origin in icons:
+        assert cache.lookup(origin) is None
+        cache.request(origin)
+        cache.request(origin)  # 正在下载的主机不重复请求
+    gate.set()
+    assert collect(cache, 3) == icons
+    assert sorted(calls) == sorted(icons)
+    assert not cache.busy
+    cache.close()
+
+    # 内容相同的图标只存一份；没有图标的主机记为 False，不再下载
+    assert len([p for p in tmp_path.iterdir() if p.suffix == ".png"]) == 1
+    again = FaviconCache(str(tmp_path), fetch=lambda origin: pytest.fail("不应再下载"))
+    assert again.lookup("https://a.example") == icons["https://a.example"]
+    assert again.lookup("https://c.example") is False
+
+
+def test_fetch_errors_count_as_missing(tmp_path):
+    def fetch(origin):
+        raise OSError("offline")
+    cache = FaviconCache(str(tmp_path), fetch=fetch)
+    cache.request("https://a.example")
+    assert collect(cache, 1) == {"https://a.example": None}
+    assert cache.lookup("https://a.example") is False
+
+
+def test_eviction_keeps_recent_icons(tmp_path, monkeypatch):
+    icons = {f"https://{i}.example": png((i, i, i, 255)) for i in range(6)}
+    monkeypatch.setattr(web_manager_2, "FAVICON_CACHE_BYTES", len(icons["https://0.example"]) * 3)
+    cache = FaviconCache(str(tmp_path), fetch=icons.get)
+    for origin in icons:
+        cache.request(origin)
+        collect(cache, 1)  # 逐个下载，最近使用时间依次递增
+    assert sum(cache.sizes.values()) <= web_manager_2.FAVICON_CACHE_BYTES
+    assert cache.lookup("https://5.example") == icons["https://5.example"]
+    assert cache.lookup("https://0.example") is None  # 最早的已被淘汰，需要重新下载
+
+
+def test_decode_ico_picks_bitmap():
+    icon = decode_icon(ico(16, (0, 0, 255, 255)))
+    assert icon.startswith(b"\x89PNG")
+    assert decode_icon(b"not an icon") is None
+
+
+class IconHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = ico(16, (0, 255, 0, 255)) if self.path == "/favicon.ico" else b""
+        self.send_response(200 if body else 404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_download_from_local_server(tmp_path):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), IconHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        origin = f"http://127.0.0.1:{httpd.server_address[1]}"
+        cache = FaviconCache(str(tmp_path))
+        cache.request(origin)
+        icon = collect(cache, 1)[origin]
+        assert icon == decode_icon(ico(16, (0, 255, 0, 255)))
+        assert cache.lookup(origin) == icon
+        cache.close()
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,117 @@
+"""流式导入：Netscape HTML 和 Chrome JSON 按很小的块读取时的解析结果，以及 plan_import 的去重。"""
+import io
+import json
+
+import pytest
+
+import bookmark_core
+from bookmark_core import (BookmarkStore, IMPORT_DEFAULT_GROUP, SeenUrls, iter_bookmark_file, make_site, plan_import)
+
+NETSCAPE = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><A HREF="https://top.example/">顶层</A>
+    <DT><H3 ADD_DATE="1">开发</H3>
+    <DL><p>
+        <DT><A HREF="https://github.com/">GitHub</A>
+        <DT><H3>Python &amp; 工具</H3>
+        <DL><p>
+            <DT><A HREF="https://example.com/?a=1&amp;b=2">AT&amp;T &#20013;&#25991; &lt;tag&gt;</A>
+            <DT><A HREF="https://pypi.org"></A>
+        </DL><p>
+        <DT><A HREF="http://github.com">GitHub again</A>
+    </DL><p>
+    <DT><H3>阅读</H3>
+    <DL><p>
+        <DT><A HREF="https://news.example">News</A>
+    </DL><p>
+</DL><p>
+"""
+
+NETSCAPE_EXPECTED = [
+    (None, "顶层", "https://top.example/"),
+    ("开发", "GitHub", "https://github.com/"),
+    ("Python & 工具", "AT&T 中文 <tag>", "https://example.com/?a=1&b=2"),
+    ("Python & 工具", "https://pypi.org", "https://pypi.org"),  # 没有标题时用网址
+    ("开发", "GitHub again", "http://github.com"),  # 子文件夹结束后回到外层
+    ("阅读", "News", "https://news.example"),
+]
+
+CHROME = {
+    "checksum": "0",
+    "roots": {
+        "bookmark_bar": {
+            "children": [
+                {"name": "GitHub", "type": "url", "url": "https://github.com/"},
+                {"children": [
+                    {"name": "引号 \"quoted\" \\ 反斜杠", "type": "url", "url": "https://example.com/?q=a%20b&x=}"},
+                    {"name": "", "type": "url", "url": "https://pypi.org"},
+                ], "date_added": "1", "name": "Python {工具}", "type": "folder"},
+                {"name": "GitHub again", "type": "url", "url": "http://github.com"},
+            ],
+            "name": "书签栏",
+            "type": "folder",
+        },
+        "other": {"children": [{"name": "News", "type": "url", "url": "https://news.example"}],
+                  "name": "其他书签", "type": "folder"},
+    },
+    "version": 1,
+}
+
+CHROME_EXPECTED = [
+    ("书签栏", "GitHub", "https://github.com/"),
+    ("Python {工具}", "引号 \"quoted\" \\ 反斜杠", "https://example.com/?q=a%20b&x=}"),
+    ("Python {工具}", "https://pypi.org", "https://pypi.org"),
+    ("书签栏", "GitHub again", "http://github.com"),
+    ("其他书签", "News", "https://news.example"),
+]
+
+
+@pytest.fixture(params=[1, 7, 64, 1 << 16])
+def chunk(request, monkeypatch):
+    # 块边界落在标签、实体、转义序列和字符串中间
+    monkeypatch.setattr(bookmark_core, "IMPORT_CHUNK", request.param)
+
+
+def test_netscape(chunk):
+    assert list(iter_bookmark_file(io.StringIO(NETSCAPE))) == NETSCAPE_EXPECTED
+
+
+@pytest.mark.parametrize("indent", [None, 3])
+@pytest.mark.parametrize("ensure_ascii", [False, True])  # True 时中文写成 \uXXXX 转义
+@pytest.mark.parametrize("bom", ["", "\ufeff"])
+def test_chrome(chunk, indent, ensure_ascii, bom):
+    text = bom + json.dumps(CHROME, indent=indent, ensure_ascii=ensure_ascii)
+    assert list(iter_bookmark_file(io.StringIO(text))) == CHROME_EXPECTED
+
+
+def test_plan_import_dedupes():
+    seen = SeenUrls({"开发": [make_site("GitHub", "https://github.com")]})
+    groups = {"开发"}
+    ops, skipped = plan_import(groups, NETSCAPE_EXPECTED, seen)
+    assert skipped == 2  # 已收藏的 github.com，以及文件里重复的那条
+    assert [(op["op"], op["group"], op.get("site", {}).get("name")) for op in ops] == [
+        ("add_group", IMPORT_DEFAULT_GROUP, None),
+        ("add", IMPORT_DEFAULT_GROUP, "顶层"),
+        ("add_group", "Python & 工具", None),
+        ("add", "Python & 工具", "AT&T 中文 <tag>"),
+        ("add", "Python & 工具", "https://pypi.org"),
+        ("add_group", "阅读", None),
+        ("add", "阅读", "News"),
+    ]
+    assert groups == {"开发", IMPORT_DEFAULT_GROUP, "Python & 工具", "阅读"}
+    ops, skipped = plan_import(groups, [("阅读", "News", "https://news.example/#again")], seen)  # 跨批次
+    assert (ops, skipped) == ([], 1)
+
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_import_file(tmp_path, storage):
+    path = tmp_path / "bookmarks.html"
+    path.write_text(NETSCAPE, encoding="utf-8")
+    with BookmarkStore(str(tmp_path / "bookmarks.json"), storage) as store:
+        store.add_site("开发", "GitHub", "https://github.com")
+        assert store.import_file(str(path)) == (4, 2)
+        assert store.import_file(str(path)) == (0, 6)
+        assert [site["name"] for site in store.sites("Python & 工具")] == ["AT&T 中文 <tag>", "https://pypi.org"]
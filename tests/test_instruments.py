@@ -0,0 +1,80 @@
+"""safe_action 的统计：互相调用的处理函数只计最外层；CountingTk 只在启用期间装在控件上。"""
+import pytest
+
+import web_manager_2
+from web_manager_2 import CountingTk, Instruments, safe_action
+
+
+class Handlers:
+    ready = True
+    current_active_group = None
+
+    def refresh_group_list(self):
+        pass
+
+    @safe_action
+    def on_site_release(self, fail=False):
+        self.on_drag_release(fail)
+
+    @safe_action
+    def on_drag_release(self, fail=False):
+        if fail:
+            raise ValueError("boom")
+
+
+@pytest.fixture
+def instruments(monkeypatch):
+    inst = Instruments()
+    monkeypatch.setattr(web_manager_2, "INSTRUMENTS", inst)
+    return inst
+
+
+def test_nested_handlers_count_once(instruments):
+    handlers = Handlers()
+    handlers.on_site_release()
+    handlers.on_drag_release()
+    assert {name: entry["calls"] for name, entry in instruments.handlers.items()} == \
+        {"on_site_release": 1, "on_drag_release": 1}
+    assert instruments.depth == 0
+
+
+def test_inner_failure_counts_on_outer(instruments, capsys):
+    handlers = Handlers()
+    handlers.on_site_release(fail=True)
+    handlers.on_site_release()
+    assert instruments.handlers["on_site_release"]["errors"] == 1
+    assert "on_drag_release" not in instruments.handlers
+    assert "boom" in capsys.readouterr().out
+
+
+class RawTk:
+    def call(self, *args):
+        return args
+
+
+class Widget:
+    def __init__(self, master=None):
+        self.children = {}
+        self.tk = master.tk if master else RawTk()
+        if master:
+            master.children[str(id(self))] = self
+
+
+def test_counting_only_while_enabled(instruments):
+    root = Widget()
+    raw = root.tk
+    child = Widget(Widget(root))
+    instruments.attach(root)
+    assert child.tk is raw  # 默认不包装
+    instruments.enable()
+    instruments.enable()  # 调试面板和 --record-stats 同时启用
+    assert isinstance(child.tk, CountingTk)
+    child.tk.call("update")
+    late = Widget(root)  # 启用期间新建的控件沿用父控件的 tk
+    late.tk.call("update")
+    instruments.disable()
+    assert isinstance(child.tk, CountingTk)
+    instruments.disable()
+    assert child.tk is raw and late.tk is raw and root.tk is raw
+    child.tk.call("update")
+    assert instruments.tk_calls() == 2
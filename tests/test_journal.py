@@ -0,0 +1,124 @@
+"""JournalStore：日志回放、按快照 sha1 判断日志是否过期、末尾半行的恢复和合并快照。"""
+import hashlib
+import json
+
+import bookmark_core
+from bookmark_core import JournalStore, atomic_write, encode_op, snapshot_data
+
+
+def add(group, name):
+    return {"op": "add", "group": group, "site": {"name": name, "url": f"https://{name}.example", "note": ""}}
+
+
+def write(store, *ops):
+    # 与 BookmarkStore.flush 相同：先改内存，需要合并时才带上快照
+    for op in ops:
+        bookmark_core.apply_op(store.data, op)
+    snapshot = store.snapshot() if store.needs_compact(len(ops)) else None
+    store.write_batch([encode_op(op, store.writer) for op in ops], snapshot)
+
+
+def names(data, group):
+    return [site["name"] for site in data[group]]
+
+
+def journal_lines(path):
+    with open(path + ".journal", 'rb') as f:
+        return f.read().splitlines()
+
+
+def snapshot_sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def fresh(tmp_path):
+    path = str(tmp_path / "bookmarks.json")
+    store = JournalStore(path)
+    store.load()
+    write(store, {"op": "add_group", "group": "g"})  # 还没有快照：第一次写入直接合并
+    return path, store
+
+
+def test_replay_restores_journaled_ops(tmp_path):
+    path, store = fresh(tmp_path)
+    write(store, add("g", "a"))
+    write(store, add("g", "b"), {"op": "move", "group": "g", "index": 1, "to": 0})
+    store.close()
+    lines = journal_lines(path)
+    assert json.loads(lines[0]) == {"base": snapshot_sha1(path)}
+    assert len(lines) == 4
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)["g"] == []  # 修改只在日志里
+    assert names(JournalStore(path).load(), "g") == ["b", "a"]
+
+
+def test_replay_skips_conflicting_ops(tmp_path):
+    path, store = fresh(tmp_path)
+    write(store, add("g", "a"))
+    store.close()
+    with open(path + ".journal", 'a', encoding='utf-8') as f:
+        f.write(encode_op({"op": "delete", "group": "gone", "index": 0}, "other"))
+        f.write(encode_op(add("g", "b"), "other"))
+    assert names(JournalStore(path).load(), "g") == ["a", "b"]
+
+
+def test_journal_of_older_snapshot_is_not_replayed(tmp_path):
+    # 合并时写完新快照、还没换日志就崩溃：旧日志的 base 对不上，不能再回放一遍
+    path, store = fresh(tmp_path)
+    write(store, add("g", "a"))
+    store.close()
+    merged = snapshot_data(JournalStore(path).load())
+    atomic_write(path, json.dumps(merged, ensure_ascii=False, indent=4).encode('utf-8'))
+    reopened = JournalStore(path)
+    assert names(reopened.load(), "g") == ["a"]
+    assert journal_lines(path) == [json.dumps({"base": snapshot_sha1(path)}).encode()]  # 换成了新的空日志
+    write(reopened, add("g", "b"))
+    reopened.close()
+    assert names(JournalStore(path).load(), "g") == ["a", "b"]
+
+
+def test_torn_last_line_is_dropped_and_compacted(tmp_path):
+    path, store = fresh(tmp_path)
+    write(store, add("g", "a"))
+    store.close()
+    with open(path + ".journal", 'ab') as f:
+        f.write(encode_op(add("g", "torn"), "other").encode()[:-10])  # 崩溃时写了一半
+    reopened = JournalStore(path)
+    assert names(reopened.load(), "g") == ["a"]
+    with open(path, encoding='utf-8') as f:
+        assert [site["name"] for site in json.load(f)["g"]] == ["a"]  # 立即合并进快照
+    assert len(journal_lines(path)) == 1
+    write(reopened, add("g", "b"))  # 之后的追加不会接在半行后面
+    reopened.close()
+    assert names(JournalStore(path).load(), "g") == ["a", "b"]
+
+
+def test_compacts_at_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(bookmark_core, "COMPACT_THRESHOLD", 3)
+    path, store = fresh(tmp_path)
+    for name in ("a", "b"):
+        write(store, add("g", name))
+    assert len(journal_lines(path)) == 3
+    write(store, add("g", "c"))
+    assert len(journal_lines(path)) == 1
+    with open(path, encoding='utf-8') as f:
+        assert [site["name"] for site in json.load(f)["g"]] == ["a", "b", "c"]
+    assert json.loads(journal_lines(path)[0]) == {"base": snapshot_sha1(path)}
+    store.close()
+
+
+def test_no_compaction_over_foreign_ops(tmp_path):
+    # 快照取出后别的实例又追加了操作：这次只写日志，不能用缺少它们的快照覆盖
+    path, store = fresh(tmp_path)
+    other = JournalStore(path)
+    other.load()
+    snapshot = store.snapshot()
+    write(other, add("g", "theirs"))
+    bookmark_core.apply_op(store.data, add("g", "mine"))
+    store.write_batch([encode_op(add("g", "mine"), store.writer)], snapshot)
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)["g"] == []
+    store.close()
+    other.close()
+    assert names(JournalStore(path).load(), "g") == ["theirs", "mine"]
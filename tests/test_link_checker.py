@@ -0,0 +1,112 @@
+"""LinkChecker 对本地 HTTP 服务的检查结果、HEAD 回退、连接复用和结果缓存。"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+from web_manager_2 import LinkChecker
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive，检查连接是否被复用
+    routes = {"/ok": 200, "/moved": 301, "/missing": 404, "/broken": 500}
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def reply(self, status, body=b""):
+        self.send_response(status)
+        if status == 301:
+            self.send_header("Location", "/ok")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command == "GET":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        path = urlsplit(self.path).path
+        if path == "/no-head":
+            self.reply(405)  # 不支持 HEAD 的服务器
+        else:
+            self.reply(self.routes.get(path, 404))
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        self.reply(200 if path == "/no-head" else self.routes.get(path, 404), b"hello")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.lock = threading.Lock()
+    httpd.connections = 0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def run(checker, urls):
+    total = checker.start(urls)
+    results = {}
+    while True:
+        item = checker.results.get(timeout=30)
+        if item is None:
+            return total, results
+        results[item[0]] = item[1]
+
+
+def test_statuses_and_cache(server, tmp_path):
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [base + path for path in ("/ok", "/moved", "/missing", "/broken", "/no-head")] + ["ftp://example.com/"]
+    cache_path = str(tmp_path / "links.json")
+    checker = LinkChecker(cache_path)
+    total, results = run(checker, urls + urls[:2])  # 重复的网址只检查一次
+    assert total == len(urls)
+    assert {url: entry[:2] for url, entry in results.items()} == {
+        base + "/ok": [200, True],
+        base + "/moved": [301, True],
+        base + "/missing": [404, False],
+        base + "/broken": [500, False],
+        base + "/no-head": [200, True],
+        "ftp://example.com/": ["无效网址", False],
+    }
+    assert checker.stats["checked"] == len(urls)
+    assert checker.stats["failed"] == 3
+
+    # 结果写入磁盘缓存，有效期内再次检查时直接跳过
+    with open(cache_path, encoding="utf-8") as f:
+        assert set(json.load(f)) == set(urls)
+    again = LinkChecker(cache_path)
+    assert again.status(base + "/ok")[:2] == [200, True]
+    assert run(again, urls) == (0, {})
+
+
+def test_connections_are_reused(server, tmp_path):
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/ok?n={i}" for i in range(40)]
+    total, results = run(LinkChecker(str(tmp_path / "links.json")), urls)
+    assert total == 40 and all(entry[1] for entry in results.values())
+    assert server.connections <= 8  # 每个主机最多 LINK_CHECK_PER_HOST 个并发请求，连接用完放回复用
+
+
+def test_unreachable_host(tmp_path):
+    # 端口上没有服务：连接被拒绝，记为失败而不是抛出异常
+    _, results = run(LinkChecker(str(tmp_path / "links.json")), ["http://127.0.0.1:9/"])
+    status, ok, _ = results["http://127.0.0.1:9/"]
+    assert not ok and status == "ConnectionRefusedError"
+
+
+def test_malformed_hosts_finish(tmp_path):
+    # 域名编码失败 (UnicodeError) 不能让检查线程退出而不发出结束标记
+    urls = ["http://a..b.example/", f"http://{'x' * 64}.example/"]
+    total, results = run(LinkChecker(str(tmp_path / "links.json")), urls)
+    assert total == 2
+    assert {url: entry[:2] for url, entry in results.items()} == {url: ["无效网址", False] for url in urls}
@@ -0,0 +1,49 @@
+"""plan_shift / plan_moves：多选的记录整体上移、下移、置顶、置底，以及拖动排序。"""
+import pytest
+
+from web_manager_2 import plan_moves, plan_shift
+
+
+def run(items, moves):
+    # 与 apply_op 的 "move" 相同：取出后插入到 to
+    items = list(items)
+    for i, to in moves:
+        items.insert(to, items.pop(i))
+    return "".join(items)
+
+
+def shift(items, selected, direction):
+    return run(items, plan_shift([items.index(c) for c in selected], len(items), direction))
+
+
+@pytest.mark.parametrize("selected, direction, expected", [
+    ("c", "up", "acbdef"),
+    ("bd", "up", "badcef"),
+    ("cd", "up", "acdbef"),  # 连续的几条作为整体移动
+    ("ab", "up", "abcdef"),  # 已在顶部
+    ("abd", "up", "abdcef"),  # 顶到头的保持不动，其余的照常上移
+    ("ce", "down", "abdcfe"),
+    ("ef", "down", "abcdef"),
+    ("def", "down", "abcdef"),
+    ("bf", "down", "acbdef"),
+    ("bd", "top", "bdacef"),
+    ("bd", "bottom", "acefbd"),
+    ("f", "top", "fabcde"),
+    ("a", "bottom", "bcdefa"),
+])
+def test_shift(selected, direction, expected):
+    assert shift("abcdef", selected, direction) == expected
+
+
+def test_shift_no_moves_when_blocked():
+    assert plan_shift([0, 1], 5, "up") == []
+    assert plan_shift([3, 4], 5, "down") == []
+    assert plan_shift([0, 1], 5, "top") == []
+    assert plan_shift([3, 4], 5, "bottom") == []
+
+
+def test_plan_moves_keeps_order():
+    # 拖动排序：选中的记录按原有先后顺序放到 target 之前
+    items = "abcdefg"
+    assert run(items, plan_moves([1, 5], 3)) == "acbfdeg"
+    assert run(items, plan_moves([0, 6], 3)) == "bcagdef"
@@ -0,0 +1,73 @@
+"""多个进程同时写同一个收藏库：每个进程的修改在最终数据中都要保留下来。"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bookmark_core import BookmarkStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WRITERS = ("A", "B", "C")
+STEPS = 150
+
+# 每个进程只改自己添加的网站（网址以自己的标记开头），记下它们最终应在的分组和备注。
+# 合并阈值调小，让日志在运行中被各个进程反复合并成快照
+WORKER = r'''
+import json, random, sys
+import bookmark_core
+from bookmark_core import BookmarkStore
+
+path, storage, tag, steps = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+bookmark_core.COMPACT_THRESHOLD = 20
+rnd = random.Random(tag)
+mine = {}  # 网址 -> [分组, 备注]
+with BookmarkStore(path, storage) as store:
+    for i in range(steps):
+        r = rnd.random()
+        own = sorted(mine)
+        if r < 0.15 and own:
+            url = rnd.choice(own)
+            assert store.delete_urls([url]) == 1
+            del mine[url]
+        elif r < 0.3 and own:
+            url = rnd.choice(own)
+            with store.batch():
+                group, index, _ = store.locate([url])[0]
+                store.apply([{"op": "edit", "group": group, "index": index, "site": {"note": f"n{i}"}}])
+            mine[url][1] = f"n{i}"
+        elif r < 0.4 and own:
+            url = rnd.choice(own)
+            to_group = rnd.choice(("g1", "g2"))
+            store.move_urls([url], to_group)
+            mine[url][0] = to_group
+        else:
+            with store.batch():
+                for k in range(rnd.randint(1, 3)):
+                    url = f"https://example.com/{tag}/{i}/{k}"
+                    store.add_site("g1", url, url)
+                    mine[url] = ["g1", ""]
+json.dump(mine, sys.stdout)
+'''
+
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_concurrent_writers_keep_every_write(tmp_path, storage):
+    path = str(tmp_path / "bookmarks.json")
+    with BookmarkStore(path, storage) as store:
+        store.add_group("g1")
+        store.add_group("g2")
+        expected = {site["url"]: [group, site["note"]] for group in store.groups() for site in store.sites(group)}
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER, path, storage, tag, str(STEPS)],
+                              stdout=subprocess.PIPE, env=env) for tag in WRITERS]
+    for proc in procs:
+        out, _ = proc.communicate(timeout=120)
+        assert proc.returncode == 0
+        expected.update(json.loads(out))
+
+    with BookmarkStore(path, storage) as store:
+        got = {site["url"]: [group, site["note"]] for group in store.groups() for site in store.sites(group)}
+    assert got == expected
@@ -0,0 +1,135 @@
+"""apply_op / inverse_op / UndoHistory：每种操作应用、撤销、重做后数据一致，按网址重新定位，以及撤销历史的预算。"""
+import pytest
+
+from bookmark_core import (UndoHistory, apply_op, inverse_op, with_match, op_cost, make_site, snapshot_data)
+
+
+def build():
+    return {
+        "开发": [make_site("GitHub", "https://github.com"), make_site("GitLab", "https://gitlab.com"),
+               make_site("Go", "https://go.dev", "golang")],
+        "阅读": [make_site("HN", "https://news.ycombinator.com")],
+        "空": [],
+    }
+
+
+def run(data, ops):
+    # 与界面的 apply_batch 相同：逐条补上 match、先求逆操作再应用，逆操作倒序返回
+    inverse = []
+    for op in ops:
+        with_match(data, op)
+        inverse.append(inverse_op(data, op))
+        apply_op(data, op)
+    return inverse[::-1]
+
+
+def state(data):
+    return list(snapshot_data(data).items())
+
+
+CASES = {
+    "add": [{"op": "add", "group": "开发", "index": 1, "site": {"name": "New", "url": "https://new.example", "note": ""}}],
+    "add_end": [{"op": "add", "group": "空", "site": {"name": "New", "url": "https://new.example", "note": ""}}],
+    "edit": [{"op": "edit", "group": "开发", "index": 2, "site": {"url": "https://golang.org", "note": ""}}],
+    "delete": [{"op": "delete", "group": "开发", "index": 0}],
+    "move": [{"op": "move", "group": "开发", "index": 0, "to": 2}],
+    "transfer": [{"op": "transfer", "group": "开发", "index": 1, "to_group": "阅读", "to": 0}],
+    "add_group": [{"op": "add_group", "group": "新分组"}],
+    "delete_group": [{"op": "delete_group", "group": "开发"}],
+    "rename_group": [{"op": "rename_group", "group": "阅读", "name": "读物"}],
+    "move_group": [{"op": "move_group", "group": "空", "index": 0}],
+    "batch": [{"op": "add_group", "group": "新分组"},
+              {"op": "transfer", "group": "开发", "index": 0, "to_group": "新分组", "to": 0},
+              {"op": "edit", "group": "新分组", "index": 0, "site": {"name": "Hub"}},
+              {"op": "move", "group": "开发", "index": 1, "to": 0},
+              {"op": "delete", "group": "阅读", "index": 0},
+              {"op": "rename_group", "group": "空", "name": "不空"},
+              {"op": "add", "group": "不空", "site": {"name": "X", "url": "https://x.example", "note": ""}},
+              {"op": "delete_group", "group": "阅读"}],
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_round_trip(name):
+    data = build()
+    before = state(data)
+    ops = CASES[name]
+    inverse = run(data, ops)
+    after = state(data)
+    assert after != before
+    apply_op(data, {"op": "batch", "ops": inverse})
+    assert state(data) == before
+    apply_op(data, {"op": "batch", "ops": ops})  # 重做
+    assert state(data) == after
+
+
+def test_undo_relocates_by_url():
+    # 另一个实例在前面插入了一条：撤销时下标对不上，按 match 的网址找到原记录
+    data = build()
+    inverse = run(data, [{"op": "edit", "group": "开发", "index": 1, "site": {"name": "GL"}}])
+    apply_op(data, {"op": "add", "group": "开发", "index": 0,
+                    "site": {"name": "Other", "url": "https://other.example", "note": ""}})
+    apply_op(data, {"op": "batch", "ops": inverse})
+    assert [site["name"] for site in data["开发"]] == ["Other", "GitHub", "GitLab", "Go"]
+    assert inverse[0]["index"] == 2  # 重新定位后的下标写回操作，供索引等监听者读取
+
+
+def test_undo_of_removed_site_is_void():
+    data = build()
+    inverse = run(data, [{"op": "move", "group": "开发", "index": 0, "to": 1}])
+    apply_op(data, {"op": "delete", "group": "开发", "index": 1})  # 另一个实例删掉了被移动的那条
+    with pytest.raises(IndexError):
+        apply_op(data, {"op": "batch", "ops": inverse})
+
+
+def test_restore_group_keeps_site_objects():
+    # 撤销删除分组时放回的是原来的记录对象，界面的行 iid 不变
+    data = build()
+    sites = data["开发"]
+    inverse = run(data, [{"op": "delete_group", "group": "开发"}])
+    apply_op(data, inverse[0])
+    assert all(a is b for a, b in zip(data["开发"], sites))
+
+
+def test_op_cost():
+    assert op_cost({"op": "delete", "group": "g", "index": 0}) == 1
+    assert op_cost({"op": "restore_group", "group": "g", "index": 0, "sites": [{}] * 5}) == 6
+    assert op_cost({"op": "batch", "ops": [{"op": "add_group", "group": "g"},
+                                           {"op": "restore_group", "group": "h", "index": 0, "sites": [{}] * 3}]}) == 6
+
+
+def restore(n):
+    return {"op": "restore_group", "group": "g", "index": 0, "sites": [{}] * n}
+
+
+def test_history_evicts_oldest_over_budget():
+    history = UndoHistory(budget=10, max_steps=100)
+    for i in range(5):
+        history.record(f"step {i}", [{"op": "add_group", "group": str(i)}], [{"op": "delete_group", "group": str(i)}])
+    assert history.cost == 10 and len(history.undo_stack) == 5
+    history.record("big", [{"op": "delete_group", "group": "g"}], [restore(4)])  # 花费 1 + 5
+    assert [e[0] for e in history.undo_stack] == ["step 3", "step 4", "big"]
+    assert history.cost == 10
+
+
+def test_history_keeps_latest_step_over_budget():
+    history = UndoHistory(budget=10, max_steps=100)
+    history.record("small", [{"op": "add_group", "group": "a"}], [{"op": "delete_group", "group": "a"}])
+    history.record("huge", [{"op": "delete_group", "group": "g"}], [restore(50)])
+    assert [e[0] for e in history.undo_stack] == ["huge"]
+    assert history.undo()[0] == "huge"
+
+
+def test_history_max_steps_and_redo():
+    history = UndoHistory(budget=1000, max_steps=3)
+    for i in range(5):
+        history.record(f"step {i}", [{"op": "add_group", "group": str(i)}], [{"op": "delete_group", "group": str(i)}])
+    assert [e[0] for e in history.undo_stack] == ["step 2", "step 3", "step 4"]
+    assert history.undo()[0] == "step 4"
+    assert history.undo()[0] == "step 3"
+    assert history.redo()[0] == "step 3"
+    assert history.cost == 6  # 撤销 / 重做只在两个栈之间移动，总占用不变
+    history.record("new", [{"op": "add_group", "group": "n"}], [{"op": "delete_group", "group": "n"}])
+    assert history.redo() is None  # 新的修改清空重做栈，其占用一并扣除
+    assert history.cost == 6
+    assert [e[0] for e in history.undo_stack] == ["step 2", "step 3", "new"]
@@ -0,0 +1,105 @@
+"""PersistScheduler：每次修改都顺延写盘，连续修改时最迟 max_delay_ms 写一次。"""
+import pytest
+
+import web_manager_2
+from web_manager_2 import PersistScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.ms = 100000  # 按整数毫秒计时，避免浮点误差让到期判断差一点
+
+    def __call__(self):
+        return self.ms / 1000
+
+
+class Timers:
+    """代替 Tk 根窗口的 after / after_cancel，由测试推进时间。"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.pending = {}  # id -> (到期时间, 回调)
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.pending[self.next_id] = (self.clock.ms + ms, callback)
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def advance(self, ms):
+        end = self.clock.ms + ms
+        while True:
+            due = [(t, i) for i, (t, _) in self.pending.items() if t <= end]
+            if not due:
+                break
+            t, i = min(due)
+            self.clock.ms = t
+            self.pending.pop(i)[1]()
+        self.clock.ms = end
+
+
+class Store:
+    writer = "me"
+
+    def __init__(self):
+        self.writes = []
+
+    def needs_compact(self, pending=0):
+        return False
+
+    def snapshot(self):
+        return None
+
+    def write_batch(self, lines, snapshot=None):
+        self.writes.append(len(lines))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(web_manager_2.time, "monotonic", clock)
+    timers = Timers(clock)
+    store = Store()
+    persist = PersistScheduler(timers, store, delay_ms=300, max_delay_ms=2000)
+    yield persist, timers, store
+    persist.close()
+
+
+def edit():
+    return {"op": "edit", "group": "g", "index": 0, "site": {"note": "x"}}
+
+
+def test_each_mark_postpones_the_write(scheduler):
+    persist, timers, store = scheduler
+    persist.mark_dirty(edit())
+    timers.advance(200)
+    persist.mark_dirty(edit())
+    timers.advance(200)  # 距第一次修改已过 400ms，但距最近一次只有 200ms
+    assert persist.stats["writes"] == 0
+    timers.advance(100)
+    assert persist.stats["writes"] == 1 and list(persist.batch_sizes) == [2]
+
+
+def test_continuous_edits_write_by_max_delay(scheduler):
+    persist, timers, store = scheduler
+    for _ in range(25):  # 每 100ms 一次，一直不静默
+        persist.mark_dirty(edit())
+        timers.advance(100)
+    assert list(persist.batch_sizes) == [20]  # 第一条修改后 2000ms 写盘
+    timers.advance(300)
+    assert list(persist.batch_sizes) == [20, 5]
+
+
+def test_one_timer_per_burst(scheduler):
+    persist, timers, store = scheduler
+    for _ in range(1000):
+        persist.mark_dirty(edit())
+    assert timers.next_id == 1  # 连续修改不重排定时器
+    timers.advance(300)
+    assert list(persist.batch_sizes) == [1000]
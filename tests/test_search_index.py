@@ -0,0 +1,43 @@
+"""SearchIndex：英文前缀、单个字母的短查询和中文双字查询。"""
+from bookmark_core import SearchIndex, make_site
+
+
+def build():
+    data = {
+        "开发": [make_site("GitHub", "https://github.com"), make_site("GitLab", "https://gitlab.com"),
+               make_site("Go 文档", "https://go.dev/doc", "golang")],
+        "阅读": [make_site("Hacker News", "https://news.ycombinator.com"),
+               make_site("知乎", "https://www.zhihu.com", "问答社区")],
+    }
+    return SearchIndex(data)
+
+
+def names(results):
+    return [site["name"] for site in results]
+
+
+def test_word_prefix():
+    assert names(build().search("git")) == ["GitHub", "GitLab"]
+    assert names(build().search("githu")) == ["GitHub"]
+
+
+def test_single_letter_queries():
+    index = build()
+    assert names(index.search("g")) == ["GitHub", "GitLab", "Go 文档"]
+    assert names(index.search("h")) == ["Hacker News"]  # 按词首匹配，"github" 中间的 h 不算
+    assert names(index.search("z")) == ["知乎"]
+    assert index.search("q") == []
+    assert names(index.search("g d")) == ["Go 文档"]
+    assert names(index.search("g c")) == ["GitHub", "GitLab"]
+
+
+def test_short_query_respects_limit():
+    data = {"g": [make_site(f"site {i}", f"https://s{i}.example.com") for i in range(100)]}
+    assert names(SearchIndex(data).search("s", limit=3)) == ["site 0", "site 1", "site 2"]
+
+
+def test_cjk_queries():
+    index = build()
+    assert names(index.search("知")) == ["知乎"]
+    assert names(index.search("问答")) == ["知乎"]
+    assert index.search("问题") == []
@@ -0,0 +1,112 @@
+"""SQLite 模式的搜索、查重和导入去重：查询库里的索引表，结果与内存索引一致，且不读出分组数据。"""
+import sqlite3
+
+import pytest
+
+from bookmark_core import (SearchIndex, DuplicateIndex, SeenUrls, SqliteStore, apply_op, make_site,
+                           migrate_json_to_sqlite, export_json, search_index_for, duplicate_index_for,
+                           first_sites, plan_import)
+
+
+def sample():
+    return {
+        "开发": [make_site("GitHub", "https://github.com"), make_site("GitLab", "https://gitlab.com"),
+               make_site("Go 文档", "https://go.dev/doc", "golang")],
+        "阅读": [make_site("Hacker News", "https://news.ycombinator.com"),
+               make_site("知乎", "https://www.zhihu.com", "问答社区"),
+               make_site("GitHub 镜像", "http://github.com/")],
+    }
+
+
+@pytest.fixture
+def library(tmp_path):
+    json_path = str(tmp_path / "bookmarks.json")
+    export_json(sample(), json_path)
+    migrate_json_to_sqlite(json_path, str(tmp_path / "bookmarks.db"))
+    store = SqliteStore(str(tmp_path / "bookmarks.db"))
+    yield store.load()
+    store.close()
+
+
+def names(results):
+    return [site["name"] for site in results]
+
+
+def untouched(library):
+    # 所有分组都还没有读过任何一页
+    return all(not view.pages for view in library.values())
+
+
+@pytest.mark.parametrize("query", ["git", "githu", "g", "h", "z", "q", "g d", "知", "问答", "问题", "镜像"])
+def test_search_matches_memory_index(library, query):
+    index = search_index_for(library)
+    assert names(index.search(query)) == names(SearchIndex(sample()).search(query))
+    assert untouched(library)
+
+
+def test_search_group_and_limit(library):
+    index = search_index_for(library)
+    found = index.search("git", limit=2)
+    assert names(found) == ["GitHub", "GitLab"]
+    assert [index.group_of(site) for site in found] == ["开发", "开发"]
+    apply_op(library, {"op": "transfer", "group": "开发", "index": 0, "to_group": "阅读", "to": 0})
+    index.apply(None, None)
+    assert index.group_of(found[0]) == "阅读"
+
+
+def test_search_follows_edits(library):
+    index = search_index_for(library)
+    apply_op(library, {"op": "edit", "group": "阅读", "index": 0, "site": {"name": "HN", "note": "黑客新闻"}})
+    apply_op(library, {"op": "delete", "group": "开发", "index": 2})
+    apply_op(library, {"op": "add", "group": "开发", "site": make_site("Rust", "https://rust-lang.org")})
+    assert names(index.search("新闻")) == ["HN"]
+    assert index.search("hacker") == []
+    assert index.search("golang") == []
+    assert names(index.search("rust")) == ["Rust"]
+
+
+def test_duplicates(library):
+    dup = duplicate_index_for(library)
+    expected = DuplicateIndex(sample())
+    assert [(g, site["name"]) for g, site in dup.lookup("HTTPS://www.GitHub.com/#top")] == \
+        [(g, site["name"]) for g, site in expected.lookup("HTTPS://www.GitHub.com/#top")]
+    report = [(key, [(g, site["name"]) for g, site in entries]) for key, entries in dup.report()]
+    assert report == [("github.com", [("开发", "GitHub"), ("阅读", "GitHub 镜像")])]
+    assert untouched(library)
+    apply_op(library, {"op": "edit", "group": "阅读", "index": 2, "site": {"url": "https://mirror.example"}})
+    assert dup.report() == []
+
+
+def test_import_seen_uses_index(library):
+    seen = SeenUrls(library)
+    groups = set(library.keys())
+    batch = [("开发", "GitHub", "http://github.com/?utm_source=x"), ("新", "A", "https://a.example"),
+             ("新", "A again", "https://a.example/")]
+    ops, skipped = plan_import(groups, batch, seen)
+    assert skipped == 2
+    assert [op["op"] for op in ops] == ["add_group", "add"]
+    assert untouched(library)
+
+
+def test_first_sites(library):
+    first = first_sites(library, ["https://github.com", "https://missing.example"])
+    assert {url: (g, site["name"]) for url, (g, site) in first.items()} == {"https://github.com": ("开发", "GitHub")}
+
+
+def test_upgrade_builds_indexes_for_old_database(tmp_path):
+    # 旧版本建的库没有 site_keys / site_fts：打开时补建一次
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE groups (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, position REAL NOT NULL);
+        CREATE TABLE sites (id INTEGER PRIMARY KEY, group_id INTEGER NOT NULL, position REAL NOT NULL,
+                            name TEXT NOT NULL, url TEXT NOT NULL, note TEXT NOT NULL DEFAULT '');
+        INSERT INTO groups VALUES (1, 'g', 0);
+        INSERT INTO sites VALUES (1, 1, 0, 'Example', 'https://example.com', ''), (2, 1, 1, 'Copy', 'http://example.com/', '');
+    """)
+    conn.close()
+    store = SqliteStore(path)
+    library = store.load()
+    assert names(search_index_for(library).search("copy")) == ["Copy"]
+    assert len(duplicate_index_for(library).report()) == 1
+    store.close()
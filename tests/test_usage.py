@@ -0,0 +1,116 @@
+"""UsageLog：按半衰期衰减的常用度排序、多个实例同时追加以及日志合并成快照。"""
+import json
+import os
+import subprocess
+import sys
+
+import bookmark_core
+from bookmark_core import UsageLog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DAY = 86400
+NOW = 1_700_000_000
+
+
+def usage(tmp_path, **kwargs):
+    return UsageLog(str(tmp_path / "bookmarks.usage"), **kwargs).load()
+
+
+def record(log, urls, stamp):
+    # 与界面的 UsageWriter 相同：note() 更新内存，append() 写盘
+    log.append(log.note(urls, stamp))
+
+
+def test_frecency_ordering(tmp_path):
+    log = usage(tmp_path, half_life=14 * DAY)
+    for _ in range(3):
+        record(log, ["https://old.example"], NOW - 60 * DAY)  # 三次，但已过了四个多半衰期
+    record(log, ["https://recent.example"], NOW - DAY)
+    record(log, ["https://twice.example"], NOW - 28 * DAY)
+    record(log, ["https://twice.example"], NOW - 28 * DAY)
+    assert log.ranked() == ["https://recent.example", "https://twice.example", "https://old.example"]
+    assert log.count("https://old.example") == 3
+    assert abs(log.score("https://twice.example", now=NOW) - 0.5) < 1e-9  # 两个半衰期前的两次，各剩四分之一
+    assert log.score("https://never.example") == 0.0
+    assert log.rank("https://never.example") == float("-inf")
+    # rank 不随时间变化：晚些时候再打开一次，排序只受这一条影响
+    record(log, ["https://old.example"], NOW)
+    assert log.ranked()[0] == "https://old.example"
+
+
+def test_reload_matches_memory(tmp_path):
+    log = usage(tmp_path)
+    record(log, ["https://a.example", "https://b.example"], NOW)
+    record(log, ["https://a.example"], NOW + DAY)
+    again = usage(tmp_path)
+    assert again.counters == log.counters
+    assert again.ranked() == ["https://a.example", "https://b.example"]
+
+
+def test_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(bookmark_core, "USAGE_COMPACT_EVENTS", 5)
+    log = usage(tmp_path)
+    for i in range(4):
+        record(log, [f"https://{i % 2}.example"], NOW + i)
+    assert not os.path.exists(log.snapshot_path)
+    record(log, ["https://0.example"], NOW + 4)
+    with open(log.snapshot_path, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    with open(log.log_path, encoding='utf-8') as f:
+        assert f.read() == snapshot["gen"] + "\n"  # 日志清空，首行接续新快照
+    assert {url: entry[0] for url, entry in snapshot["urls"].items()} == {"https://0.example": 3, "https://1.example": 2}
+    record(log, ["https://1.example"], NOW + 5)
+    assert usage(tmp_path).count("https://1.example") == 3
+
+
+def test_stale_log_is_not_counted_twice(tmp_path):
+    # 合并时写完快照、还没换日志就崩溃：首行与快照代号不符的日志不再计入
+    log = usage(tmp_path)
+    record(log, ["https://a.example"], NOW)
+    with open(log.log_path, encoding='utf-8') as f:
+        stale = f.read()
+    with log.file_lock:
+        log.compact()
+    with open(log.log_path, 'w', encoding='utf-8') as f:
+        f.write(stale)
+    again = usage(tmp_path)
+    assert again.count("https://a.example") == 1
+    record(again, ["https://a.example"], NOW + 1)  # 换成新日志后，之后的追加照常计入
+    assert usage(tmp_path).count("https://a.example") == 2
+
+
+def test_appends_after_another_instance_compacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(bookmark_core, "USAGE_COMPACT_EVENTS", 3)
+    first, second = usage(tmp_path), usage(tmp_path)
+    record(first, ["https://a.example"], NOW)
+    record(second, ["https://b.example"] * 2, NOW)  # second 触发合并，换掉快照和日志
+    record(first, ["https://a.example"], NOW + 1)  # first 的日志首行必须改成新快照的代号
+    merged = usage(tmp_path)
+    assert merged.count("https://a.example") == 2
+    assert merged.count("https://b.example") == 2
+
+
+WORKER = r'''
+import sys
+import bookmark_core
+from bookmark_core import UsageLog
+
+base, tag, steps = sys.argv[1], sys.argv[2], int(sys.argv[3])
+bookmark_core.USAGE_COMPACT_EVENTS = 25  # 运行中反复合并
+log = UsageLog(base).load()
+for i in range(steps):
+    log.append(log.note([f"https://{tag}.example/{i % 10}", "https://shared.example"], 1_700_000_000 + i))
+'''
+
+
+def test_concurrent_instances_keep_every_event(tmp_path):
+    base = str(tmp_path / "bookmarks.usage")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    tags, steps = ("A", "B", "C"), 100
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER, base, tag, str(steps)], env=env) for tag in tags]
+    for proc in procs:
+        assert proc.wait(timeout=120) == 0
+    log = UsageLog(base).load()
+    assert log.count("https://shared.example") == len(tags) * steps
+    for tag in tags:
+        assert sum(log.count(f"https://{tag}.example/{i}") for i in range(10)) == steps
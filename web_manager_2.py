@@ -1,10 +1,36 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import webbrowser
 import json
 import os
 import functools
+import itertools
 import subprocess
+import bisect
+import hashlib
+import time
+import threading
+import queue
+import sys
+import argparse
+import re
+import heapq
+import math
+import http.client
+import ssl
+import shutil
+import shlex
+import struct
+import zlib
+import base64
+import urllib.request
+from collections import deque, OrderedDict
+from urllib.parse import urlsplit
+
+from bookmark_core import (DATA_FILE, COMPACT_THRESHOLD, IMPORT_BATCH, UNDO_BUDGET, UndoHistory, SeenUrls,
+                           search_index_for, duplicate_index_for, first_sites, apply_op, inverse_op, with_match,
+                           merge_groups, find_site, atomic_write, encode_op, open_store, export_json,
+                           iter_bookmark_file, plan_import, UsageLog, USAGE_SUFFIX)
 
 # === 🎨 全局配置 (Modern Clean - 现代极简风) ===
 COLORS = {
@@ -19,7 +45,7 @@ COLORS = {
     "white": "#FFFFFF",
     "success": "#10B981",  # 成功色
     "danger": "#EF4444",  # 危险色
-    "item_hover": "#F9FAFB",  # 列表项悬停
+    "item_hover": "#F1F5F9",  # 列表项悬停
     "item_selected": "#EFF6FF",  # 列表项选中 - 淡蓝
 }
 
@@ -51,6 +77,83 @@ POTENTIAL_BROWSERS = {
     ]
 }
 
+BROWSER_EXECUTABLES = {  # Linux / macOS 下在 PATH 中查找的可执行文件名
+    "Chrome": ["google-chrome", "google-chrome-stable"],
+    "Chromium": ["chromium", "chromium-browser"],
+    "Edge": ["microsoft-edge", "microsoft-edge-stable"],
+    "Firefox": ["firefox"],
+    "Brave": ["brave-browser", "brave"],
+}
+BROWSER_CONFIG = "browsers.json"  # 用户自定义浏览器 {"名称": "可执行文件路径"}，优先级最高
+BROWSER_DISCOVERY_DELAY_MS = 500  # 窗口显示后等待多久再在后台检测浏览器
+
+# === 启动配置 ===
+FADE_IN = True  # 启动时是否淡入窗口（约 300 ms），可用 --no-fade 关闭
+LOAD_POLL_MS = 15  # 后台读取数据期间主线程检查结果的间隔
+SEARCH_INDEX_POLL_MS = 100  # 后台建立搜索索引期间主线程检查结果的间隔
+
+# === 批量打开配置 ===
+OPEN_MAX_TABS = 40  # 每次调用浏览器最多传入的网址数
+OPEN_CMDLINE_LIMIT = 30000 if os.name == "nt" else 120000  # 命令行长度上限（Windows 为 32767 字符）
+OPEN_SPAWN_LIMIT = 2  # 同时处于启动中的浏览器进程数上限
+OPEN_SPAWN_WAIT = 5  # 每个浏览器进程最多等待多久（秒）再放行下一批
+
+# === 列表渲染配置 ===
+ROW_HEIGHT = 40  # 与 Treeview 样式中的 rowheight 保持一致
+VIRTUAL_THRESHOLD = 500  # 分组网站数超过该值时启用窗口化渲染
+VIRTUAL_OVERSCAN = 3  # 可见行之外额外生成的缓冲行数
+WHEEL_STEP = 3  # 滚轮每格滚动的行数
+DRAG_THRESHOLD = 6  # 按下后移动超过多少像素才算拖动，否则按单击处理
+HOVER_FRAME_MS = 16  # 悬停高亮每帧最多更新一次（约 60 fps）
+HOVER_STATS_INTERVAL_MS = 5000  # --hover-stats 时每隔多久打印一次悬停事件统计
+MOST_USED_GROUP = "⭐ 常用"  # 分组列表顶部的虚拟分组的显示名，汇总各分组中最常打开的网站
+MOST_USED_IID = "\x00most-used"  # 虚拟分组的 iid；真实分组以组名为 iid，组名里不会有 NUL 字符
+MOST_USED_LIMIT = 50  # 虚拟分组显示的网站数
+
+# === 存储配置 ===
+SHARED_POLL_MS = 1000  # 多久检查一次其他实例对数据文件的修改
+SAVE_DEBOUNCE_MS = 300  # 最后一次修改后静默多久再写盘，期间的修改合并为一次写入
+SAVE_MAX_DELAY_MS = 2000  # 持续修改时，第一条未写盘的修改最多等待多久就写盘
+
+# === 搜索配置 ===
+PALETTE_CHUNK = 2000  # 快速打开面板每个时间片匹配的候选数，保证输入不卡顿
+PALETTE_RESULTS = 30  # 快速打开面板显示的结果数
+
+# === 导入配置 ===
+IMPORT_QUEUE = 4  # 解析线程最多领先主线程的批次数（限制内存占用）
+
+# === 链接检查配置 ===
+LINK_CHECK_WORKERS = 16  # 同时检查的线程数
+LINK_CHECK_PER_HOST = 4  # 每个主机同时进行的请求数上限
+LINK_CHECK_TIMEOUT = 8  # 单个请求的超时（秒）
+LINK_CHECK_TTL = 6 * 3600  # 检查结果的有效期（秒），期内不重复检查
+LINK_CHECK_BODY_LIMIT = 64 * 1024  # GET 回退时最多读取的正文字节数
+
+# === 网站图标配置 ===
+FAVICON_SIZE = 16  # 列表中图标的显示尺寸（像素）
+FAVICON_WORKERS = 6  # 同时下载图标的线程数
+FAVICON_TIMEOUT = 5  # 单个图标请求的超时（秒）
+FAVICON_MAX_BYTES = 256 * 1024  # 超过该大小的图标不下载
+FAVICON_CACHE_BYTES = 16 * 1024 * 1024  # 磁盘图标缓存的大小上限，超出时淘汰最久未用的
+FAVICON_MEMORY = 512  # 内存中保留的已解码图标数（按主机）
+FAVICON_RETRY = 24 * 3600  # 没有图标的主机多久后重新尝试（秒）
+FAVICON_SCROLL_DELAY_MS = 120  # 滚动停止多久后才为可见行加载图标
+
+
+# === 动画配置 ===
+FRAME_MS = 16  # 动画调度器每帧的间隔（约 60 fps）
+REDUCE_MOTION = False  # 关闭所有动画（低配机器），可用 --reduce-motion 开启
+BUTTON_FADE_MS = 150  # 按钮悬停变色的时长
+TOAST_FADE_IN_MS = 180
+TOAST_FADE_OUT_MS = 270
+TOAST_HOLD_MS = 2000  # 提示完全显示后停留的时长
+TOAST_ALPHA = 0.9
+WINDOW_FADE_MS = 300  # 启动时窗口淡入的时长
+
+# === 运行时统计配置 ===
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)  # 处理函数耗时直方图各桶的上界
+DEBUG_OVERLAY_REFRESH_MS = 500  # 调试面板打开时的刷新间隔
+
 
 # === 视觉工具 ===
 
@@ -63,13 +166,62 @@ def rgb_to_hex(rgb):
     return '#{:02x}{:02x}{:02x}'.format(*[int(x) for x in rgb])
 
 
-def interpolate_color(c1, c2, t):
-    r1, g1, b1 = hex_to_rgb(c1)
-    r2, g2, b2 = hex_to_rgb(c2)
-    r = int(r1 + (r2 - r1) * t)
-    g = int(g1 + (g2 - g1) * t)
-    b = int(b1 + (b2 - b1) * t)
-    return rgb_to_hex((r, g, b))
+def interpolate_rgb(c1, c2, t):
+    # 参数是预先解析好的 RGB 元组，动画每帧不再解析十六进制字符串
+    return tuple(a + (b - a) * t for a, b in zip(c1, c2))
+
+
+class Animator:
+    """全局动画调度器：所有补间共用一个每帧触发一次的 after()。
+
+    animate(key, duration_ms, step, done) 中 step(t) 在每帧以 t∈[0, 1] 调用；同一 key 的
+    新动画会替换正在进行的动画。reduce_motion 为 True 时直接跳到终点。
+    """
+
+    def __init__(self, frame_ms=FRAME_MS, reduce_motion=REDUCE_MOTION):
+        self.frame_ms = frame_ms
+        self.reduce_motion = reduce_motion
+        self.tweens = {}  # key -> [开始时间, 时长, step, done]
+        self.widget = None  # 用来调用 after() 的主窗口（比单个按钮或提示框活得久）
+        self.after_id = None
+        self.stats = {"frames": 0, "steps": 0}
+
+    def animate(self, widget, key, duration_ms, step, done=None):
+        if self.reduce_motion or duration_ms <= 0:
+            self.tweens.pop(key, None)
+            self.run(step, 1.0, done)
+            return
+        self.tweens[key] = [time.perf_counter(), duration_ms / 1000, step, done]
+        if self.after_id is None:
+            self.widget = widget.nametowidget(".")
+            self.after_id = self.widget.after(self.frame_ms, self.tick)
+
+    def cancel(self, key):
+        self.tweens.pop(key, None)
+
+    def run(self, step, t, done=None):
+        try:
+            step(t)
+            if t >= 1.0 and done:
+                done()
+        except tk.TclError:
+            pass  # 控件已经销毁
+
+    def tick(self):
+        self.after_id = None
+        now = time.perf_counter()
+        self.stats["frames"] += 1
+        for key, (start, duration, step, done) in list(self.tweens.items()):
+            t = min(1.0, (now - start) / duration)
+            if t >= 1.0:
+                del self.tweens[key]
+            self.stats["steps"] += 1
+            self.run(step, t, done)
+        if self.tweens:
+            self.after_id = self.widget.after(self.frame_ms, self.tick)
+
+
+ANIMATOR = Animator()
 
 
 class ToastNotification:
@@ -90,25 +242,19 @@ class ToastNotification:
             self.top.geometry(f"+{x}+{y}")
         except:
             self.top.geometry("+100+100")
-        self.alpha = 0.0
-        self.top.attributes("-alpha", self.alpha)
+        self.top.attributes("-alpha", 0.0)
         self.fade_in()
 
+    def set_alpha(self, alpha):
+        self.top.attributes("-alpha", alpha)
+
     def fade_in(self):
-        if self.alpha < 0.9:
-            self.alpha += 0.1
-            self.top.attributes("-alpha", self.alpha)
-            self.top.after(20, self.fade_in)
-        else:
-            self.top.after(2000, self.fade_out)
+        ANIMATOR.animate(self.top, self, TOAST_FADE_IN_MS, lambda t: self.set_alpha(TOAST_ALPHA * t),
+                         lambda: self.top.after(TOAST_HOLD_MS, self.fade_out))
 
     def fade_out(self):
-        if self.alpha > 0:
-            self.alpha -= 0.1
-            self.top.attributes("-alpha", self.alpha)
-            self.top.after(30, self.fade_out)
-        else:
-            self.top.destroy()
+        ANIMATOR.animate(self.top, self, TOAST_FADE_OUT_MS, lambda t: self.set_alpha(TOAST_ALPHA * (1 - t)),
+                         self.top.destroy)
 
 
 class AnimatedButton(tk.Button):
@@ -117,61 +263,1520 @@ class AnimatedButton(tk.Button):
         super().__init__(master, text=text, command=command, bg=bg, fg=fg,
                          font=font, relief="flat", activebackground=bg,
                          activeforeground=fg, cursor="hand2", width=width, bd=0, **kwargs)
-        self.default_bg = bg
-        self.hover_bg = COLORS["primary_hover"]
-        self.current_bg = bg
-        self.target_bg = bg
-        self.animation_running = False
+        self.default_rgb = hex_to_rgb(bg)
+        self.hover_rgb = hex_to_rgb(COLORS["primary_hover"])
+        self.current_rgb = self.default_rgb
         self.bind("<Enter>", self.on_enter)
         self.bind("<Leave>", self.on_leave)
 
     def on_enter(self, e):
-        self.target_bg = self.hover_bg
-        if not self.animation_running:
-            self.animate()
+        self.animate(self.hover_rgb)
 
     def on_leave(self, e):
-        self.target_bg = self.default_bg
-        if not self.animation_running:
-            self.animate()
-
-    def animate(self):
-        self.animation_running = True
-        c1 = self.current_bg
-        c2 = self.target_bg
-        if c1 == c2:
-            self.animation_running = False
+        self.animate(self.default_rgb)
+
+    def animate(self, target):
+        # 从当前颜色出发，悬停中途移开时平滑折返
+        start = self.current_rgb
+        if start == target:
+            ANIMATOR.cancel(self)
             return
-        new_color = interpolate_color(c1, c2, 0.2)
-        self.configure(bg=new_color, activebackground=new_color)
-        self.current_bg = new_color
-        if self.current_bg == self.target_bg:
-            self.animation_running = False
+        ANIMATOR.animate(self, self, BUTTON_FADE_MS, lambda t: self.set_rgb(interpolate_rgb(start, target, t)))
+
+    def set_rgb(self, rgb):
+        self.current_rgb = rgb
+        color = rgb_to_hex(rgb)
+        self.configure(bg=color, activebackground=color)
+
+
+# === 列表辅助 ===
+def site_iid(site):
+    return f"s{site.uid}"
+
+
+def move_target(current_idx, total, direction):
+    if direction == "up":
+        return max(0, current_idx - 1)
+    if direction == "down":
+        return min(total - 1, current_idx + 1)
+    if direction == "top":
+        return 0
+    if direction == "bottom":
+        return total - 1
+    return current_idx
+
+
+def plan_moves(indices, target):
+    # 把若干条记录（保持原有先后顺序）移到 target 之前，返回依次执行的 (index, to)。
+    # target 之前的记录从后往前移、之后的从前往后移，这样每一步都不会打乱其余待移记录的下标。
+    before = sorted((i for i in indices if i < target), reverse=True)
+    after = sorted(i for i in indices if i >= target)
+    moves = [(i, target - 1 - n) for n, i in enumerate(before)]
+    moves += [(i, target + n) for n, i in enumerate(after)]
+    return [(i, to) for i, to in moves if i != to]
+
+
+def plan_shift(indices, total, direction):
+    # 右键菜单的上移 / 下移 / 置顶 / 置底作用于多条记录：返回依次执行的 (index, to)。
+    # 上移下移时每条与相邻的未选中记录交换，已经顶到头的几条保持不动，其余的照常移动
+    if direction == "top":
+        return plan_moves(indices, 0)
+    if direction == "bottom":
+        return plan_moves(indices, total)
+    moves = []
+    if direction == "up":
+        free = 0  # 下一条选中记录最多能移到的位置
+        for i in sorted(indices):
+            if i > free:
+                moves.append((i, i - 1))
+                free = i
+            else:
+                free = i + 1
+    elif direction == "down":
+        free = total - 1
+        for i in sorted(indices, reverse=True):
+            if i < free:
+                moves.append((i, i + 1))
+                free = i
+            else:
+                free = i - 1
+    return moves
+
+
+# === 模糊匹配 ===
+def fuzzy_pattern(query):
+    # 查询字符按顺序出现即算匹配（子序列），用正则在 C 层完成扫描
+    return re.compile(".*?".join(re.escape(c) for c in query))
+
+
+def fuzzy_score(query, pattern, text):
+    # 连续命中优于分散命中，出现在开头或单词边界的加分，越靠前越好
+    pos = text.find(query)
+    if pos >= 0:
+        bonus = 40 if pos == 0 or not text[pos - 1].isalnum() else 0
+        return 100 + bonus - min(pos, 50) * 0.2
+    m = pattern.search(text)
+    if m is None:
+        return None
+    gaps = (m.end() - m.start()) - len(query)
+    return 50 - min(gaps, 40) - min(m.start(), 50) * 0.1
+
+
+class FuzzyMatcher:
+    """增量模糊匹配：新查询是旧查询的延长时只在上一轮的命中里继续筛选；
+    扫描按 PALETTE_CHUNK 分片通过 root.after 执行，不阻塞输入。"""
+
+    def __init__(self, root, candidates, rank, on_done):
+        self.root = root
+        self.candidates = candidates  # [(小写的 "名称 网址", site)]
+        self.rank = rank  # site -> 使用频率加分
+        self.on_done = on_done
+        self.query = ""
+        self.base = candidates  # 本轮要扫描的候选
+        self.pos = 0  # base 中已扫描到的位置
+        self.matches = []  # [(分数, 候选)]
+        self.after_id = None
+
+    def set_query(self, query):
+        query = query.lower().strip()
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        if query and self.query and query.startswith(self.query):
+            # 收窄：上一轮已命中的 + 上一轮还没扫描到的
+            base = [c for _, c in self.matches] + self.base[self.pos:]
+        else:
+            base = self.candidates
+        self.query = query
+        self.base = base
+        self.pos = 0
+        self.matches = []
+        self.pattern = fuzzy_pattern(query)
+        self.step()
+
+    def step(self):
+        self.after_id = None
+        query, pattern = self.query, self.pattern
+        end = min(len(self.base), self.pos + PALETTE_CHUNK)
+        for i in range(self.pos, end):
+            candidate = self.base[i]
+            score = fuzzy_score(query, pattern, candidate[0]) if query else 0
+            if score is not None:
+                self.matches.append((score, candidate))
+        self.pos = end
+        if self.pos < len(self.base):
+            self.after_id = self.root.after(1, self.step)
         else:
-            self.after(20, self.animate)
+            self.on_done(self.top(PALETTE_RESULTS))
+
+    def top(self, n):
+        ranked = heapq.nlargest(n, self.matches, key=lambda m: m[0] + self.rank(m[1][1]))
+        return [c[1] for _, c in ranked]
+
+    def cancel(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+
+# === 批量打开 ===
+def chunk_urls(browser_path, urls, limit=OPEN_CMDLINE_LIMIT, max_tabs=OPEN_MAX_TABS):
+    # 按命令行长度和标签页数把网址切成若干批，每批对应一次浏览器调用
+    base = len(subprocess.list2cmdline([browser_path]))
+    chunk, length = [], base
+    for url in urls:
+        size = len(subprocess.list2cmdline([url])) + 1
+        if chunk and (length + size > limit or len(chunk) >= max_tabs):
+            yield chunk
+            chunk, length = [], base
+        chunk.append(url)
+        length += size
+    if chunk:
+        yield chunk
+
+
+class BrowserLauncher:
+    """在后台线程中把多个网址一次性交给浏览器打开，同时启动的进程数不超过 spawn_limit。"""
+
+    def __init__(self, spawn_limit=OPEN_SPAWN_LIMIT):
+        self.slots = threading.BoundedSemaphore(spawn_limit)
+        self.errors = queue.Queue()
+        self.lock = threading.Lock()
+        self.busy = 0
+
+    def open(self, browser_path, urls):
+        with self.lock:
+            self.busy += 1
+        threading.Thread(target=self.run, args=(browser_path, list(urls)), name="open-batch", daemon=True).start()
+
+    def run(self, browser_path, urls):
+        try:
+            if browser_path == "Default":
+                # 系统默认浏览器无法一次传入多个网址，只能逐个打开标签页
+                for url in urls:
+                    webbrowser.open_new_tab(url)
+                return
+            workers = []
+            for chunk in chunk_urls(browser_path, urls):
+                self.slots.acquire()
+                worker = threading.Thread(target=self.spawn, args=(browser_path, chunk), daemon=True)
+                worker.start()
+                workers.append(worker)
+            for worker in workers:
+                worker.join()
+        finally:
+            with self.lock:
+                self.busy -= 1
+
+    def spawn(self, browser_path, chunk):
+        try:
+            proc = subprocess.Popen([browser_path, *chunk])
+            try:
+                proc.wait(timeout=OPEN_SPAWN_WAIT)
+            except subprocess.TimeoutExpired:
+                pass  # 浏览器尚未运行时第一次调用会一直驻留，不必等它退出
+        except OSError as e:
+            self.errors.put(e)
+        finally:
+            self.slots.release()
+
+
+# === 浏览器检测 ===
+def nearest_existing(path):
+    # 不存在的路径向上找到第一个存在的目录：安装浏览器时该目录的 mtime 会变化
+    while path and not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    return path or None
+
+
+def discover_windows_paths():
+    found, watch = {}, set()
+    for name, paths in POTENTIAL_BROWSERS.items():
+        for path in paths:
+            if os.path.isfile(path):
+                found.setdefault(name, path)
+                watch.add(path)
+            else:
+                parent = nearest_existing(os.path.dirname(path))
+                if parent:
+                    watch.add(parent)
+    return found, watch
+
+
+def discover_path():
+    if os.name == "nt":
+        return {}, set()
+    found = {}
+    for name, names in BROWSER_EXECUTABLES.items():
+        for exe in names:
+            path = shutil.which(exe)
+            if path:
+                found[name] = path
+                break
+    watch = {d for d in os.environ.get("PATH", "").split(os.pathsep) if d and os.path.isdir(d)}
+    return found, watch
+
+
+def desktop_dirs():
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    data_dirs = os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+    dirs = [data_home] + data_dirs.split(":") + ["/var/lib/flatpak/exports/share", "/var/lib/snapd/desktop"]
+    return [os.path.join(d, "applications") for d in dict.fromkeys(dirs) if d]
+
+
+def read_desktop_entry(path):
+    # 只读取 [Desktop Entry] 段中的键值，返回 (名称, 可执行文件) 或 None
+    entry, section = {}, None
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    section = line
+                elif section == "[Desktop Entry]" and "=" in line:
+                    key, value = line.split("=", 1)
+                    entry.setdefault(key.strip(), value.strip())
+    except OSError:
+        return None
+    if "WebBrowser" not in entry.get("Categories", "").split(";") or entry.get("NoDisplay") == "true":
+        return None
+    try:
+        argv = [a for a in shlex.split(entry.get("Exec", "")) if not a.startswith("%")]
+    except ValueError:
+        return None
+    # 带参数的启动命令（如 flatpak run ...）不能直接在后面追加网址，跳过
+    if len(argv) != 1:
+        return None
+    exe = argv[0] if os.path.isabs(argv[0]) else shutil.which(argv[0])
+    if not exe or not os.path.isfile(exe):
+        return None
+    return entry.get("Name") or os.path.basename(exe), exe
+
+
+def discover_desktop_entries():
+    if os.name == "nt":
+        return {}, set()
+    found, watch = {}, set()
+    for d in desktop_dirs():
+        try:
+            names = sorted(os.listdir(d))
+        except OSError:
+            continue
+        watch.add(d)
+        for fname in names:
+            if fname.endswith(".desktop"):
+                entry = read_desktop_entry(os.path.join(d, fname))
+                if entry:
+                    found.setdefault(*entry)
+    return found, watch
+
+
+def discover_user_config():
+    path = os.path.abspath(BROWSER_CONFIG)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            found = {str(k): str(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError, AttributeError):
+        found = {}
+    return found, {path}
+
+
+# 按顺序执行，后面的来源覆盖前面同名或指向同一文件的浏览器；新增来源只需加入此列表
+BROWSER_PROVIDERS = [discover_windows_paths, discover_path, discover_desktop_entries, discover_user_config]
+
+
+def path_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class BrowserDiscovery:
+    """检测已安装的浏览器，结果连同被检测路径的 mtime 一起缓存到磁盘。
+
+    启动时直接使用上次的缓存；窗口显示后在后台线程中核对这些路径的 mtime，
+    有变化（安装、卸载或修改配置）时才重新检测，结果放入 results 队列。
+    """
+
+    def __init__(self, cache_path, providers=None):
+        self.cache_path = cache_path
+        self.providers = providers or BROWSER_PROVIDERS
+        self.results = queue.Queue()
+        self.entry = {}
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                self.entry = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def cached(self):
+        if self.entry.get("key") != self.cache_key():
+            return {}
+        return dict(self.entry.get("browsers", {}))
+
+    def cache_key(self):
+        # 环境变量变化时 PATH / XDG 目录不同，旧结果作废
+        parts = [os.name, os.environ.get("PATH", ""), os.environ.get("XDG_DATA_HOME", ""),
+                 os.environ.get("XDG_DATA_DIRS", ""), os.path.abspath(BROWSER_CONFIG)]
+        parts += [f"{p.__module__}.{p.__name__}" for p in self.providers]
+        return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def is_valid(self):
+        watch = self.entry.get("watch")
+        if self.entry.get("key") != self.cache_key() or not isinstance(watch, dict):
+            return False
+        return all(path_mtime(path) == mtime for path, mtime in watch.items())
+
+    def scan(self):
+        merged, watch = {}, set()
+        real = functools.lru_cache(maxsize=None)(lambda p: os.path.normcase(os.path.realpath(p)))
+        for provider in self.providers:
+            try:
+                found, paths = provider()
+            except Exception as e:
+                print(f"⚠️ 浏览器检测 {provider.__name__} 失败: {e}")
+                continue
+            watch.update(paths)
+            for name, path in found.items():
+                merged = {n: p for n, p in merged.items() if n != name and real(p) != real(path)}
+                merged[name] = path
+        return merged, watch
+
+    def refresh(self):
+        # 缓存仍然有效时返回 None，否则重新检测并保存
+        if self.is_valid():
+            return None
+        browsers, watch = self.scan()
+        self.entry = {"key": self.cache_key(), "browsers": browsers,
+                      "watch": {path: path_mtime(path) for path in sorted(watch)}}
+        try:
+            atomic_write(self.cache_path, json.dumps(self.entry, ensure_ascii=False, indent=1).encode("utf-8"))
+        except OSError as e:
+            print(f"⚠️ 浏览器缓存保存失败: {e}")
+        return browsers
+
+    def start(self):
+        threading.Thread(target=self.run, name="browser-discovery", daemon=True).start()
+
+    def run(self):
+        try:
+            self.results.put(self.refresh())
+        except Exception as e:
+            print(f"⚠️ 浏览器检测失败: {e}")
+            self.results.put(None)
+
+
+# === 链接检查 ===
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class LinkChecker:
+    """后台检查所有网址是否可以访问。
+
+    线程池按主机轮转取任务，每个主机同时最多 LINK_CHECK_PER_HOST 个请求；同一主机的
+    连接用完后放回空闲池复用 (keep-alive)。先发 HEAD，服务器拒绝 HEAD 时再用 GET。
+    结果写入带 TTL 的缓存并保存到磁盘，主线程从 results 队列里取结果更新界面。
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.cache = {}  # 网址 -> [状态码或错误, 是否可用, 检查时间]
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.results = queue.Queue()
+        self.running = False
+        self.stats = {}
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def status(self, url):
+        return self.cache.get(url)
+
+    def start(self, urls):
+        now = time.time()
+        todo = [u for u in dict.fromkeys(urls)
+                if u not in self.cache or now - self.cache[u][2] >= LINK_CHECK_TTL]
+        self.pending = {}  # 主机 -> 待检查网址
+        for url in todo:
+            self.pending.setdefault(self.host_key(url), deque()).append(url)
+        self.hosts = deque(self.pending)
+        self.active = dict.fromkeys(self.pending, 0)
+        self.idle = {}  # 主机 -> 空闲连接
+        self.latencies = []
+        self.total = len(todo)
+        self.finished = 0
+        self.started = time.perf_counter()
+        self.running = True
+        workers = self.workers = min(LINK_CHECK_WORKERS, self.total)
+        for _ in range(workers):
+            threading.Thread(target=self.work, name="link-check", daemon=True).start()
+        if not workers:  # 不能再读 self.workers：线程可能已经全部结束并调用过 finish()
+            self.finish()
+        return self.total
+
+    @staticmethod
+    def host_key(url):
+        try:
+            parts = urlsplit(url)
+            return parts.scheme.lower(), parts.hostname or "", parts.port
+        except ValueError:
+            return "", url, None
+
+    def next_job(self):
+        # 轮转各主机，跳过已达并发上限的；全部达到上限时等待有请求结束
+        with self.cond:
+            while self.hosts:
+                for _ in range(len(self.hosts)):
+                    host = self.hosts[0]
+                    self.hosts.rotate(-1)
+                    if self.active[host] < LINK_CHECK_PER_HOST:
+                        urls = self.pending[host]
+                        url = urls.popleft()
+                        if not urls:
+                            del self.pending[host]
+                            self.hosts.remove(host)
+                        self.active[host] += 1
+                        return host, url
+                self.cond.wait(0.05)
+            return None
+
+    def work(self):
+        # 无论以何种方式退出都要计入已结束的线程，否则 finish() 不会运行，界面一直显示“检查中”
+        try:
+            while self.running:
+                job = self.next_job()
+                if job is None:
+                    break
+                host, url = job
+                started = time.perf_counter()
+                try:
+                    result = self.probe(host, url)
+                except Exception as e:
+                    result = type(e).__name__, False
+                latency = time.perf_counter() - started
+                with self.cond:
+                    self.active[host] -= 1
+                    self.cache[url] = [result[0], result[1], time.time()]
+                    self.latencies.append(latency)
+                    self.finished += 1
+                    self.cond.notify_all()
+                self.results.put((url, self.cache[url]))
+        finally:
+            with self.cond:
+                self.workers -= 1
+                last = self.workers == 0
+            if last:
+                self.finish()
+
+    def connect(self, host):
+        with self.cond:
+            idle = self.idle.get(host)
+            if idle:
+                return idle.pop(), True
+        scheme, hostname, port = host
+        if scheme == "https":
+            return http.client.HTTPSConnection(hostname, port, timeout=LINK_CHECK_TIMEOUT,
+                                               context=ssl.create_default_context()), False
+        return http.client.HTTPConnection(hostname, port, timeout=LINK_CHECK_TIMEOUT), False
+
+    def release(self, host, conn):
+        with self.cond:
+            self.idle.setdefault(host, []).append(conn)
+
+    def request(self, host, method, target):
+        # 复用的连接可能已被服务器关闭，这种情况下换一条新连接重试一次
+        for attempt in range(2):
+            conn, reused = self.connect(host)
+            try:
+                conn.request(method, target, headers={"User-Agent": "WebManagerPro-LinkCheck/1.0"})
+                resp = conn.getresponse()
+                resp.read(LINK_CHECK_BODY_LIMIT)
+                if resp.isclosed() and not resp.will_close:
+                    self.release(host, conn)
+                else:
+                    conn.close()  # 正文太大没有读完或服务器要求断开，不能复用
+                return resp.status
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused or attempt:
+                    raise
+            except Exception:
+                conn.close()
+                raise
+
+    def probe(self, host, url):
+        scheme, hostname, _ = host
+        if scheme not in ("http", "https") or not hostname:
+            return "无效网址", False
+        parts = urlsplit(url)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        try:
+            status = self.request(host, "HEAD", target)
+            if status in (400, 403, 404, 405, 501):  # 不少服务器不支持 HEAD，用 GET 再确认
+                status = self.request(host, "GET", target)
+        except ValueError:
+            return "无效网址", False  # 如 a..b.example、超过 63 个字符的标签：域名编码 (UnicodeError) 失败
+        except (OSError, http.client.HTTPException) as e:
+            return ("超时" if isinstance(e, TimeoutError) else type(e).__name__), False
+        return status, status < 400
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        self.running = False
+        for conns in self.idle.values():
+            for conn in conns:
+                conn.close()
+        self.idle = {}
+        self.stats = {
+            "checked": self.finished,
+            "seconds": round(elapsed, 3),
+            "urls_per_second": round(self.finished / elapsed, 1) if elapsed > 0 else 0.0,
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 1),
+            "failed": sum(1 for entry in self.cache.values() if not entry[1]),
+        }
+        try:
+            atomic_write(self.cache_path, json.dumps(self.cache, ensure_ascii=False).encode('utf-8'))
+        except OSError as e:
+            print(f"⚠️ 链接检查结果保存失败: {e}")
+        self.results.put(None)
+
+    def cancel(self):
+        self.running = False
+
+
+def link_status_text(entry):
+    if entry is None:
+        return ""
+    status, ok, _ = entry
+    if ok:
+        return f"↪ {status}" if 300 <= status < 400 else f"✓ {status}"
+    return f"✗ {status}"
+
+
+# === 网站图标 ===
+def favicon_origin(url):
+    # 图标按主机缓存：同一主机的所有网址共用一个图标
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+def png_chunk(kind, body):
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body) & 0xffffffff)
+
+
+def encode_png(width, height, rows):
+    # rows: 自上而下每行的 RGBA 字节
+    raw = b"".join(b"\0" + row for row in rows)
+    return (b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + png_chunk(b"IDAT", zlib.compress(raw)) + png_chunk(b"IEND", b""))
+
+
+def bmp_to_png(data):
+    # .ico 中的位图：信息头之后是自下而上的像素，再之后是 1 位的透明掩码；只支持 24 / 32 位
+    if len(data) < 40:
+        return None
+    header, width, height, _, bpp = struct.unpack_from("<IiiHH", data)
+    height //= 2  # ICO 中记录的高度包含掩码
+    if bpp not in (24, 32) or not 0 < width <= 256 or not 0 < height <= 256:
+        return None
+    step = bpp // 8
+    stride = (width * step + 3) & ~3
+    mask_stride = ((width + 31) // 32) * 4
+    mask = header + stride * height
+    has_mask = len(data) >= mask + mask_stride * height
+    if len(data) < mask or (bpp == 24 and not has_mask):
+        return None
+    use_alpha = bpp == 32 and any(data[header + 3:mask:4])  # 老式 32 位图标的 alpha 全为 0，改用掩码
+    rows = []
+    for y in range(height - 1, -1, -1):
+        line = data[header + y * stride:header + y * stride + width * step]
+        out = bytearray(width * 4)
+        out[0::4] = line[2::step]
+        out[1::4] = line[1::step]
+        out[2::4] = line[0::step]
+        if use_alpha:
+            out[3::4] = line[3::4]
+        elif has_mask:
+            bits = data[mask + y * mask_stride:mask + (y + 1) * mask_stride]
+            out[3::4] = bytes(0 if bits[x >> 3] >> (7 - (x & 7)) & 1 else 255 for x in range(width))
+        else:
+            out[3::4] = b"\xff" * width
+        rows.append(bytes(out))
+    return encode_png(width, height, rows)
+
+
+def decode_icon(raw):
+    # 返回 Tk 可以直接显示的 PNG / GIF 数据；.ico 取尺寸最接近 FAVICON_SIZE 的一张，无法解析时返回 None
+    if not raw:
+        return None
+    if raw.startswith(b"\x89PNG") or raw[:6] in (b"GIF87a", b"GIF89a"):
+        return raw
+    if len(raw) < 6 or raw[:4] != b"\0\0\1\0":
+        return None
+    entries = []
+    for i in range(struct.unpack_from("<H", raw, 4)[0]):
+        if 6 + 16 * (i + 1) > len(raw):
+            break
+        width, _, _, _, _, bpp, size, offset = struct.unpack_from("<BBBBHHII", raw, 6 + 16 * i)
+        entries.append((abs((width or 256) - FAVICON_SIZE), -bpp, offset, size))
+    for _, _, offset, size in sorted(entries):
+        data = raw[offset:offset + size]
+        icon = data if data.startswith(b"\x89PNG") else bmp_to_png(data)
+        if icon:
+            return icon
+    return None
+
+
+class FaviconCache:
+    """网站图标的下载线程池和磁盘缓存。
+
+    图标文件以内容的 sha1 命名，不同主机的相同图标只存一份；index.json 记录
+    主机 -> [文件名或 None, 最近使用时间]，磁盘总大小超过 FAVICON_CACHE_BYTES 时
+    按最近使用时间淘汰。界面只为可见行调用 request()，结果从 results 队列中取。
+    fetch(origin) 可替换，便于用本地 HTTP 服务测试。
+    """
+
+    def __init__(self, cache_dir, fetch=None):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.fetch = fetch or self.download
+        self.index = {}
+        self.sizes = {}  # 文件名 -> 字节数
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()  # (origin, 图标数据或 None)
+        self.inflight = set()
+        self.workers = 0
+        self.dirty = False
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        for name, _ in self.index.values():
+            if name and name not in self.sizes:
+                try:
+                    self.sizes[name] = os.path.getsize(os.path.join(cache_dir, name))
+                except OSError:
+                    pass
+
+    def lookup(self, origin):
+        # 返回磁盘上的图标数据；False 表示确认没有图标；None 表示需要下载
+        with self.lock:
+            entry = self.index.get(origin)
+            if entry is None or (entry[0] is None and time.time() - entry[1] >= FAVICON_RETRY):
+                return None
+            if entry[0] is None:
+                return False
+            entry[1] = time.time()
+            self.dirty = True
+        try:
+            with open(os.path.join(self.cache_dir, entry[0]), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def request(self, origin):
+        with self.lock:
+            if origin in self.inflight:
+                return
+            self.inflight.add(origin)
+            spawn = self.workers < FAVICON_WORKERS and self.jobs.qsize() >= self.workers
+            if spawn:
+                self.workers += 1
+        self.jobs.put(origin)
+        if spawn:
+            threading.Thread(target=self.work, name="favicon", daemon=True).start()
+
+    @property
+    def busy(self):
+        return bool(self.inflight)
+
+    def work(self):
+        while True:
+            origin = self.jobs.get()
+            if origin is None:
+                return
+            try:
+                icon = decode_icon(self.fetch(origin))
+            except Exception:
+                icon = None
+            try:
+                self.store(origin, icon)
+            except OSError as e:
+                print(f"⚠️ 图标缓存写入失败: {e}")
+            with self.lock:
+                self.inflight.discard(origin)
+            self.results.put((origin, icon))
+
+    def download(self, origin):
+        req = urllib.request.Request(origin + "/favicon.ico", headers={"User-Agent": "WebManagerPro-Favicon/1.0"})
+        try:
+            with urllib.request.urlopen(req, timeout=FAVICON_TIMEOUT) as resp:
+                raw = resp.read(FAVICON_MAX_BYTES + 1)
+        except (OSError, http.client.HTTPException, ValueError):
+            return None
+        return raw if len(raw) <= FAVICON_MAX_BYTES else None
+
+    def store(self, origin, icon):
+        name = None
+        if icon:
+            name = hashlib.sha1(icon).hexdigest() + (".gif" if icon.startswith(b"GIF") else ".png")
+        with self.lock:  # 图标很小，持锁写文件，避免两个线程同时写同一个内容相同的文件
+            path = os.path.join(self.cache_dir, name) if name else None
+            if path and not os.path.exists(path):
+                os.makedirs(self.cache_dir, exist_ok=True)
+                atomic_write(path, icon)
+            self.index[origin] = [name, time.time()]
+            if name:
+                self.sizes[name] = len(icon)
+            self.dirty = True
+            self.evict()
+
+    def evict(self):
+        # 调用方持有 lock；文件的最近使用时间取引用它的各主机中最晚的一个
+        total = sum(self.sizes.values())
+        if total <= FAVICON_CACHE_BYTES:
+            return
+        used = {}
+        for name, at in self.index.values():
+            if name:
+                used[name] = max(used.get(name, 0), at)
+        doomed = set()
+        for name in sorted(used, key=used.get):
+            if total <= FAVICON_CACHE_BYTES:
+                break
+            total -= self.sizes.pop(name, 0)
+            doomed.add(name)
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+        for origin in [o for o, (name, _) in self.index.items() if name in doomed]:
+            del self.index[origin]
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            raw = json.dumps(self.index).encode('utf-8')
+            self.dirty = False
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            atomic_write(self.index_path, raw)
+        except OSError as e:
+            print(f"⚠️ 图标缓存索引保存失败: {e}")
+
+    def close(self):
+        for _ in range(self.workers):
+            self.jobs.put(None)
+        self.save()
+
+
+# === 书签导入 ===
+class ImportJob:
+    """后台线程解析导入文件，主线程按批提交。
+
+    解析线程与主线程之间是有界队列，解析最多领先 IMPORT_QUEUE 批，内存占用不随文件
+    大小增长；文件内和与现有书签的去重只保存网址的哈希值。
+    """
+
+    def __init__(self, app, path):
+        self.app = app
+        self.path = path
+        self.total_bytes = max(1, os.path.getsize(path))
+        self.read_bytes = 0
+        self.batches = queue.Queue(maxsize=IMPORT_QUEUE)
+        self.cancelled = False
+        self.done = False
+        self.imported = 0
+        self.skipped = 0
+        self.error = None
+        self.seen = SeenUrls(app.data)
+
+        self.top = tk.Toplevel(app.root)
+        self.top.title("导入书签")
+        self.top.configure(bg=COLORS["bg_card"])
+        app.center_window(self.top, 420, 150)
+        self.label = tk.Label(self.top, text="正在解析…", bg=COLORS["bg_card"], font=FONTS["body"])
+        self.label.pack(pady=(24, 10))
+        self.progress = ttk.Progressbar(self.top, length=340, mode="determinate", maximum=self.total_bytes)
+        self.progress.pack()
+        self.top.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        threading.Thread(target=self.parse, name="import", daemon=True).start()
+        self.app.root.after(50, self.poll)
+
+    def parse(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                batch = []
+                for item in iter_bookmark_file(f):
+                    if self.cancelled: return
+                    batch.append(item)
+                    if len(batch) >= IMPORT_BATCH:
+                        self.read_bytes = f.buffer.tell()
+                        if not self.put(batch): return
+                        batch = []
+                self.read_bytes = self.total_bytes
+                self.put(batch)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.put(None)
+
+    def put(self, item):
+        # 取消后主线程不再取队列：队列满时隔一会儿检查一次取消标记，已取消就放弃，解析线程不会永远阻塞
+        while True:
+            try:
+                self.batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if self.cancelled:
+                    return False
+
+    def poll(self):
+        if self.done: return
+        try:
+            batch = self.batches.get_nowait()
+        except queue.Empty:
+            self.app.root.after(50, self.poll)
+            return
+        if batch is None:
+            self.finish()
+            return
+        self.commit(batch)
+        self.progress["value"] = self.read_bytes
+        self.label.configure(text=f"已导入 {self.imported} 条，跳过重复 {self.skipped} 条")
+        self.app.root.after(1, self.poll)
+
+    def commit(self, batch):
+        ops, skipped = plan_import(set(self.app.data.keys()), batch, self.seen)
+        self.skipped += skipped
+        self.imported += len(batch) - skipped
+        if ops:
+            # 每批只追加一行日志、不合并快照（否则每批都要在主线程拷贝全部数据），finish() 时合并一次
+            self.app.apply_batch(ops, compact=False)
+
+    def cancel(self):
+        self.cancelled = True
+        self.finish()
+
+    def finish(self):
+        if self.done: return
+        self.done = True
+        if self.top.winfo_exists():
+            self.top.destroy()
+        if self.imported:
+            self.app.save_data()  # 整个导入只合并这一次快照
+        self.app.refresh_group_list()
+        self.app.refresh_site_list(self.app.current_active_group)
+        if self.error is not None:
+            messagebox.showerror("导入失败", f"无法解析文件：\n{self.error}")
+        else:
+            ToastNotification(self.app.root, f"导入 {self.imported} 条，跳过重复 {self.skipped} 条", "success")
+
+
+# === 后台保存 ===
+class PersistScheduler:
+    """把修改标记为脏数据，防抖后在后台线程合并写盘。
+
+    每次修改都把写盘推迟到静默 delay_ms 之后，连续修改合并成一次日志写入（一次 fsync）；
+    一直有修改时最迟 max_delay_ms 也写一次，崩溃时丢失的修改有上限。需要合并快照时
+    在主线程拷贝数据，序列化和写文件都在后台线程完成。stats 记录每次写入合并了
+    多少条修改，用于调整 SAVE_DEBOUNCE_MS。
+    """
+
+    def __init__(self, root, store, delay_ms=SAVE_DEBOUNCE_MS, max_delay_ms=SAVE_MAX_DELAY_MS):
+        self.root = root
+        self.store = store
+        self.delay_ms = delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.first_mark = 0.0  # 本轮第一条未写盘修改的时间 (time.monotonic)
+        self.last_mark = 0.0  # 最近一条修改的时间
+        self.pending = []  # 已编码、尚未交给后台线程的日志行
+        self.compact_requested = False
+        self.dirty = 0  # 自上次写入以来累计的修改数
+        self.after_id = None
+        self.tasks = queue.Queue()
+        self.worker = None
+        self.stats = {"mutations": 0, "writes": 0, "max_batch": 0}
+        self.batch_sizes = deque(maxlen=200)  # 最近若干次写入各自合并的修改数
+
+    def mark_dirty(self, op=None):
+        if op is None:
+            self.compact_requested = True
+        else:
+            self.pending.append(encode_op(op, self.store.writer))
+        self.dirty += 1
+        self.stats["mutations"] += 1
+        # 不在每次修改时取消重排定时器（每次都是一次 Tcl 调用），到点时再看是否需要顺延
+        self.last_mark = time.monotonic()
+        if self.after_id is None:
+            self.first_mark = self.last_mark
+            self.after_id = self.root.after(self.delay_ms, self.flush_due)
+
+    def flush_due(self):
+        now = time.monotonic()
+        wait = min(self.delay_ms - (now - self.last_mark) * 1000, self.max_delay_ms - (now - self.first_mark) * 1000)
+        if wait >= 1:
+            self.after_id = self.root.after(round(wait), self.flush_due)  # 期间又有修改：顺延
+            return
+        self.flush()
+
+    def flush(self):
+        self.after_id = None
+        if not self.dirty:
+            return
+        lines = tuple(self.pending)
+        snapshot = None
+        if self.compact_requested or self.store.needs_compact(len(lines)):
+            snapshot = self.store.snapshot()
+        batch = self.dirty
+        self.pending = []
+        self.compact_requested = False
+        self.dirty = 0
+        self.stats["writes"] += 1
+        self.stats["max_batch"] = max(self.stats["max_batch"], batch)
+        self.batch_sizes.append(batch)
+        self.submit(lines, snapshot)
+
+    def submit(self, lines, snapshot):
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.run, name="persist", daemon=True)
+            self.worker.start()
+        self.tasks.put((lines, snapshot))
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            try:
+                self.store.write_batch(*task)
+            except Exception as e:
+                print(f"⚠️ 保存失败: {e}")
+            finally:
+                self.tasks.task_done()
+
+    def drain(self):
+        # 立即提交剩余修改并等待后台线程写完（不关闭存储）
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        self.flush()
+        self.tasks.join()
+
+    def close(self):
+        # 关闭窗口时：取消防抖，立即提交剩余修改并等待后台线程写完
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+        self.flush()
+        if self.worker is not None:
+            self.tasks.put(None)
+            self.worker.join()
+            self.worker = None
+        self.store.close()
+
+
+class UsageWriter:
+    """打开记录的后台写盘：主线程只更新内存中的计数，日志追加和合并都在后台线程进行。
+
+    后台线程每次取出队列中积压的全部记录，合并成一次加锁追加。
+    """
+
+    def __init__(self, usage):
+        self.usage = usage
+        self.tasks = queue.Queue()
+        self.worker = None
+
+    def record(self, urls):
+        lines = self.usage.note(urls)
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.run, name="usage", daemon=True)
+            self.worker.start()
+        self.tasks.put(lines)
+
+    def run(self):
+        while True:
+            lines = self.tasks.get()
+            stop = lines is None
+            lines = [] if stop else list(lines)
+            while not stop:
+                try:
+                    more = self.tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    stop = True
+                else:
+                    lines.extend(more)
+            try:
+                self.usage.append(lines)
+            except OSError as e:
+                print(f"⚠️ 记录打开次数失败: {e}")
+            if stop:
+                return
+
+    def close(self):
+        # 关闭窗口时写完积压的记录
+        if self.worker is not None:
+            self.tasks.put(None)
+            self.worker.join()
+            self.worker = None
+
+
+# === Treeview 增量同步 ===
+def longest_increasing_subsequence(seq):
+    # 返回 seq 中最长递增子序列的下标集合，用于找出无需移动的行
+    tails, tails_idx, prev = [], [], [-1] * len(seq)
+    for i, x in enumerate(seq):
+        k = bisect.bisect_left(tails, x)
+        if k == len(tails):
+            tails.append(x)
+            tails_idx.append(i)
+        else:
+            tails[k] = x
+            tails_idx[k] = i
+        prev[i] = tails_idx[k - 1] if k > 0 else -1
+    result = set()
+    i = tails_idx[-1] if tails_idx else -1
+    while i != -1:
+        result.add(i)
+        i = prev[i]
+    return result
+
+
+class TreeSync:
+    """记住 Treeview 当前的行，apply() 时只对差异部分调用 insert/delete/move/item。"""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.order = []  # 当前行 iid 的顺序（与 Treeview 一致）
+        self.rows = {}  # iid -> 行属性 dict (text/values/tags)
+
+    def clear(self):
+        if self.order:
+            self.tree.delete(*self.order)
+        self.order = []
+        self.rows = {}
+
+    def apply(self, rows):
+        # rows: [(iid, {"text":..., "values":..., "tags":...}), ...]，按期望顺序排列
+        wanted = {iid for iid, _ in rows}
+        stale = [iid for iid in self.order if iid not in wanted]
+        if stale and len(stale) == len(self.order):
+            self.clear()  # 完全不同的列表（如切换分组）：一次性清空
+        elif stale:
+            self.tree.delete(*stale)
+            stale = set(stale)
+            self.order = [iid for iid in self.order if iid not in stale]
+            for iid in stale: del self.rows[iid]
+
+        old_pos = {iid: i for i, iid in enumerate(self.order)}
+        kept = [iid for iid, _ in rows if iid in old_pos]
+        stable = longest_increasing_subsequence([old_pos[iid] for iid in kept])
+        stable = {kept[i] for i in stable}
+
+        order = self.order
+        last = -1  # 上一个已就位的行在 order 中的位置
+        for iid, kw in rows:
+            if iid not in old_pos:
+                last += 1
+                self.tree.insert("", last, iid=iid, **kw)
+                order.insert(last, iid)
+                self.rows[iid] = kw
+                continue
+            if iid in stable:
+                last = order.index(iid, last + 1)
+            else:
+                q = order.index(iid)
+                if q < last: last -= 1
+                # 先 detach 再 move，避免不同 Tk 版本对 index 含义的差异
+                self.tree.detach(iid)
+                order.pop(q)
+                last += 1
+                self.tree.move(iid, "", last)
+                order.insert(last, iid)
+            if self.rows[iid] != kw:
+                self.tree.item(iid, **kw)
+                self.rows[iid] = kw
+
+
+class HoverTracker:
+    """Treeview 的悬停高亮。
+
+    <Motion> 只记下坐标，每 HOVER_FRAME_MS 最多处理一次；只有光标下的行变化时才
+    移动 hover 标签，不改动真实的选中项。stats 统计收到的事件数和实际重绘次数。
+    ttk 按标签创建的先后决定优先级，要在配置其他带背景色的标签之前创建。
+    """
+
+    def __init__(self, tree, frame_ms=HOVER_FRAME_MS):
+        self.tree = tree
+        self.frame_ms = frame_ms
+        self.y = None
+        self.after_id = None
+        self.item = None
+        self.stats = {"events": 0, "updates": 0}
+        self.since = time.perf_counter()
+        tree.tag_configure("hover", background=COLORS["item_hover"])
+        tree.bind("<Motion>", self.on_motion, add="+")
+        tree.bind("<Leave>", self.on_leave, add="+")
+        tree.bind("<<TreeviewSelect>>", self.on_select, add="+")
+
+    def on_motion(self, event):
+        self.stats["events"] += 1
+        self.y = event.y
+        if self.after_id is None:
+            self.after_id = self.tree.after(self.frame_ms, self.update)
+
+    def on_leave(self, event):
+        if self.after_id is not None:
+            self.tree.after_cancel(self.after_id)
+            self.after_id = None
+        self.y = None
+        self.set_item(None)
+
+    def on_select(self, event):
+        if self.item and self.item in self.tree.selection():
+            self.tree.tk.call(self.tree, "tag", "remove", "hover", self.item)
+
+    def update(self):
+        self.after_id = None
+        if self.y is not None:
+            self.set_item(self.tree.identify_row(self.y) or None)
+
+    def set_item(self, item):
+        if item == self.item:
+            return
+        if self.item and self.tree.exists(self.item):
+            self.tree.tk.call(self.tree, "tag", "remove", "hover", self.item)
+        self.item = item
+        self.reapply()
+        self.stats["updates"] += 1
+
+    def reapply(self):
+        # TreeSync 更新行时会整体替换 tags，刷新列表后重新挂上 hover 标签；选中的行保持选中配色
+        if not self.item:
+            return
+        if not self.tree.exists(self.item):
+            self.item = None
+        elif self.item not in self.tree.selection():
+            self.tree.tk.call(self.tree, "tag", "add", "hover", self.item)
+
+    def report(self):
+        # 返回自上次调用以来的事件 / 重绘速率，并清零计数
+        now = time.perf_counter()
+        elapsed = max(now - self.since, 1e-9)
+        rates = {"events": self.stats["events"], "updates": self.stats["updates"],
+                 "events_per_second": round(self.stats["events"] / elapsed, 1),
+                 "updates_per_second": round(self.stats["updates"] / elapsed, 1)}
+        self.stats = {"events": 0, "updates": 0}
+        self.since = now
+        return rates
+
+
+# === 快速打开面板 (Ctrl+K) ===
+class CommandPalette:
+    def __init__(self, app):
+        self.app = app
+        self.top = tk.Toplevel(app.root)
+        self.top.title("快速打开")
+        self.top.configure(bg=COLORS["bg_card"])
+        self.top.transient(app.root)
+        app.center_window(self.top, 560, 420)
+
+        self.query_var = tk.StringVar()
+        entry = tk.Entry(self.top, textvariable=self.query_var, font=FONTS["h2"], relief="solid", bd=1)
+        entry.pack(fill=tk.X, padx=16, pady=(16, 8), ipady=6)
+        entry.focus_set()
+        self.listbox = tk.Listbox(self.top, font=FONTS["body"], relief="flat", bd=0, activestyle="none",
+                                  selectbackground=COLORS["item_selected"], selectforeground=COLORS["primary"])
+        self.listbox.pack(fill=tk.BOTH, expand=True, padx=16, pady=(0, 16))
+
+        self.results = []
+        candidates = []
+        for group, sites in app.data.items():
+            for site in sites:
+                candidates.append((f"{site['name']} {site['url']}".lower(), site))
+        self.matcher = FuzzyMatcher(app.root, candidates, app.usage_boost, self.show_results)
+
+        self.query_var.trace_add("write", lambda *a: self.matcher.set_query(self.query_var.get()))
+        entry.bind("<Down>", lambda e: self.move_selection(1))
+        entry.bind("<Up>", lambda e: self.move_selection(-1))
+        self.top.bind("<Return>", self.open_selected)
+        self.top.bind("<Escape>", lambda e: self.close())
+        self.listbox.bind("<Double-Button-1>", self.open_selected)
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+        self.matcher.set_query("")
+
+    def show_results(self, results):
+        self.results = results
+        self.listbox.delete(0, tk.END)
+        for site in results:
+            self.listbox.insert(tk.END, f"{site['name']}    —    {site['url']}")
+        if results:
+            self.listbox.selection_set(0)
+
+    def move_selection(self, delta):
+        if not self.results: return "break"
+        sel = self.listbox.curselection()
+        index = max(0, min(len(self.results) - 1, (sel[0] if sel else 0) + delta))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        return "break"
+
+    def open_selected(self, event=None):
+        sel = self.listbox.curselection()
+        if not sel or sel[0] >= len(self.results): return
+        site = self.results[sel[0]]
+        self.close()
+        self.app.open_site(site)
+
+    def close(self):
+        self.matcher.cancel()
+        self.top.destroy()
+
+
+# === 启动计时 ===
+class StartupProfiler:
+    """记录启动各阶段耗时，--profile-startup 时在全部完成后打印。"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+        self.reported = False
+
+    def mark(self, phase, seconds=None):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last if seconds is None else seconds, now - self.start))
+        self.last = now
+
+    def report(self):
+        if not self.enabled or self.reported: return
+        self.reported = True
+        print("⏱️ 启动耗时:")
+        for phase, seconds, total in self.phases:
+            print(f"  {phase:<12}{seconds * 1000:9.1f} ms   累计 {total * 1000:9.1f} ms")
+
+
+# === 运行时统计 ===
+class CountingTk:
+    """包在 root.tk 外面统计发往 Tcl 的调用数，其余属性原样转发。
+
+    每次调用都多一层 Python 转发，所以只在需要时装上：Instruments.enable() 把窗口树中每个控件的
+    tk 属性换成它，之后创建的控件沿用父控件的 tk 也会被统计；disable() 再换回原来的对象。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.calls = 0
+
+    def call(self, *args):
+        self.calls += 1
+        return self.app.call(*args)
+
+    def eval(self, script):
+        self.calls += 1
+        return self.app.eval(script)
+
+    def __getattr__(self, name):
+        return getattr(self.app, name)
+
+
+class Instruments:
+    """safe_action 经过的每个处理函数：调用次数、异常次数、耗时直方图和期间的 Tk 调用数。
+
+    耗时按 LATENCY_BUCKETS_MS 分桶计数，内存占用与调用次数无关；分位数按桶上界估计。处理函数互相
+    调用时（如 on_site_release 调用 on_drag_release）只计最外层一次。Tk 调用数只在 DebugOverlay
+    打开或 --record-stats 时统计。F12 打开 DebugOverlay 查看，退出时连同写盘统计写到 bookmarks.stats.json。
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.handlers = {}  # 名称 -> {"calls", "errors", "total_ms", "max_ms", "tk_calls", "hist"}
+        self.root = None
+        self.tk = None  # CountingTk，累计的调用数在装上、卸下之间保留
+        self.users = 0  # 需要统计 Tk 调用的使用者（调试面板、--record-stats）个数
+        self.depth = 0  # 正在执行的 safe_action 层数
+        self.failed = False  # 本次最外层处理期间是否有处理函数（包括内层）吞掉了异常
+
+    def attach(self, root):
+        self.root = root
+        self.tk = CountingTk(root.tk)
+
+    def enable(self):
+        self.users += 1
+        if self.users == 1:
+            self.swap_tk(self.root, self.tk)
+
+    def disable(self):
+        self.users -= 1
+        if self.users == 0:
+            self.swap_tk(self.root, self.tk.app)
+
+    def swap_tk(self, widget, tk_obj):
+        widget.tk = tk_obj
+        for child in widget.children.values():
+            self.swap_tk(child, tk_obj)
+
+    def tk_calls(self):
+        return self.tk.calls if self.tk is not None else 0
+
+    def record(self, name, seconds, tk_calls, failed):
+        entry = self.handlers.get(name)
+        if entry is None:
+            entry = self.handlers[name] = {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "tk_calls": 0,
+                                           "hist": [0] * (len(self.buckets) + 1)}
+        ms = seconds * 1000
+        entry["calls"] += 1
+        entry["errors"] += failed
+        entry["total_ms"] += ms
+        entry["max_ms"] = max(entry["max_ms"], ms)
+        entry["tk_calls"] += tk_calls
+        entry["hist"][bisect.bisect_left(self.buckets, ms)] += 1
+
+    def quantile(self, entry, q):
+        seen = 0
+        for i, count in enumerate(entry["hist"]):
+            seen += count
+            if count and seen >= q * entry["calls"]:
+                return min(self.buckets[i], entry["max_ms"]) if i < len(self.buckets) else entry["max_ms"]
+        return entry["max_ms"]
+
+    def report(self):
+        # 按总耗时从高到低排列
+        rows = []
+        for name, entry in sorted(self.handlers.items(), key=lambda kv: -kv[1]["total_ms"]):
+            rows.append(dict(entry, name=name, mean_ms=entry["total_ms"] / entry["calls"],
+                             p50_ms=self.quantile(entry, 0.5), p95_ms=self.quantile(entry, 0.95)))
+        return rows
+
+    def dump(self, path, extra):
+        report = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "tk_calls": self.tk_calls(),
+                  "buckets_ms": list(self.buckets), "handlers": self.report()}
+        report.update(extra)
+        atomic_write(path, json.dumps(report, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+INSTRUMENTS = Instruments()
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+class DebugOverlay:
+    """F12 切换的调试面板，定时刷新 INSTRUMENTS 的统计。"""
+
+    COLUMNS = (("calls", "调用", 60), ("errors", "异常", 50), ("mean_ms", "平均 ms", 70), ("p50_ms", "p50", 60),
+               ("p95_ms", "p95", 60), ("max_ms", "最大", 70), ("tk_calls", "Tk 调用", 80))
+
+    def __init__(self, app):
+        self.app = app
+        self.top = tk.Toplevel(app.root)
+        self.top.title("调试统计")
+        self.top.configure(bg=COLORS["bg_card"])
+        self.top.geometry("700x360")
+        self.top.attributes("-topmost", True)
+        self.summary = tk.Label(self.top, anchor="w", bg=COLORS["bg_card"], fg=COLORS["text_sub"], font=FONTS["small"])
+        self.summary.pack(fill=tk.X, padx=10, pady=(8, 4))
+        self.tree = ttk.Treeview(self.top, columns=[key for key, _, _ in self.COLUMNS], show="tree headings")
+        self.tree.heading("#0", text="处理函数", anchor="w")
+        self.tree.column("#0", width=180)
+        for key, title, width in self.COLUMNS:
+            self.tree.heading(key, text=title, anchor="e")
+            self.tree.column(key, width=width, anchor="e")
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.sync = TreeSync(self.tree)
+        INSTRUMENTS.enable()
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+        self.top.bind("<F12>", lambda e: self.close())
+        self.after_id = None
+        self.refresh()
+
+    def refresh(self):
+        rows = []
+        for row in INSTRUMENTS.report():
+            values = tuple(f"{row[key]:.1f}" if key.endswith("_ms") else row[key] for key, _, _ in self.COLUMNS)
+            rows.append((row["name"], {"text": row["name"], "values": values}))
+        self.sync.apply(rows)
+        self.summary.configure(text=self.app.io_summary())
+        self.after_id = self.top.after(DEBUG_OVERLAY_REFRESH_MS, self.refresh)
+
+    def close(self):
+        if self.after_id is not None:
+            self.top.after_cancel(self.after_id)
+        INSTRUMENTS.disable()
+        self.top.destroy()
+        self.app.debug_overlay = None
 
 
 # === 防崩溃安全网 ===
 def safe_action(func):
+    # 所有界面处理函数的统一入口：吞掉异常防止界面崩溃，同时把耗时和 Tk 调用数记入 INSTRUMENTS
+    name = func.__name__
+
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
+        if not self.ready:
+            return  # 启动时数据还在后台读取，先忽略界面操作
+        outermost = INSTRUMENTS.depth == 0
+        if outermost:
+            started = time.perf_counter()
+            tk_before = INSTRUMENTS.tk_calls()
+            INSTRUMENTS.failed = False
+        INSTRUMENTS.depth += 1
         try:
             return func(self, *args, **kwargs)
         except Exception as e:
-            print(f"⚠️ 操作异常 [{func.__name__}]: {e}")
+            INSTRUMENTS.failed = True
+            print(f"⚠️ 操作异常 [{name}]: {e}")
             try:
                 self.refresh_group_list()
                 if self.current_active_group:
                     self.refresh_site_list(self.current_active_group)
             except:
                 pass
+        finally:
+            INSTRUMENTS.depth -= 1
+            if outermost:
+                INSTRUMENTS.record(name, time.perf_counter() - started, INSTRUMENTS.tk_calls() - tk_before,
+                                   INSTRUMENTS.failed)
 
     return wrapper
 
 
 class WebManagerApp:
-    def __init__(self, root):
+    def __init__(self, root, storage=None, profile=None, fade=FADE_IN, undo_budget=UNDO_BUDGET, hover_stats=False,
+                 record_stats=False):
         self.root = root
+        INSTRUMENTS.attach(root)
+        if record_stats:
+            INSTRUMENTS.enable()  # 在创建任何控件之前装上，整个运行期间的 Tk 调用都计入
+        self.profile = profile or StartupProfiler()
         self.root.title("Web Manager Pro")
         self.root.geometry("1100x700")  # 稍微加宽一点以容纳备注列
         self.root.configure(bg=COLORS["bg_main"])
@@ -180,57 +1785,356 @@ class WebManagerApp:
         self.context_item_site = None
         self.context_item_group = None
 
-        self.available_browsers = self.detect_browsers()
+        # 窗口化渲染状态：site_source 为当前分组的完整列表，只有 [site_offset, site_offset + 可见行) 会插入 Treeview
+        self.site_source = []
+        self.site_offset = 0
+        self.site_virtual = False
+        self.site_view_group = None
+        self.site_by_iid = {}  # 当前已渲染行的 iid -> 网站记录
+        self.site_selection = {}  # 选中的网站 uid -> 记录；窗口化时滑出窗口、已从 Treeview 删除的行仍保持选中
+        self.site_select_extend = False  # 下一次选中变化来自 Ctrl / Shift 单击：在原有选中项上增减
+        self.search_query = ""  # 非空时右侧列表显示跨分组的搜索结果
+
+        # 分阶段启动：先画出窗口框架，数据在后台线程读取，读完后先显示当前分组，菜单在空闲时创建
+        self.ready = False
+        self.mapped = False
+        self.data = {}
+        self.store = None
+        self.persist = None
+        self.data_file = DATA_FILE
+        self.load_results = queue.Queue()
+        self.usage = UsageLog(os.path.splitext(self.data_file)[0] + USAGE_SUFFIX)  # 打开次数与常用度，随数据一起在后台读取
+        self.usage_writer = UsageWriter(self.usage)
+        threading.Thread(target=self.load_in_background, args=(storage,), name="load-data", daemon=True).start()
+
         self.configure_styles()
-        self.data_file = "bookmarks.json"
-        self.data = self.load_data()
+        self.profile.mark("样式")
+        # 先用上次缓存的检测结果，窗口显示后再在后台核对
+        self.browser_discovery = BrowserDiscovery(os.path.splitext(self.data_file)[0] + ".browsers.json")
+        self.available_browsers = self.browser_discovery.cached()
+        self.launcher = BrowserLauncher()
+        self.links = LinkChecker(os.path.splitext(self.data_file)[0] + ".links.json")
+        self.favicons = FaviconCache(os.path.splitext(self.data_file)[0] + ".favicons")
+        self.icon_images = OrderedDict()  # 主机 -> 缩放后的 PhotoImage（"" 表示没有图标），各行共用
+        self.icon_after = None
+        self.icon_polling = False
+        self.profile.mark("缓存")
+        self.search_index = None  # 读取数据后在后台建立，之后随修改增量更新；建好之前搜索时当场建立
+        self.search_builds = queue.Queue()  # 后台建好的 (建立时的 data_version, 索引或 None)
+        self.search_building = False
+        self.data_version = 0  # 每条修改加一，后台建索引期间数据有变化时那份索引作废
+        self.duplicate_index = None  # 第一次查重时才建立，之后随修改增量更新
+        self.change_listeners = []  # 已建立的索引，每条修改后调用其 apply(op, result)
+        self.most_used_view = False  # True 时右侧列表显示虚拟分组 MOST_USED_GROUP
+        self.most_used_groups = {}  # 虚拟分组中各网站记录的 uid -> 所属分组
+        self.sort_by_usage = tk.BooleanVar(value=False)  # 分组内按常用度排序显示（不改变保存的顺序）
+        self.history = UndoHistory(undo_budget)
+        self.debug_overlay = None
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.bind_all("<Control-k>", self.show_palette)
+        self.root.bind_all("<Control-K>", self.show_palette)
+        self.root.bind_all("<F12>", self.toggle_debug_overlay)
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+        self.root.bind("<Control-Z>", self.redo)
+        if fade:
+            self.root.attributes("-alpha", 0.0)
+        self.setup_ui()
+        self.profile.mark("界面框架")
+        self.root.bind("<Map>", self.on_first_map, add="+")
+        if fade:
+            self.fade_in_window()
+        self.root.after_idle(self.create_context_menus)
+        self.root.after(LOAD_POLL_MS, self.poll_loading)
+        self.root.after(BROWSER_DISCOVERY_DELAY_MS, self.start_browser_discovery)
+        if hover_stats:
+            self.root.after(HOVER_STATS_INTERVAL_MS, self.print_hover_stats)
+
+    def on_first_map(self, event):
+        if event.widget is self.root:
+            self.root.unbind("<Map>")
+            self.mapped = True
+            self.profile.mark("窗口显示")
+            self.finish_startup()
+
+    def finish_startup(self):
+        # 窗口显示和数据读取两者都完成后才算启动结束
+        if self.ready and self.mapped:
+            self.profile.report()
+
+    def load_in_background(self, storage):
+        started = time.perf_counter()
+        try:
+            store = open_store(self.data_file, storage)
+            data = store.load()
+            self.usage.load()
+            self.load_results.put((store, data, time.perf_counter() - started))
+        except Exception as e:
+            self.load_results.put(e)
 
+    def poll_loading(self):
+        try:
+            result = self.load_results.get_nowait()
+        except queue.Empty:
+            self.root.after(LOAD_POLL_MS, self.poll_loading)
+            return
+        if isinstance(result, Exception):
+            messagebox.showerror("读取失败", f"无法读取收藏数据：\n{result}")
+            self.root.destroy()
+            return
+        self.store, self.data, seconds = result
+        self.persist = PersistScheduler(self.root, self.store)
+        self.ready = True
+        self.root.after(SHARED_POLL_MS, self.poll_shared)
+        self.profile.mark("读取数据", seconds)
+        self.link_label.configure(text="")
+
+        # 当前分组先显示，其余分组只列出名称，点击时才生成网站行
         if self.data:
-            self.current_active_group = list(self.data.keys())[0]
-
-        self.root.attributes("-alpha", 0.0)
-        self.setup_ui()
-        self.fade_in_window()
+            self.current_active_group = next(iter(self.data))
+            self.refresh_site_list(self.current_active_group)
+        self.profile.mark("当前分组")
+        self.refresh_group_list()
+        self.profile.mark("分组列表")
+        if self.search_var.get():
+            self.on_search_changed()
+        self.start_search_index()
+        self.finish_startup()
 
     def fade_in_window(self):
-        alpha = self.root.attributes("-alpha")
-        if alpha < 1.0:
-            alpha += 0.05
-            self.root.attributes("-alpha", alpha)
-            self.root.after(15, self.fade_in_window)
+        ANIMATOR.animate(self.root, self.root, WINDOW_FADE_MS, lambda t: self.root.attributes("-alpha", t))
 
-    def detect_browsers(self):
-        found = {}
-        for name, paths in POTENTIAL_BROWSERS.items():
-            for path in paths:
-                if os.path.exists(path):
-                    found[name] = path
-                    break
-        return found
+    def start_browser_discovery(self):
+        self.browser_discovery.start()
+        self.poll_browsers()
+
+    def poll_browsers(self):
+        try:
+            browsers = self.browser_discovery.results.get_nowait()
+        except queue.Empty:
+            self.root.after(200, self.poll_browsers)
+            return
+        if browsers is not None and browsers != self.available_browsers:
+            self.available_browsers = browsers
+            self.rebuild_browser_menus()
 
     def configure_styles(self):
         style = ttk.Style()
         style.theme_use("clam")
         style.configure("Treeview", background=COLORS["bg_card"], foreground=COLORS["text_main"],
-                        rowheight=40, fieldbackground=COLORS["bg_card"], font=FONTS["body"], borderwidth=0)
+                        rowheight=ROW_HEIGHT, fieldbackground=COLORS["bg_card"], font=FONTS["body"], borderwidth=0)
         style.configure("Treeview.Heading", background=COLORS["bg_card"], foreground=COLORS["text_sub"],
                         font=FONTS["h2"], relief="flat")
         style.map("Treeview", background=[('selected', COLORS["item_selected"])],
                   foreground=[('selected', COLORS["primary"])])
 
-    def load_data(self):
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
-        return {"常用工具": [{"name": "Google", "url": "https://www.google.com", "note": ""}], "学习资料": [],
-                "娱乐": []}
+    def save_data(self, op=None):
+        # 传入操作记录时只追加日志；不传时把当前数据整体写成新快照。实际写盘由 persist 防抖后在后台完成
+        self.persist.mark_dirty(op)
+
+    def apply_change(self, op, label="修改"):
+        # 单条修改同样记入撤销历史，否则历史中记录的下标会与数据对不上
+        with_match(self.data, op)
+        inverse = inverse_op(self.data, op)
+        result = apply_op(self.data, op)
+        self.save_data(op)
+        self.notify_change(op, result)
+        self.history.record(label, [op], [inverse])
+        return result
+
+    def notify_change(self, op, result):
+        self.data_version += 1
+        for listener in self.change_listeners:
+            listener.apply(op, result)
+
+    def apply_batch(self, ops, persist=True, label=None, compact=True):
+        # 一组修改作为一个整体：逐条应用到内存，再只做一次持久化（persist=False 时由调用方稍后统一保存）。
+        # 给出 label 时把这组修改作为一步记入撤销历史；compact=False 时大批量之后也不合并快照，由调用方最后合并
+        results, inverse = [], []
+        for op in ops:
+            with_match(self.data, op)
+            if label:
+                inverse.append(inverse_op(self.data, op))
+            result = apply_op(self.data, op)
+            self.notify_change(op, result)
+            results.append(result)
+        if persist and ops:
+            # 日志中占一行，回放时整体生效；快照只是日志的合并结果，其他实例要靠日志看到这批修改
+            self.save_data({"op": "batch", "ops": ops})
+            if compact and len(ops) >= COMPACT_THRESHOLD:
+                self.save_data()  # 大批量之后顺带合并快照，下次启动不必回放这一长行
+        if label and ops:
+            self.history.record(label, ops, inverse[::-1])
+        return results
+
+    # === 多实例共享 ===
+    def poll_shared(self):
+        # 只做 stat：其他实例追加了日志时应用新增的操作，合并过快照时整体重新读取
+        try:
+            changes = self.store.read_changes()
+            if changes is None:
+                self.reload_shared()
+            elif changes:
+                self.apply_foreign(changes)
+        except Exception as e:
+            print(f"⚠️ 同步其他实例的修改失败: {e}")
+        self.root.after(SHARED_POLL_MS, self.poll_shared)
+
+    def apply_foreign(self, ops):
+        touched = set()
+        for op in ops:
+            for sub in op["ops"] if op["op"] == "batch" else (op,):
+                try:
+                    result = apply_op(self.data, sub)
+                except (KeyError, IndexError, ValueError, TypeError):
+                    continue  # 与本实例的修改冲突（如目标已被删除），该操作作废
+                self.notify_change(sub, result)
+                touched.update((sub.get("group"), sub.get("to_group"), sub.get("name")))
+        self.refresh_after_sync(touched)
+
+    def reload_shared(self):
+        self.persist.drain()  # 先把本实例的修改写进日志，重新读取时才不会丢
+        new = self.store.reload()
+        changed = set(self.data)
+        if new is not self.data:
+            changed = merge_groups(self.data, new)
+        # 下标可能整体变化：索引和撤销历史作废，需要时重新建立
+        self.search_index = None
+        self.duplicate_index = None
+        self.change_listeners = []
+        self.data_version += 1
+        self.history = UndoHistory(self.history.budget, self.history.max_steps)
+        self.refresh_after_sync(changed)
+        self.start_search_index()
+
+    def refresh_after_sync(self, groups):
+        if not groups:
+            return
+        if self.current_active_group not in self.data:
+            self.current_active_group = next(iter(self.data), None)
+        self.refresh_group_list()
+        if (self.search_query or self.most_used_view or self.current_active_group in groups
+                or self.site_view_group != self.current_active_group):
+            self.refresh_site_list(self.current_active_group)
+
+    @safe_action
+    def undo(self, event=None):
+        if event is not None and isinstance(event.widget, (tk.Entry, ttk.Entry)): return  # 输入框里的 Ctrl+Z 不处理
+        entry = self.history.undo()
+        if not entry:
+            ToastNotification(self.root, "没有可撤销的操作")
+            return
+        label, ops, inverse = entry
+        self.apply_batch(inverse)
+        self.refresh_after_history()
+        ToastNotification(self.root, f"已撤销：{label}")
+
+    @safe_action
+    def redo(self, event=None):
+        if event is not None and isinstance(event.widget, (tk.Entry, ttk.Entry)): return
+        entry = self.history.redo()
+        if not entry:
+            ToastNotification(self.root, "没有可重做的操作")
+            return
+        label, ops, inverse = entry
+        self.apply_batch(ops)
+        self.refresh_after_history()
+        ToastNotification(self.root, f"已重做：{label}")
+
+    def refresh_after_history(self):
+        if self.current_active_group not in self.data:
+            self.current_active_group = next(iter(self.data), None)
+        self.refresh_group_list()
+        self.refresh_site_list(self.current_active_group)
+
+    @property
+    def search(self):
+        if self.search_index is None:
+            self.use_search_index(search_index_for(self.data))  # 后台还没建好时当场建立
+        return self.search_index
 
-    def save_data(self):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
+    def use_search_index(self, index):
+        self.search_index = index
+        self.change_listeners.append(index)
+
+    def start_search_index(self):
+        # 十万条时建索引要两秒多，放到后台线程，第一次输入搜索词时不必等待
+        if self.search_index is not None or self.search_building:
+            return
+        if not isinstance(self.data, dict):
+            self.use_search_index(search_index_for(self.data))  # SQLite 查询库里的全文索引，无需预先建立
+            return
+        self.search_building = True
+        threading.Thread(target=self.build_search_index, args=(self.data_version,),
+                         name="search-index", daemon=True).start()
+        self.root.after(SEARCH_INDEX_POLL_MS, self.poll_search_index)
+
+    def build_search_index(self, version):
+        try:
+            index = search_index_for(self.data)
+        except Exception:
+            index = None  # 主线程同时在修改数据（如字典大小变化），稍后重建
+        self.search_builds.put((version, index))
+
+    def poll_search_index(self):
+        try:
+            version, index = self.search_builds.get_nowait()
+        except queue.Empty:
+            self.root.after(SEARCH_INDEX_POLL_MS, self.poll_search_index)
+            return
+        self.search_building = False
+        if self.search_index is not None:
+            return  # 等待期间已经当场建立
+        if index is not None and version == self.data_version:
+            self.use_search_index(index)
+        else:
+            self.start_search_index()  # 建立期间数据有修改，这份索引可能漏掉了它们
+
+    @property
+    def duplicates(self):
+        if self.duplicate_index is None:
+            self.duplicate_index = duplicate_index_for(self.data)
+            self.change_listeners.append(self.duplicate_index)
+        return self.duplicate_index
+
+    def on_close(self):
+        try:
+            self.links.cancel()
+            self.favicons.close()
+            self.usage_writer.close()
+            if self.persist:
+                self.persist.close()
+            self.dump_stats()
+        finally:
+            self.root.destroy()
+
+    def dump_stats(self):
+        # 退出时把本次运行的处理函数耗时和写盘统计写到 bookmarks.stats.json
+        extra = {"animator": ANIMATOR.stats}
+        if self.links.stats:
+            extra["links"] = self.links.stats  # 最近一次链接检查的吞吐和延迟
+        if self.persist:
+            extra["persist"] = dict(self.persist.stats, bytes_written=self.store.bytes_written)
+        try:
+            INSTRUMENTS.dump(os.path.splitext(self.data_file)[0] + ".stats.json", extra)
+        except OSError as e:
+            print(f"⚠️ 写入运行统计失败: {e}")
+
+    def toggle_debug_overlay(self, event=None):
+        if self.debug_overlay is None:
+            self.debug_overlay = DebugOverlay(self)
+        else:
+            self.debug_overlay.close()
+
+    def io_summary(self):
+        parts = [f"Tk 调用 {INSTRUMENTS.tk_calls()} 次"]
+        if self.persist:
+            stats = self.persist.stats
+            parts.append(f"保存 {stats['writes']} 次（{stats['mutations']} 条修改）")
+            written = self.store.bytes_written
+            parts.append("写盘 " + (format_bytes(written) if written is not None else "由 SQLite 管理，不统计"))
+        return " · ".join(parts)
 
     def setup_ui(self):
         top_bar = tk.Frame(self.root, bg=COLORS["bg_main"], height=60)
@@ -239,6 +2143,19 @@ class WebManagerApp:
         tk.Label(top_bar, text="🌏 我的网站收藏", bg=COLORS["bg_main"], fg=COLORS["text_on_bg"], font=FONTS["h1"]).pack(
             side=tk.LEFT, anchor="w")
 
+        # 搜索框：输入即在所有分组中搜索
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(top_bar, textvariable=self.search_var, width=32, font=FONTS["body"], relief="solid",
+                                bd=1)
+        search_entry.pack(side=tk.LEFT, padx=(30, 0), ipady=4)
+        tk.Label(top_bar, text="🔍", bg=COLORS["bg_main"], fg=COLORS["text_sub"], font=FONTS["body"]).pack(
+            side=tk.LEFT, padx=(6, 0))
+        search_entry.bind("<Escape>", lambda e: self.search_var.set(""))
+        self.search_var.trace_add("write", self.on_search_changed)
+        AnimatedButton(top_bar, text="导入书签", command=self.import_bookmarks, width=10).pack(side=tk.RIGHT, pady=12)
+        AnimatedButton(top_bar, text="查找重复", command=self.show_duplicates, width=10).pack(
+            side=tk.RIGHT, padx=(0, 10), pady=12)
+
         content_area = tk.Frame(self.root, bg=COLORS["bg_main"])
         content_area.pack(fill=tk.BOTH, expand=True, padx=30, pady=(0, 30))
 
@@ -258,12 +2175,13 @@ class WebManagerApp:
 
         self.group_tree = ttk.Treeview(left_card, show="tree", selectmode="browse")
         self.group_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        self.group_tree.bind("<Motion>", self.on_group_hover)
-        self.group_tree.bind("<Leave>", self.on_group_leave)
         self.group_tree.bind("<Button-1>", self.handle_group_click)
+        self.group_tree.bind("<B1-Motion>", self.on_drag_motion)
+        self.group_tree.bind("<ButtonRelease-1>", self.on_drag_release)
         self.group_tree.bind("<Button-3>", self.show_group_menu)
         self.group_tree.tag_configure("active_group", font=FONTS["body_bold"], foreground=COLORS["primary"])
         self.group_tree.tag_configure("normal_group", font=FONTS["body"], foreground=COLORS["text_main"])
+        self.group_hover = HoverTracker(self.group_tree)
 
         # === 右侧列表 ===
         right_card = tk.Frame(content_area, bg=COLORS["bg_card"])
@@ -275,36 +2193,58 @@ class WebManagerApp:
         tk.Label(right_header, text="网站列表", bg=COLORS["bg_card"], fg=COLORS["text_main"], font=FONTS["h2"]).pack(
             side=tk.LEFT, pady=15)
         AnimatedButton(right_header, text="+ 添加网站", command=self.add_website, width=12).pack(side=tk.RIGHT, pady=12)
+        AnimatedButton(right_header, text="检查链接", command=self.check_links, width=10).pack(
+            side=tk.RIGHT, padx=(0, 10), pady=12)
+        self.link_label = tk.Label(right_header, text="", bg=COLORS["bg_card"], fg=COLORS["text_sub"],
+                                   font=FONTS["small"])
+        self.link_label.pack(side=tk.RIGHT, padx=10)
         tk.Frame(right_card, bg=COLORS["border"], height=1).pack(fill=tk.X, padx=20)
 
         # 修改：增加“备注”列
-        columns = ("name", "url", "note")
-        self.site_tree = ttk.Treeview(right_card, columns=columns, show="headings", selectmode="browse")
+        columns = ("name", "url", "note", "status")
+        self.site_tree = ttk.Treeview(right_card, columns=columns, show="tree headings", selectmode="extended")
+        self.site_tree.column("#0", width=FAVICON_SIZE + 24, minwidth=FAVICON_SIZE + 24, stretch=False)  # 图标列
 
         self.site_tree.heading("name", text="网站名称", anchor="w")
         self.site_tree.heading("url", text="网址 URL", anchor="w")
         self.site_tree.heading("note", text="备注", anchor="w")  # 新增表头
+        self.site_tree.heading("status", text="状态", anchor="w")
 
         self.site_tree.column("name", width=200, anchor="w")
-        self.site_tree.column("url", width=350, anchor="w")
-        self.site_tree.column("note", width=200, anchor="w")  # 新增列宽
+        self.site_tree.column("url", width=330, anchor="w")
+        self.site_tree.column("note", width=180, anchor="w")  # 新增列宽
+        self.site_tree.column("status", width=80, anchor="w")
 
-        scrollbar = ttk.Scrollbar(right_card, orient=tk.VERTICAL, command=self.site_tree.yview)
-        self.site_tree.configure(yscroll=scrollbar.set)
+        self.site_scrollbar = ttk.Scrollbar(right_card, orient=tk.VERTICAL, command=self.site_tree.yview)
+        self.site_tree.configure(yscroll=self.on_site_yscroll)
         self.site_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(20, 0), pady=10)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10, padx=(0, 5))
-
-        self.site_tree.bind("<Motion>", self.on_site_hover)
-        self.site_tree.bind("<Leave>", self.on_site_leave)
-        self.site_tree.bind("<Button-1>", self.handle_site_click)
+        self.site_scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10, padx=(0, 5))
+
+        # 窗口化模式下由我们自己处理滚动
+        self.site_tree.bind("<Configure>", self.on_site_resize)
+        self.site_tree.bind("<MouseWheel>", self.on_site_wheel)
+        self.site_tree.bind("<Button-4>", self.on_site_wheel)
+        self.site_tree.bind("<Button-5>", self.on_site_wheel)
+        # 单击在松开时打开网站；按住拖动则排序或拖到左侧分组。Ctrl / Shift 单击多选交给 Treeview 默认处理
+        self.site_tree.bind("<Button-1>", self.on_site_press)
+        self.site_tree.bind("<Control-Button-1>", self.on_site_extend_press)
+        self.site_tree.bind("<Shift-Button-1>", self.on_site_extend_press)
+        self.site_tree.bind("<<TreeviewSelect>>", self.on_site_select, add="+")
+        self.site_tree.bind("<B1-Motion>", self.on_drag_motion)
+        self.site_tree.bind("<ButtonRelease-1>", self.on_site_release)
         self.site_tree.bind("<Button-3>", self.show_site_menu)
+        self.site_tree.bind("<Delete>", self.delete_selection)
+        # ttk 中先创建的标签优先级更高：hover 必须先于斑马纹的 even / odd 创建，否则悬停底色被盖住
+        self.site_hover = HoverTracker(self.site_tree)
         self.site_tree.tag_configure("even", background=COLORS["bg_card"])
         self.site_tree.tag_configure("odd", background="#FAFAFA")
 
-        self.create_context_menus()
-        self.refresh_group_list()
-        if self.current_active_group:
-            self.refresh_site_list(self.current_active_group)
+        self.group_sync = TreeSync(self.group_tree)
+        self.site_sync = TreeSync(self.site_tree)
+        self.drag = None  # 进行中的拖动：{"tree", "x", "y", "item", "items", "active", "target"}
+        self.drop_line = tk.Frame(self.root, bg=COLORS["primary"], height=2)
+
+        self.link_label.configure(text="正在加载…")
 
     def create_context_menus(self):
         self.group_menu = tk.Menu(self.root, tearoff=0, font=FONTS["body"])
@@ -313,23 +2253,112 @@ class WebManagerApp:
         self.group_menu.add_separator()
         self.group_menu.add_command(label="上移", command=lambda: self.move_item(self.group_tree, True, "up"))
         self.group_menu.add_command(label="下移", command=lambda: self.move_item(self.group_tree, True, "down"))
+        self.group_menu.add_separator()
+        self.group_open_menu = tk.Menu(self.group_menu, tearoff=0, font=FONTS["body"])
+        self.group_menu.add_cascade(label="全部打开", menu=self.group_open_menu)
 
         self.site_menu = tk.Menu(self.root, tearoff=0, font=FONTS["body"])
-        if self.available_browsers:
-            self.browser_submenu = tk.Menu(self.site_menu, tearoff=0, font=FONTS["body"])
-            self.site_menu.add_cascade(label="打开方式 (Open With)", menu=self.browser_submenu)
-            self.browser_submenu.add_command(label="系统默认", command=lambda: self.open_with_browser("Default"))
-            self.browser_submenu.add_separator()
-            for b_name, b_path in self.available_browsers.items():
-                self.browser_submenu.add_command(label=f"{b_name}", command=lambda p=b_path: self.open_with_browser(p))
-            self.site_menu.add_separator()
+        # 浏览器子菜单在后台检测完成后由 rebuild_browser_menus 重新填充
+        self.browser_submenu = tk.Menu(self.site_menu, tearoff=0, font=FONTS["body"])
+        self.site_menu.add_cascade(label="打开方式 (Open With)", menu=self.browser_submenu)
+        self.site_menu.add_separator()
+        self.selection_open_menu = tk.Menu(self.site_menu, tearoff=0, font=FONTS["body"])
+        self.site_menu.add_cascade(label="打开选中项", menu=self.selection_open_menu)
         self.site_menu.add_command(label="编辑", command=self.edit_website)
+        self.site_menu.add_command(label="编辑备注", command=self.edit_note)
+        self.move_menu = tk.Menu(self.site_menu, tearoff=0, font=FONTS["body"], postcommand=self.fill_move_menu)
+        self.site_menu.add_cascade(label="移动到分组", menu=self.move_menu)
         self.site_menu.add_command(label="删除", command=self.delete_website)
         self.site_menu.add_separator()
         self.site_menu.add_command(label="上移", command=lambda: self.move_item(self.site_tree, False, "up"))
         self.site_menu.add_command(label="下移", command=lambda: self.move_item(self.site_tree, False, "down"))
         self.site_menu.add_command(label="置顶", command=lambda: self.move_item(self.site_tree, False, "top"))
         self.site_menu.add_command(label="置底", command=lambda: self.move_item(self.site_tree, False, "bottom"))
+        self.site_menu.add_separator()
+        self.site_menu.add_checkbutton(label="按常用度排序", variable=self.sort_by_usage,
+                                       command=lambda: self.refresh_site_list(self.current_active_group))
+        self.rebuild_browser_menus()
+        self.profile.mark("菜单")
+
+    def rebuild_browser_menus(self):
+        for menu, command in ((self.browser_submenu, self.open_with_browser), (self.group_open_menu, self.open_group),
+                              (self.selection_open_menu, self.open_selection)):
+            menu.delete(0, tk.END)
+            self.fill_browser_menu(menu, command)
+
+    def fill_browser_menu(self, menu, command):
+        menu.add_command(label="系统默认", command=lambda: command("Default"))
+        if self.available_browsers:
+            menu.add_separator()
+        for b_name, b_path in self.available_browsers.items():
+            menu.add_command(label=f"{b_name}", command=lambda p=b_path: command(p))
+
+    @safe_action
+    def open_group(self, browser_path):
+        group = self.context_item_group or self.current_active_group
+        if group in self.data:
+            self.open_sites(list(self.data[group]), browser_path)
+
+    @safe_action
+    def open_selection(self, browser_path):
+        self.open_sites(self.selected_sites(), browser_path)
+
+    def selected_sites(self):
+        # 右键的行在选中范围内时作用于全部选中项（包括窗口外的行），否则只作用于该行
+        site = self.site_by_iid.get(self.context_item_site)
+        if site is not None and site.uid not in self.site_selection:
+            return [site]
+        return self.ordered_selection()
+
+    def ordered_selection(self):
+        # 按列表顺序返回选中的网站；已被删除或移出当前列表的记录不再计入
+        if not self.site_selection:
+            return []
+        return [site for site in self.site_source if site.uid in self.site_selection]
+
+    def select_sites(self, sites):
+        # 以 sites 替换选中项，已渲染的行同步到 Treeview
+        self.site_selection = {site.uid: site for site in sites}
+        self.show_selection()
+
+    def show_selection(self):
+        selected = self.site_selection
+        self.site_tree.selection_set([iid for iid, site in self.site_by_iid.items() if site.uid in selected])
+
+    def on_site_extend_press(self, event):
+        self.drag = None
+        self.site_select_extend = True
+
+    def on_site_select(self, event=None):
+        # Treeview 的选中变化同步到 site_selection；只有已渲染的行能在界面上改变选中状态
+        extend, self.site_select_extend = self.site_select_extend, False
+        shown = set(self.site_tree.selection())
+        if shown == {iid for iid, site in self.site_by_iid.items() if site.uid in self.site_selection}:
+            return  # 渲染时重新挂上的选中状态，或没有变化
+        if not extend:
+            self.site_selection = {}  # 普通单击、键盘移动替换选中项，窗口外原先选中的行一并取消
+        for iid, site in self.site_by_iid.items():
+            if iid in shown:
+                self.site_selection[site.uid] = site
+            else:
+                self.site_selection.pop(site.uid, None)
+
+    def open_sites(self, sites, browser_path="Default"):
+        # 批量打开：一次浏览器调用传入多个网址，启动过程在后台线程中进行
+        if not sites: return
+        self.record_open(sites)
+        self.launcher.open(browser_path, [site["url"] for site in sites])
+        self.root.after(300, self.poll_launcher)
+        ToastNotification(self.root, f"正在打开 {len(sites)} 个网站")
+
+    def poll_launcher(self):
+        try:
+            e = self.launcher.errors.get_nowait()
+            messagebox.showerror("启动失败", f"无法启动浏览器：\n{e}")
+        except queue.Empty:
+            pass
+        if self.launcher.busy:
+            self.root.after(300, self.poll_launcher)
 
     @safe_action
     def open_with_browser(self, browser_path):
@@ -338,8 +2367,12 @@ class WebManagerApp:
             sel = self.site_tree.selection()
             if sel: item_id = sel[0]
         if not item_id: return
-        item = self.site_tree.item(item_id)
-        url = item['values'][1]
+        self.open_site(self.site_by_iid[item_id], browser_path)
+
+    def open_site(self, site, browser_path="Default"):
+        # 列表单击、右键“打开方式”和快速打开面板都经由这里打开网址
+        url = site["url"]
+        self.record_open([site])
         if browser_path == "Default":
             webbrowser.open(url)
         else:
@@ -348,131 +2381,540 @@ class WebManagerApp:
             except Exception as e:
                 messagebox.showerror("启动失败", f"无法启动浏览器：\n{e}")
 
+    def record_open(self, sites):
+        self.usage_writer.record([site["url"] for site in sites])
+
+    def usage_boost(self, site):
+        # 打开越频繁、越近期的网站在快速打开面板中排得越靠前
+        return 15 * math.log1p(self.usage.score(site["url"]))
+
     @safe_action
-    def move_item(self, tree, is_group, direction):
-        item = self.context_item_group if is_group else self.context_item_site
-        if not item:
-            sel = tree.selection()
-            if sel: item = sel[0]
-        if not item: return
-        parent = tree.parent(item)
-        current_idx = tree.index(item)
-        total_items = len(tree.get_children(parent))
-        target_idx = current_idx
-        if direction == "up":
-            if current_idx > 0: target_idx = current_idx - 1
-        elif direction == "down":
-            if current_idx < total_items - 1: target_idx = current_idx + 1
-        elif direction == "top":
-            target_idx = 0
-        elif direction == "bottom":
-            target_idx = total_items
-        if target_idx != current_idx:
-            tree.move(item, parent, target_idx)
-            self.sync_data_order(is_group)
-
-    def sync_data_order(self, is_group):
-        if is_group:
-            new_keys = self.group_tree.get_children()
-            new_data = {}
-            for key in new_keys:
-                if key in self.data:
-                    new_data[key] = self.data[key]
-            self.data = new_data
-            self.save_data()
-            self.refresh_group_list()
-        else:
-            if not self.current_active_group: return
-            new_order_ids = self.site_tree.get_children()
-            old_site_list = self.data[self.current_active_group]
-            new_site_list = []
-            for iid in new_order_ids:
-                try:
-                    original_index = int(iid)
-                    if original_index < len(old_site_list):
-                        new_site_list.append(old_site_list[original_index])
-                except:
-                    pass
-            self.data[self.current_active_group] = new_site_list
-            self.save_data()
+    def import_bookmarks(self):
+        path = filedialog.askopenfilename(
+            title="导入浏览器书签",
+            filetypes=[("书签文件", "*.html *.htm *.json"), ("Chrome Bookmarks", "Bookmarks"), ("所有文件", "*")])
+        if path:
+            ImportJob(self, path)
+
+    @safe_action
+    def check_links(self):
+        if self.links.running: return
+        urls = [site["url"] for sites in self.data.values() for site in sites]
+        total = self.links.start(urls)
+        self.link_label.configure(text=f"检查中 0/{total}")
+        self.root.after(200, self.poll_links)
+
+    def poll_links(self):
+        # 从后台线程的结果队列中取出结果，只在当前列表有变化时刷新一次
+        changed = False
+        while True:
+            try:
+                item = self.links.results.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stats = self.links.stats
+                self.link_label.configure(text="")
+                self.refresh_site_list(self.current_active_group)
+                ToastNotification(self.root, f"检查 {stats['checked']} 个链接，{stats['failed']} 个失效 · "
+                                             f"{stats['urls_per_second']} 个/秒 · p95 {stats['p95_ms']} ms")
+                return
+            changed = True
+        if changed:
+            self.link_label.configure(text=f"检查中 {self.links.finished}/{self.links.total}")
             self.refresh_site_list(self.current_active_group)
+        self.root.after(200, self.poll_links)
 
     @safe_action
-    def on_group_hover(self, event):
-        item_id = self.group_tree.identify_row(event.y)
-        if item_id and item_id not in self.group_tree.selection():
-            self.group_tree.selection_set(item_id)
+    def show_duplicates(self):
+        report = self.duplicates.report()
+        if not report:
+            ToastNotification(self.root, "没有发现重复的网址", "success")
+            return
+        win = tk.Toplevel(self.root)
+        win.title(f"重复的网址 ({len(report)} 组)")
+        win.configure(bg=COLORS["bg_card"])
+        self.center_window(win, 760, 480)
+        tree = ttk.Treeview(win, columns=("name", "url"), show="tree headings", selectmode="browse")
+        tree.heading("#0", text="分组 / 规范网址", anchor="w")
+        tree.heading("name", text="网站名称", anchor="w")
+        tree.heading("url", text="网址 URL", anchor="w")
+        tree.column("#0", width=260)
+        tree.column("name", width=180)
+        tree.column("url", width=300)
+        scrollbar = ttk.Scrollbar(win, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscroll=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(16, 0), pady=16)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=16, padx=(0, 8))
+        locations = {}
+        for key, entries in report:
+            parent = tree.insert("", tk.END, text=key, open=True)
+            for group, site in entries:
+                iid = tree.insert(parent, tk.END, text=group, values=(site["name"], site["url"]))
+                locations[iid] = (group, site)
+
+        def reveal(event):
+            # 双击某条记录：切换到它所在的分组并定位到该行
+            iid = tree.identify_row(event.y)
+            if iid not in locations: return
+            group, site = locations[iid]
+            self.search_var.set("")
+            self.current_active_group = group
+            self.most_used_view = False
+            self.refresh_group_list()
+            self.refresh_site_list(group)
+            self.scroll_site_into_view(site)
+            self.select_sites([site])
+
+        tree.bind("<Double-Button-1>", reveal)
 
     @safe_action
-    def on_group_leave(self, event):
-        if self.group_tree.selection():
-            self.group_tree.selection_remove(self.group_tree.selection())
+    def show_palette(self, event=None):
+        CommandPalette(self)
+        return "break"
+
+    @safe_action
+    def move_item(self, tree, is_group, direction):
+        # 直接在数据上移动，再由增量同步把变化反映到 Treeview
+        if is_group:
+            item = self.context_item_group
+            if not item:
+                sel = tree.selection()
+                if sel: item = sel[0]
+            if not item: return
+            keys = list(self.data.keys())
+            current_idx = keys.index(item)
+            target_idx = move_target(current_idx, len(keys), direction)
+            if target_idx != current_idx:
+                self.apply_change({"op": "move_group", "group": item, "index": target_idx}, "移动分组")
+                self.refresh_group_list()
+        elif self.reorderable():
+            # 多选时整体移动，作为一步记入撤销历史
+            selected = self.selected_sites()
+            uids = {site.uid for site in selected}
+            indices = [i for i, site in enumerate(self.site_source) if site.uid in uids]
+            ops = [{"op": "move", "group": self.current_active_group, "index": i, "to": to}
+                   for i, to in plan_shift(indices, len(self.site_source), direction)]
+            if ops:
+                self.apply_batch(ops, label="移动网站" if len(selected) == 1 else f"移动 {len(selected)} 个网站")
+                self.refresh_site_list(self.current_active_group)
+                self.select_sites(selected)
+                self.scroll_site_into_view(selected[0] if direction in ("up", "top") else selected[-1])
 
     @safe_action
     def handle_group_click(self, event):
         item_id = self.group_tree.identify_row(event.y)
         if item_id:
-            self.current_active_group = item_id
+            self.most_used_view = item_id == MOST_USED_IID
+            if self.most_used_view:
+                self.drag = None  # 虚拟分组不能拖动
+            else:
+                self.drag = {"tree": self.group_tree, "x": event.x, "y": event.y, "item": item_id,
+                             "items": [item_id], "active": False}
+                self.current_active_group = item_id
+            self.search_query = ""
+            self.search_var.set("")
             self.refresh_group_list()
             self.refresh_site_list(self.current_active_group)
 
+    @safe_action
+    def on_search_changed(self, *args):
+        self.search_query = self.search_var.get().strip()
+        self.site_offset = 0
+        self.refresh_site_list(self.current_active_group)
+
     @safe_action
     def show_group_menu(self, event):
         item_id = self.group_tree.identify_row(event.y)
-        if item_id:
+        if item_id in self.data:
             self.context_item_group = item_id
             self.group_tree.selection_set(item_id)
             self.group_menu.post(event.x_root, event.y_root)
 
     @safe_action
-    def on_site_hover(self, event):
+    def on_site_press(self, event):
         item_id = self.site_tree.identify_row(event.y)
-        if item_id:
-            if item_id not in self.site_tree.selection():
-                self.site_tree.selection_set(item_id)
-            # 移除了 Tooltip 显示逻辑
+        if not item_id:
+            self.drag = None
+            return
+        self.site_select_extend = False
+        site = self.site_by_iid[item_id]
+        sites = [site]
+        if site.uid in self.site_selection and len(self.site_selection) > 1:
+            sites = self.ordered_selection()
+        self.drag = {"tree": self.site_tree, "x": event.x, "y": event.y, "item": item_id, "items": [item_id],
+                     "sites": sites, "active": False}
+        if len(sites) > 1:
+            return "break"  # 按在多选项上：保留选中状态以便整体拖动（包括窗口外的选中行）
 
     @safe_action
-    def on_site_leave(self, event):
-        if self.site_tree.selection():
-            self.site_tree.selection_remove(self.site_tree.selection())
+    def on_site_release(self, event):
+        drag = self.drag
+        if drag and not drag["active"]:
+            # 没有拖动，按单击处理
+            self.drag = None
+            item_id = self.site_tree.identify_row(event.y)
+            if item_id and item_id == drag["item"]:
+                self.select_sites([self.site_by_iid[item_id]])
+                self.open_site(self.site_by_iid[item_id])
+            return
+        self.on_drag_release(event)
 
+    # === 拖放排序 ===
     @safe_action
-    def handle_site_click(self, event):
-        item_id = self.site_tree.identify_row(event.y)
-        if item_id:
-            item = self.site_tree.item(item_id)
-            url = item['values'][1]
-            webbrowser.open(url)
+    def on_drag_motion(self, event):
+        drag = self.drag
+        if not drag: return
+        if not drag["active"]:
+            if abs(event.x - drag["x"]) + abs(event.y - drag["y"]) < DRAG_THRESHOLD: return
+            drag["active"] = True
+            for tree in (self.site_tree, self.group_tree):
+                tree.configure(cursor="fleur")
+        target = self.root.winfo_containing(event.x_root, event.y_root)
+        drag["target"] = None
+        self.drop_line.place_forget()
+        if target is self.group_tree:
+            y = event.y_root - self.group_tree.winfo_rooty()
+            if drag["tree"] is self.site_tree:
+                # 网站拖到左侧分组上：高亮该分组，松开后移入
+                group = self.group_tree.identify_row(y)
+                if group in self.data:
+                    self.group_tree.selection_set(group)
+                    drag["target"] = ("group", group)
+            else:
+                keys = list(self.data.keys())
+                index_of = lambda iid: keys.index(iid) if iid in self.data else -1  # 顶部的虚拟分组
+                index, line_y = self.drop_position(self.group_tree, y, len(keys), index_of)
+                drag["target"] = ("index", max(0, index))
+                self.drop_line.place(in_=self.group_tree, x=0, y=line_y, relwidth=1)
+        elif target is self.site_tree and drag["tree"] is self.site_tree and self.reorderable():
+            y = event.y_root - self.site_tree.winfo_rooty()
+            # 靠近上下边缘时自动滚动，便于拖到当前窗口之外的位置
+            edge = ROW_HEIGHT // 2
+            if y < edge or y > self.site_tree.winfo_height() - edge:
+                step = -1 if y < edge else 1
+                if self.site_virtual:
+                    self.site_offset += step
+                    self.render_site_window()
+                else:
+                    self.site_tree.yview_scroll(step, "units")
+            index, line_y = self.drop_position(self.site_tree, y, len(self.site_source), self.site_index)
+            drag["target"] = ("index", index)
+            self.drop_line.place(in_=self.site_tree, x=0, y=line_y, relwidth=1)
+
+    def drop_position(self, tree, y, total, index_of):
+        # 返回 (插入位置 0..total, 指示线的 y 坐标)：落在某行上半部插到它之前，下半部插到它之后
+        row = tree.identify_row(y)
+        if row:
+            _, top, _, height = tree.bbox(row)
+            if y >= top + height / 2:
+                return index_of(row) + 1, top + height
+            return index_of(row), top
+        children = tree.get_children()
+        if not children:
+            return 0, 0
+        box = tree.bbox(children[-1])
+        if box and y >= box[1]:
+            return index_of(children[-1]) + 1, box[1] + box[3]
+        return index_of(children[0]), 0
+
+    @safe_action
+    def on_drag_release(self, event):
+        drag, self.drag = self.drag, None
+        self.drop_line.place_forget()
+        for tree in (self.site_tree, self.group_tree):
+            tree.configure(cursor="")
+        if not drag or not drag["active"] or not drag.get("target"):
+            return
+        kind, value = drag["target"]
+        if drag["tree"] is self.group_tree:
+            group = drag["items"][0]
+            index = list(self.data.keys()).index(group)
+            to = value - 1 if value > index else value
+            if to != index:
+                self.apply_change({"op": "move_group", "group": group, "index": to}, "移动分组")
+                self.refresh_group_list()
+        elif kind == "group":
+            self.drop_sites_on_group(drag["sites"], value)
+        else:
+            # 组内排序：每条移动一次，整体作为一批修改只刷新一次
+            uids = {site.uid for site in drag["sites"]}
+            indices = [i for i, site in enumerate(self.site_source) if site.uid in uids]
+            ops = [{"op": "move", "group": self.current_active_group, "index": i, "to": to}
+                   for i, to in plan_moves(indices, value)]
+            if ops:
+                self.apply_batch(ops, label="拖动排序")
+                self.refresh_site_list(self.current_active_group)
+            self.select_sites(drag["sites"])
+
+    def drop_sites_on_group(self, sites, group):
+        # 从后往前逐条移出，保证其余待移记录的下标不变；都插到目标分组末尾的同一位置，保持原有先后顺序
+        located = sorted((self.locate_site(site) for site in sites), key=lambda gi: gi[1], reverse=True)
+        base = len(self.data[group])
+        ops = [{"op": "transfer", "group": src, "index": index, "to_group": group, "to": base}
+               for src, index in located if src != group]
+        if not ops: return
+        self.apply_batch(ops, label=f"移动 {len(ops)} 个网站到 '{group}'")
+        self.refresh_group_list()
+        self.refresh_site_list(self.current_active_group)
+        ToastNotification(self.root, f"已将 {len(ops)} 个网站移到 '{group}'", "success")
 
     @safe_action
     def show_site_menu(self, event):
         item_id = self.site_tree.identify_row(event.y)
         if item_id:
             self.context_item_site = item_id
-            self.site_tree.selection_set(item_id)
+            if self.site_by_iid[item_id].uid not in self.site_selection:
+                self.select_sites([self.site_by_iid[item_id]])
             self.site_menu.post(event.x_root, event.y_root)
 
+    def fill_move_menu(self):
+        self.move_menu.delete(0, tk.END)
+        for group in self.data.keys():
+            self.move_menu.add_command(label=group, command=lambda g=group: self.move_selection_to_group(g))
+
+    @safe_action
+    def move_selection_to_group(self, group):
+        self.drop_sites_on_group(self.selected_sites(), group)
+
     def refresh_group_list(self):
         sel = self.group_tree.selection()
-        for item in self.group_tree.get_children(): self.group_tree.delete(item)
-        for group in self.data.keys():
-            tag = "active_group" if group == self.current_active_group else "normal_group"
-            text = f"👉 {group}" if group == self.current_active_group else f"   {group}"
-            self.group_tree.insert("", tk.END, iid=group, text=text, tags=(tag,))
+        active = MOST_USED_IID if self.most_used_view else self.current_active_group
+        rows = []
+        for group in itertools.chain((MOST_USED_IID,), self.data.keys()):
+            label = MOST_USED_GROUP if group == MOST_USED_IID else group
+            tag = "active_group" if group == active else "normal_group"
+            text = f"👉 {label}" if group == active else f"   {label}"
+            rows.append((group, {"text": text, "tags": (tag,)}))
+        self.group_sync.apply(rows)
+        self.group_hover.reapply()
         try:
             if sel and self.group_tree.exists(sel[0]): self.group_tree.selection_set(sel)
         except:
             pass
 
     def refresh_site_list(self, group_name):
-        for item in self.site_tree.get_children(): self.site_tree.delete(item)
-        sites = self.data.get(group_name, [])
-        for i, site in enumerate(sites):
+        if self.search_query:
+            sites = self.search.search(self.search_query)
+            group_name = None
+        elif self.most_used_view:
+            sites = self.most_used_sites()
+            group_name = MOST_USED_IID
+        else:
+            sites = self.data.get(group_name, [])
+            if self.sort_by_usage.get():
+                sites = sorted(sites, key=lambda site: self.usage.rank(site["url"]), reverse=True)
+        if group_name != self.site_view_group:
+            self.site_offset = 0
+            self.site_selection = {}  # 换了列表，原来的选中项不再可见也不应再被批量操作
+        self.site_view_group = group_name
+        self.site_source = sites
+        virtual = len(sites) > VIRTUAL_THRESHOLD
+        if virtual != self.site_virtual:
+            self.site_virtual = virtual
+            if virtual:
+                # 窗口化：Treeview 自身不再滚动，滚动条映射到整个分组
+                self.site_tree.configure(yscrollcommand="")
+                self.site_scrollbar.configure(command=self.on_site_scroll)
+                self.site_tree.yview_moveto(0)
+            else:
+                self.site_tree.configure(yscrollcommand=self.on_site_yscroll)
+                self.site_scrollbar.configure(command=self.site_tree.yview)
+        if virtual:
+            self.render_site_window()
+        else:
+            self.render_site_rows(0, len(sites))
+
+    def render_site_rows(self, start, end):
+        rows = []
+        self.site_by_iid = {}
+        for i in range(start, end):
+            site = self.site_source[i]
+            iid = site_iid(site)
+            self.site_by_iid[iid] = site
             tag = "even" if i % 2 == 0 else "odd"
             note = site.get("note", "")  # 获取备注
+            if self.search_query or self.most_used_view:  # 结果来自不同分组，在备注列标出所属分组
+                note = f"[{self.group_of_row(site)}] {note}"
             # 插入数据包含 note
-            self.site_tree.insert("", tk.END, iid=str(i), values=(site["name"], site["url"], note), tags=(tag,))
+            status = link_status_text(self.links.status(site["url"]))
+            rows.append((iid, {"values": (site["name"], site["url"], note, status), "tags": (tag,),
+                               "image": self.icon_images.get(favicon_origin(site["url"]), "")}))
+        self.site_sync.apply(rows)
+        self.show_selection()  # 滑回窗口的行恢复选中状态
+        self.site_hover.reapply()
+        self.schedule_icons()
+
+    def site_index(self, iid):
+        # iid 与网站记录绑定而非位置，需要时再在当前分组里定位下标
+        return find_site(self.site_source, self.site_by_iid[iid])
+
+    def locate_site(self, site):
+        # 返回 (所属分组, 在该分组中的下标)，搜索结果和常用分组中的行也适用
+        group = self.group_of_row(site)
+        return group, find_site(self.data[group], site)
+
+    def group_of_row(self, site):
+        if self.search_query:
+            return self.search.group_of(site)
+        if self.most_used_view:
+            return self.most_used_groups[site.uid]
+        return self.current_active_group
+
+    def reorderable(self):
+        # 列表顺序与当前分组的保存顺序一致时才能上移下移、拖动排序
+        return not (self.search_query or self.most_used_view or self.sort_by_usage.get())
+
+    def most_used_sites(self):
+        # 按常用度取前 MOST_USED_LIMIT 个仍在收藏中的网址；同一网址收藏了多次时取最先出现的一条
+        ranked = self.usage.ranked()
+        first = first_sites(self.data, ranked)
+        found = [first[url] for url in ranked if url in first][:MOST_USED_LIMIT]
+        self.most_used_groups = {site.uid: group for group, site in found}
+        return [site for _, site in found]
+
+    # === 窗口化渲染 ===
+    def visible_site_rows(self):
+        height = self.site_tree.winfo_height()
+        if height <= 1:  # 尚未完成布局
+            return 20
+        return max(1, height // ROW_HEIGHT)
+
+    def render_site_window(self):
+        total = len(self.site_source)
+        visible = self.visible_site_rows()
+        self.site_offset = max(0, min(self.site_offset, total - visible))
+        start = self.site_offset
+        end = min(total, start + visible + VIRTUAL_OVERSCAN)
+        # 只删除滑出窗口的行、补上新进入的行，其余行原地保留
+        self.render_site_rows(start, end)
+        if total:
+            self.site_scrollbar.set(start / total, min(1.0, (start + visible) / total))
+        else:
+            self.site_scrollbar.set(0.0, 1.0)
+
+    def scroll_site_into_view(self, site):
+        if self.site_virtual:
+            index = find_site(self.site_source, site)
+            visible = self.visible_site_rows()
+            if not self.site_offset <= index < self.site_offset + visible:
+                self.site_offset = index - visible // 2
+                self.render_site_window()
+        elif self.site_tree.exists(site_iid(site)):
+            self.site_tree.see(site_iid(site))
+
+    def on_site_scroll(self, *args):
+        visible = self.visible_site_rows()
+        if args[0] == "moveto":
+            self.site_offset = int(float(args[1]) * len(self.site_source))
+        elif args[0] == "scroll":
+            step = visible if args[2] == "pages" else 1
+            self.site_offset += int(args[1]) * step
+        self.render_site_window()
+
+    def on_site_wheel(self, event):
+        if not self.site_virtual:
+            return None
+        if event.num == 4 or event.delta > 0:
+            self.site_offset -= WHEEL_STEP
+        else:
+            self.site_offset += WHEEL_STEP
+        self.render_site_window()
+        return "break"
+
+    def on_site_resize(self, event):
+        if self.site_virtual:
+            self.render_site_window()
+
+    def print_hover_stats(self):
+        # 对比收到的 <Motion> 事件数与实际重绘次数，验证悬停节流的效果
+        for name, tracker in (("分组", self.group_hover), ("网站", self.site_hover)):
+            stats = tracker.report()
+            if stats["events"]:
+                print(f"🖱️ 悬停[{name}]: {json.dumps(stats, ensure_ascii=False)}")
+        self.root.after(HOVER_STATS_INTERVAL_MS, self.print_hover_stats)
+
+    def on_site_yscroll(self, first, last):
+        # 非窗口化模式下 Treeview 自己滚动：同步滚动条，并在滚动停下后为新露出的行加载图标
+        self.site_scrollbar.set(first, last)
+        self.schedule_icons()
+
+    # === 网站图标 ===
+    def schedule_icons(self):
+        if self.icon_after is not None:
+            self.root.after_cancel(self.icon_after)
+        self.icon_after = self.root.after(FAVICON_SCROLL_DELAY_MS, self.load_visible_icons)
+
+    def visible_sites(self):
+        total = len(self.site_source)
+        if self.site_virtual:
+            start = self.site_offset
+            end = start + self.visible_site_rows()
+        else:
+            first, last = self.site_tree.yview()
+            start, end = int(first * total), math.ceil(last * total)
+        return self.site_source[start:min(total, end)]
+
+    def load_visible_icons(self):
+        # 只为可见行取图标：内存中没有的先查磁盘缓存，磁盘上也没有的交给后台下载
+        self.icon_after = None
+        changed = False
+        for site in self.visible_sites():
+            origin = favicon_origin(site["url"])
+            if not origin:
+                continue
+            if origin in self.icon_images:
+                self.icon_images.move_to_end(origin)  # 可见行用到的图标最后才被淘汰
+                continue
+            cached = self.favicons.lookup(origin)
+            if cached is None:
+                self.favicons.request(origin)
+            else:
+                self.add_icon(origin, cached)
+                changed = True
+        if changed:
+            self.rerender_sites()
+        if self.favicons.busy and not self.icon_polling:
+            self.icon_polling = True
+            self.root.after(100, self.poll_icons)
+
+    def add_icon(self, origin, data):
+        image = ""
+        if data:
+            try:
+                image = tk.PhotoImage(data=base64.b64encode(data))
+                scale = math.ceil(max(image.width(), image.height()) / FAVICON_SIZE)
+                if scale > 1:
+                    image = image.subsample(scale)
+            except tk.TclError:
+                image = ""
+        self.icon_images[origin] = image
+        while len(self.icon_images) > FAVICON_MEMORY:
+            self.icon_images.popitem(last=False)
+
+    def poll_icons(self):
+        changed = False
+        while True:
+            try:
+                origin, data = self.favicons.results.get_nowait()
+            except queue.Empty:
+                break
+            self.add_icon(origin, data)
+            changed = True
+        if changed:
+            self.rerender_sites()
+        if self.favicons.busy:
+            self.root.after(100, self.poll_icons)
+        else:
+            self.icon_polling = False
+            self.favicons.save()
+
+    def rerender_sites(self):
+        # 重新生成已渲染的行：TreeSync 只会更新图标有变化的行
+        if self.site_virtual:
+            self.render_site_window()
+        else:
+            self.render_site_rows(0, len(self.site_source))
 
     @safe_action
     def add_group(self):
@@ -501,9 +2943,9 @@ class WebManagerApp:
                 messagebox.showerror("错误", "该分组已存在", parent=add_window)
                 return
 
-            self.data[name] = []
-            self.save_data()
+            self.apply_change({"op": "add_group", "group": name}, f"新建分组 '{name}'")
             self.current_active_group = name
+            self.most_used_view = False
             self.refresh_group_list()
             self.refresh_site_list(name)
             add_window.destroy()
@@ -561,11 +3003,16 @@ class WebManagerApp:
             note = entry_note.get().strip()
             group = combo_group.get().strip()
             if not name or not url or not group: return
+            existing = self.duplicates.lookup(url)
+            if existing:
+                where = "\n".join(f"· [{g}] {site['name']}" for g, site in existing[:5])
+                if not messagebox.askyesno("重复的网址", f"该网址已经收藏过：\n{where}\n\n仍然添加吗？", parent=add_window):
+                    return
             if group not in self.data:
-                self.data[group] = []
+                self.apply_change({"op": "add_group", "group": group}, f"新建分组 '{group}'")
                 self.refresh_group_list()
-            self.data[group].append({"name": name, "url": url, "note": note})
-            self.save_data()
+            self.apply_change({"op": "add", "group": group, "site": {"name": name, "url": url, "note": note}},
+                              f"添加网站 '{name}'")
             if group == self.current_active_group:
                 self.refresh_site_list(group)
             add_window.destroy()
@@ -588,13 +3035,11 @@ class WebManagerApp:
         if not t: return
         n = simpledialog.askstring("重命名", "新名称:", initialvalue=t)
         if n and n != t:
-            keys = list(self.data.keys())
-            idx = keys.index(t)
-            new_data = {}
-            for k in keys: new_data[n if k == t else k] = self.data[k]
-            self.data = new_data
+            if n in self.data:
+                messagebox.showerror("错误", "该分组已存在")
+                return
+            self.apply_change({"op": "rename_group", "group": t, "name": n}, "重命名分组")
             if self.current_active_group == t: self.current_active_group = n
-            self.save_data()
             self.refresh_group_list()
             self.refresh_site_list(self.current_active_group)
             ToastNotification(self.root, "重命名成功")
@@ -602,26 +3047,24 @@ class WebManagerApp:
     @safe_action
     def delete_group(self):
         t = self.context_item_group or self.current_active_group
-        if t and messagebox.askyesno("确认", "删除?"):
-            del self.data[t]
+        if t and messagebox.askyesno("确认", f"删除分组 '{t}' 及其中的 {len(self.data[t])} 个网站？"):
+            self.apply_change({"op": "delete_group", "group": t}, f"删除分组 '{t}'")
             if self.current_active_group == t: self.current_active_group = list(self.data.keys())[
                 0] if self.data else None
-            self.save_data()
             self.refresh_group_list()
             if self.current_active_group:
                 self.refresh_site_list(self.current_active_group)
             else:
-                [self.site_tree.delete(i) for i in self.site_tree.get_children()]
-            ToastNotification(self.root, "分组已删除", "error")
+                self.refresh_site_list(None)
+            ToastNotification(self.root, "分组已删除 · Ctrl+Z 撤销", "error")
 
     @safe_action
     def edit_website(self):
         item_id = self.context_item_site if self.context_item_site else self.site_tree.selection()
         if not item_id: return
         if isinstance(item_id, tuple): item_id = item_id[0]
-        group_name = self.current_active_group
-        index = int(item_id)
-        site_data = self.data[group_name][index]
+        group_name, _ = self.locate_site(self.site_by_iid[item_id])
+        site_data = self.site_by_iid[item_id]
 
         edit_window = tk.Toplevel(self.root)
         edit_window.title("编辑网站")
@@ -644,9 +3087,11 @@ class WebManagerApp:
             new_url = e_url.get().strip()
             new_note = e_note.get().strip()
             if new_name and new_url:
-                self.data[group_name][index] = {"name": new_name, "url": new_url, "note": new_note}
-                self.save_data()
-                self.refresh_site_list(group_name)
+                # 原地修改记录，保持行 iid 不变
+                self.apply_change({"op": "edit", "group": group_name,
+                                   "index": find_site(self.data[group_name], site_data),
+                                   "site": {"name": new_name, "url": new_url, "note": new_note}}, "编辑网站")
+                self.refresh_site_list(self.current_active_group)
                 edit_window.destroy()
                 ToastNotification(self.root, "修改已保存")
 
@@ -654,27 +3099,72 @@ class WebManagerApp:
         AnimatedButton(edit_window, text="取消", command=edit_window.destroy, width=12, bg="#E0E0E0",
                        fg=COLORS["text_main"]).place(x=220, y=220)
 
+    def delete_selection(self, event=None):
+        self.context_item_site = None  # 按 Delete 键时作用于当前选中项
+        self.delete_website()
+
     @safe_action
     def delete_website(self):
-        item_id = self.context_item_site if self.context_item_site else self.site_tree.selection()
-        if not item_id: return
-        if isinstance(item_id, tuple): item_id = item_id[0]
-        group_name = self.current_active_group
-        index = int(item_id)
-        if messagebox.askyesno("确认", "确定删除该网站吗？"):
-            self.data[group_name].pop(index)
-            self.save_data()
-            self.refresh_site_list(group_name)
-            ToastNotification(self.root, "网站已删除", "error")
+        items = self.selected_sites()
+        if not items: return
+        prompt = "确定删除该网站吗？" if len(items) == 1 else f"确定删除选中的 {len(items)} 个网站吗？"
+        if messagebox.askyesno("确认", prompt):
+            # 从后往前删，保证其余待删记录的下标不变；整批只写一次盘、只刷新一次
+            located = sorted((self.locate_site(site) for site in items), key=lambda gi: gi[1], reverse=True)
+            self.apply_batch([{"op": "delete", "group": g, "index": i} for g, i in located],
+                             label=f"删除 {len(items)} 个网站")
+            self.refresh_site_list(self.current_active_group)
+            ToastNotification(self.root, f"已删除 {len(items)} 个网站 · Ctrl+Z 撤销", "error")
+
+    @safe_action
+    def edit_note(self):
+        items = self.selected_sites()
+        if not items: return
+        note = simpledialog.askstring("编辑备注", f"为选中的 {len(items)} 个网站设置备注:",
+                                      initialvalue=items[0].get("note", ""), parent=self.root)
+        if note is None: return
+        ops = []
+        for site in items:
+            group, index = self.locate_site(site)
+            ops.append({"op": "edit", "group": group, "index": index, "site": {"note": note.strip()}})
+        self.apply_batch(ops, label=f"修改 {len(items)} 个网站的备注")
+        self.refresh_site_list(self.current_active_group)
+        ToastNotification(self.root, "备注已更新")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Web Manager Pro")
+    parser.add_argument("--storage", choices=("json", "sqlite"),
+                        help="存储模式；默认存在 bookmarks.db 时使用 SQLite，否则使用 JSON")
+    parser.add_argument("--export-json", metavar="PATH", help="把当前收藏导出为 JSON 文件后退出")
+    parser.add_argument("--profile-startup", action="store_true", help="打印启动各阶段的耗时")
+    parser.add_argument("--no-fade", action="store_true", help="启动时不淡入窗口")
+    parser.add_argument("--reduce-motion", action="store_true", help="关闭所有动画（按钮变色、提示淡入淡出、窗口淡入）")
+    parser.add_argument("--undo-budget", type=int, default=UNDO_BUDGET, metavar="N",
+                        help="撤销历史的内存预算（操作条数 + 保存的网站数），超出时丢弃最早的步骤")
+    parser.add_argument("--hover-stats", action="store_true", help="定期打印悬停事件数与重绘次数")
+    parser.add_argument("--record-stats", action="store_true",
+                        help="整个运行期间统计各处理函数的 Tk 调用数（默认只在 F12 调试面板打开时统计）")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    if args.export_json:
+        store = open_store(DATA_FILE, args.storage)
+        export_json(store.load(), args.export_json)
+        store.close()
+        sys.exit(0)
+    ANIMATOR.reduce_motion = REDUCE_MOTION or args.reduce_motion
+    profile = StartupProfiler(args.profile_startup)
     root = tk.Tk()
+    profile.mark("创建窗口")
     try:
         from ctypes import windll
 
         windll.shcore.SetProcessDpiAwareness(1)
     except:
         pass
-    app = WebManagerApp(root)
+    app = WebManagerApp(root, args.storage, profile, fade=FADE_IN and not (args.no_fade or args.reduce_motion),
+                        undo_budget=args.undo_budget, hover_stats=args.hover_stats, record_stats=args.record_stats)
     root.mainloop()
\ No newline at end of file